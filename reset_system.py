@@ -1,6 +1,7 @@
 import os
 import subprocess
 from src.utils.redis import RedisUtils
+from src.constants import QueueNames
 from src.utils.logging_utils import LoggerSetup
 
 def reset_system():
@@ -12,7 +13,8 @@ def reset_system():
         # Clear RQ queues
         logger.info("[RESET SCRIPT] Clearing RQ queues")
         redis_utils = RedisUtils()
-        redis_utils.redis_client.delete('rq:queue:main_queue')
+        for queue_name in QueueNames:
+            redis_utils.redis_client.delete(f'rq:queue:{queue_name.value}')
         logger.info("[RESET SCRIPT] Successfully cleared RQ queues")
         
         # Flush all Redis data
@@ -9,6 +9,14 @@ pkill -f "python.*main_worker.py"
 # Small delay to ensure previous workers are killed
 sleep 1
 
-echo "Starting main worker..."
+# Run jobs in the worker process itself so warm agents are reused across jobs
+export WORKER_MODE=${WORKER_MODE:-simple}
+
+# Serve decision-making queues first; set QUEUE_SCHEDULING=weighted to
+# interleave queues by QUEUE_WEIGHTS instead. A dedicated pool can be started
+# with e.g. WORKER_QUEUES=command_system_queue,task_allocator_queue
+export QUEUE_SCHEDULING=${QUEUE_SCHEDULING:-strict}
+
+echo "Starting main worker ($WORKER_MODE mode, $QUEUE_SCHEDULING scheduling)..."
 # Run the worker in foreground to see logs
 python src/workers/main_worker.py 
\ No newline at end of file
@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+# Add project root to Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from src.constants import RedisKeys
+from src.utils.tracing import Tracer
+
+BAR_WIDTH = 40
+
+def _subtree(spans: List[Dict[str, Any]], root_span_id: str) -> List[Dict[str, Any]]:
+    """The span with root_span_id and everything that followed from it."""
+    keep = {root_span_id}
+    for span in spans:  # Spans are in start order, so parents come first
+        if span["parent_span_id"] in keep:
+            keep.add(span["span_id"])
+    return [span for span in spans if span["span_id"] in keep]
+
+def _depth_first(spans: List[Dict[str, Any]]) -> List[tuple]:
+    """(depth, span) pairs with every span under its parent."""
+    span_ids = {span["span_id"] for span in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for span in spans:
+        parent = span["parent_span_id"] if span["parent_span_id"] in span_ids else None
+        children.setdefault(parent, []).append(span)
+
+    ordered = []
+    stack = [(0, span) for span in reversed(children.get(None, []))]
+    while stack:
+        depth, span = stack.pop()
+        ordered.append((depth, span))
+        stack.extend((depth + 1, child) for child in reversed(children.get(span["span_id"], [])))
+    return ordered
+
+def _bar(span: Dict[str, Any], start: float, scale: float) -> str:
+    """Queue wait as dots and run time as hashes on the trace's time axis."""
+    waiting_from = span["due_at"] or span["started_at"]
+    cells = [" "] * BAR_WIDTH
+    for position in range(int((waiting_from - start) * scale), int((span["started_at"] - start) * scale)):
+        cells[min(position, BAR_WIDTH - 1)] = "."
+    finished_at = span["finished_at"] or span["started_at"]
+    run_from = int((span["started_at"] - start) * scale)
+    for position in range(run_from, max(run_from + 1, int((finished_at - start) * scale))):
+        cells[min(position, BAR_WIDTH - 1)] = "#"
+    return "".join(cells)
+
+def render(spans: List[Dict[str, Any]]) -> str:
+    """Waterfall of a trace: one line per span with its offset, queue wait and time breakdown."""
+    start = min(span["enqueued_at"] or span["started_at"] for span in spans)
+    end = max(span["finished_at"] or span["started_at"] for span in spans)
+    scale = (BAR_WIDTH - 1) / (end - start) if end > start else 0.0
+
+    lines = [
+        f"Trace {spans[0]['trace_id']}: {len(spans)} spans, {end - start:.3f}s from first enqueue to last finish",
+        f"{'offset':>9} {'wait':>9} {'run':>9} {'llm':>9} {'redis':>9} {'enqueue':>9}  |{'timeline':<{BAR_WIDTH}}|  span",
+    ]
+    for depth, span in _depth_first(spans):
+        timings = span.get("timings_ms") or {}
+        attributes = span.get("attributes") or {}
+        label = span["name"] or "?"
+        if attributes.get("data_type"):
+            label += f" ({' '.join(str(attributes[key]) for key in ('data_type', 'data_id') if key in attributes)})"
+        if attributes.get("success") is False:
+            label += " FAILED"
+        lines.append(
+            f"{span['started_at'] - start:>8.3f}s"
+            f" {(span['queue_wait_ms'] or 0) / 1000:>8.3f}s"
+            f" {(span['duration_ms'] or 0) / 1000:>8.3f}s"
+            f" {timings.get('llm', 0) / 1000:>8.3f}s"
+            f" {timings.get('redis', 0) / 1000:>8.3f}s"
+            f" {timings.get('enqueue', 0) / 1000:>8.3f}s"
+            f"  |{_bar(span, start, scale)}|  {'  ' * depth}{label}"
+        )
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the waterfall of a trace recorded by the workers")
+    parser.add_argument("trace_id", nargs="?", help="Trace to show")
+    parser.add_argument("--observation", help="Show what followed from the observation with this data_id instead")
+    parser.add_argument("--recent", type=int, metavar="N", help="List the traces of the last N recorded spans")
+    parser.add_argument("--json", action="store_true", help="Print the spans as JSON")
+    args = parser.parse_args()
+
+    tracer = Tracer.get_instance()
+    if args.recent:
+        for _, fields in tracer.redis_client.xrevrange(RedisKeys.TRACE_SPANS.value, count=args.recent):
+            span = json.loads(fields[b"span"])
+            print(f"{span['trace_id']}  {span['name']}  {(span['duration_ms'] or 0) / 1000:.3f}s")
+        return
+
+    root_span_id = None
+    trace_id = args.trace_id
+    if args.observation:
+        context = tracer.find_observation(args.observation)
+        if context is None:
+            parser.error(f"No trace recorded for observation {args.observation}")
+        trace_id, root_span_id = context["trace_id"], context["span_id"]
+    if not trace_id:
+        parser.error("Give a trace id, --observation or --recent")
+
+    spans = tracer.get_trace(trace_id)
+    if root_span_id:
+        spans = _subtree(spans, root_span_id)
+    if not spans:
+        parser.error(f"No spans recorded for trace {trace_id}")
+    print(json.dumps(spans, indent=4) if args.json else render(spans))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+import copy
+import json
+import math
+import random
+from typing import Any, Dict, List, Optional
+
+EARTH_RADIUS_METERS = 6371008.8
+
+DRONE_CAPABILITIES = (
+    "Search - Scans the target disaster area. It collects and process Images, Thermal images, "
+    "Hazard detection - such as fire, flood, structural damage."
+)
+GROUND_CAPABILITIES = (
+    "Search - Scans the target disaster area, and collects information such as Photos, Distress voice signal recognition, Identify toxic gas emissions\n"
+    "Assist Rescue - Assists human first responder during the rescue task\n"
+    "Dispatch aid package - Dispatches items such as water, food, first aid kit, to the human survivors."
+)
+
+# Every key a scenario file may set; omitted keys keep these values
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "seed": 7,
+    "start_time": 1767225600,  # Virtual epoch seconds the run starts at
+    "duration_seconds": 60 * 60,
+    "tick_seconds": 60,  # Interval at which fires spread and survivors call for help
+    "area": {"lat": 37.7749, "long": -122.4194, "radius_meters": 3000},
+    "fleet": {
+        "drone_bot": {"count": 20, "battery_level": 100, "battery_per_km": 1.0},
+        "ground_bot": {"count": 10, "battery_level": 100, "battery_per_km": 2.0, "aid_kit_share": 0.5},
+    },
+    # Explicit fires, plus fire_count fires ignited at random places and times
+    "fires": [],
+    "fire_count": 3,
+    "fire_defaults": {"radius_meters": 50, "spread_meters_per_minute": 5, "smoke_factor": 3.0},
+    # Chance per tick that a bystander reports a burning fire
+    "fire_report_probability": 0.1,
+    "survivors": {
+        "count": 20,
+        # Survivors are placed within this distance of a fire, or anywhere in the area when there are no fires
+        "near_fire_meters": 500,
+        # Chance per tick that a survivor in a fire or smoke zone gets a distress call out
+        "report_probability": 0.05,
+        "detection_radius_meters": 150,
+        "rescue_radius_meters": 150,
+    },
+    # Chance that a drone or sensor reading notices something that is there
+    "detection_probability": 0.9,
+    "backends": {
+        "redis": "fake",  # fake, or the URL of a Redis server to run against
+        "llm": "simulated",  # simulated, or real for the configured chat model
+    },
+    "llm_cache": False,  # Drones re-send the same sample images, so cached interpretations would ignore the world
+    "incremental_decisions": False,
+    "batch_mode": False,
+}
+
+def _merge(defaults: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    merged = copy.deepcopy(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def distance_meters(lat_a: float, lon_a: float, lat_b: float, lon_b: float) -> float:
+    """Great-circle distance between two points."""
+    phi_a, phi_b = math.radians(lat_a), math.radians(lat_b)
+    d_phi = phi_b - phi_a
+    d_lambda = math.radians(lon_b - lon_a)
+    h = math.sin(d_phi / 2) ** 2 + math.cos(phi_a) * math.cos(phi_b) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(h)))
+
+def offset(lat: float, lon: float, north_meters: float, east_meters: float) -> tuple:
+    """Point the given distances north and east of (lat, lon)."""
+    new_lat = lat + math.degrees(north_meters / EARTH_RADIUS_METERS)
+    new_lon = lon + math.degrees(east_meters / (EARTH_RADIUS_METERS * math.cos(math.radians(lat))))
+    return new_lat, new_lon
+
+class EnvironmentConfig:
+    """Scenario of a simulation run, read from a JSON file.
+
+    Files only need the keys they change; everything else comes from
+    DEFAULT_CONFIG, and an empty file runs the default scenario.
+    """
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None):
+        self.values = _merge(DEFAULT_CONFIG, values or {})
+
+    @classmethod
+    def from_file(cls, path: str) -> "EnvironmentConfig":
+        with open(path, "r") as f:
+            content = f.read().strip()
+        return cls(json.loads(content) if content else {})
+
+    def __getitem__(self, key: str) -> Any:
+        return self.values[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.values.get(key, default)
+
+class Fire:
+    """Circular fire front growing at a constant rate from its ignition, with a wider smoke plume."""
+
+    def __init__(self, fire_id: str, lat: float, long: float, ignite_at: float, radius_meters: float, spread_meters_per_minute: float, smoke_factor: float):
+        self.fire_id = fire_id
+        self.lat = lat
+        self.long = long
+        self.ignite_at = ignite_at
+        self.radius_meters = radius_meters
+        self.spread_meters_per_minute = spread_meters_per_minute
+        self.smoke_factor = smoke_factor
+
+    def radius_at(self, now: float) -> float:
+        if now < self.ignite_at:
+            return 0.0
+        return self.radius_meters + self.spread_meters_per_minute * (now - self.ignite_at) / 60
+
+    def smoke_radius_at(self, now: float) -> float:
+        return self.radius_at(now) * self.smoke_factor
+
+class Survivor:
+    """A person somewhere in the area, and when the pipeline found and reached them."""
+
+    def __init__(self, survivor_id: str, lat: float, long: float):
+        self.survivor_id = survivor_id
+        self.lat = lat
+        self.long = long
+        self.reported_at: Optional[float] = None
+        self.detected_at: Optional[float] = None
+        self.rescued_at: Optional[float] = None
+
+class Environment:
+    """Ground truth of a simulated incident: spreading fires, survivors and the bot fleet.
+
+    Times are virtual epoch seconds. The simulated sensors and chat model read
+    conditions from here, and the simulator records detections and rescues.
+    """
+
+    def __init__(self, config: EnvironmentConfig):
+        self.config = config
+        self.rng = random.Random(config["seed"])
+        self.start_time = float(config["start_time"])
+        area = config["area"]
+        self.center = (float(area["lat"]), float(area["long"]))
+        self.radius_meters = float(area["radius_meters"])
+        self.fires = self._build_fires()
+        self.survivors = [
+            Survivor(f"survivor-{index}", *self._survivor_location())
+            for index in range(int(config["survivors"]["count"]))
+        ]
+
+    def random_point(self, center: Optional[tuple] = None, radius_meters: Optional[float] = None) -> tuple:
+        """Uniformly random point within radius_meters of center, by default anywhere in the area."""
+        center = center or self.center
+        radius_meters = self.radius_meters if radius_meters is None else radius_meters
+        distance = radius_meters * math.sqrt(self.rng.random())
+        bearing = self.rng.uniform(0, 2 * math.pi)
+        return offset(center[0], center[1], distance * math.cos(bearing), distance * math.sin(bearing))
+
+    def _survivor_location(self) -> tuple:
+        if not self.fires:
+            return self.random_point()
+        fire = self.rng.choice(self.fires)
+        return self.random_point((fire.lat, fire.long), float(self.config["survivors"]["near_fire_meters"]))
+
+    def _build_fires(self) -> List[Fire]:
+        defaults = self.config["fire_defaults"]
+        specs = list(self.config["fires"])
+        for _ in range(int(self.config["fire_count"])):
+            lat, long = self.random_point()
+            specs.append({"lat": lat, "long": long, "ignite_at": self.rng.uniform(0, self.config["duration_seconds"] / 2)})
+
+        fires = []
+        for index, spec in enumerate(specs):
+            spec = {**defaults, **spec}
+            fires.append(Fire(
+                fire_id=f"fire-{index}",
+                lat=float(spec["lat"]),
+                long=float(spec["long"]),
+                ignite_at=self.start_time + float(spec.get("ignite_at", 0)),
+                radius_meters=float(spec["radius_meters"]),
+                spread_meters_per_minute=float(spec["spread_meters_per_minute"]),
+                smoke_factor=float(spec["smoke_factor"]),
+            ))
+        return fires
+
+    def fleet(self) -> List[Dict[str, Any]]:
+        """Metadata of every bot, starting spread over the area."""
+        bots = []
+        for bot_type, spec in self.config["fleet"].items():
+            for index in range(int(spec.get("count", 0))):
+                lat, long = self.random_point()
+                bot = {
+                    "bot_type": bot_type,
+                    "bot_id": f"{bot_type}-{index}",
+                    "altitude": 0,
+                    "lat": lat,
+                    "long": long,
+                    "battery_level": float(spec.get("battery_level", 100)),
+                    "status": "available",
+                    "capabilities": DRONE_CAPABILITIES if bot_type == "drone_bot" else GROUND_CAPABILITIES,
+                }
+                if bot_type == "ground_bot":
+                    bot["contains_aid_kit"] = self.rng.random() < float(spec.get("aid_kit_share", 0))
+                bots.append(bot)
+        return bots
+
+    def conditions(self, lat: float, long: float, now: float) -> Dict[str, Any]:
+        """What is actually at a point: whether it burns or is in smoke, and the survivors within detection range."""
+        fire = smoke = False
+        for candidate in self.fires:
+            distance = distance_meters(lat, long, candidate.lat, candidate.long)
+            fire = fire or distance <= candidate.radius_at(now)
+            smoke = smoke or distance <= candidate.smoke_radius_at(now)
+        detection_radius = float(self.config["survivors"]["detection_radius_meters"])
+        survivors = [
+            survivor for survivor in self.survivors
+            if survivor.rescued_at is None and distance_meters(lat, long, survivor.lat, survivor.long) <= detection_radius
+        ]
+        return {"fire": fire, "smoke": smoke, "survivors": survivors}
+
+    def observe(self, lat: float, long: float, now: float) -> Dict[str, Any]:
+        """Conditions at a point as a sensor sees them, missing each finding with some probability.
+
+        Survivors seen are recorded as detected.
+        """
+        conditions = self.conditions(lat, long, now)
+        probability = float(self.config["detection_probability"])
+        seen = {
+            "fire": conditions["fire"] and self.rng.random() < probability,
+            "smoke": conditions["smoke"] and self.rng.random() < probability,
+            "survivors": [survivor for survivor in conditions["survivors"] if self.rng.random() < probability],
+        }
+        for survivor in seen["survivors"]:
+            if survivor.detected_at is None:
+                survivor.detected_at = now
+        return seen
+
+    def sensor_scenario(self, lat: float, long: float, now: float) -> str:
+        """Ground bot sensor scenario matching the conditions at a point."""
+        conditions = self.conditions(lat, long, now)
+        if conditions["fire"]:
+            return "fire"
+        if conditions["smoke"]:
+            return "smoke_only"
+        return "normal"
+
+    def rescue(self, lat: float, long: float, now: float) -> int:
+        """Mark survivors within rescue range of a point as rescued, returning how many were."""
+        rescue_radius = float(self.config["survivors"]["rescue_radius_meters"])
+        rescued = 0
+        for survivor in self.survivors:
+            if survivor.rescued_at is None and distance_meters(lat, long, survivor.lat, survivor.long) <= rescue_radius:
+                survivor.rescued_at = now
+                rescued += 1
+        return rescued
+
+    def human_reports(self, now: float) -> List[Dict[str, Any]]:
+        """Human reports made during a tick: survivors caught in fire or smoke calling for help, and fire sightings."""
+        reports = []
+        survivor_probability = float(self.config["survivors"]["report_probability"])
+        for survivor in self.survivors:
+            if survivor.rescued_at is not None:
+                continue
+            conditions = self.conditions(survivor.lat, survivor.long, now)
+            if not (conditions["fire"] or conditions["smoke"]) or self.rng.random() >= survivor_probability:
+                continue
+            if survivor.reported_at is None:
+                survivor.reported_at = now
+            reports.append({
+                "data_type": "human_report",
+                "lat": survivor.lat,
+                "long": survivor.long,
+                "source": "distress_call",
+                "report": f"Caller is trapped by {'fire' if conditions['fire'] else 'smoke'} and needs help.",
+            })
+
+        fire_probability = float(self.config["fire_report_probability"])
+        for fire in self.fires:
+            radius = fire.radius_at(now)
+            if radius <= 0 or self.rng.random() >= fire_probability:
+                continue
+            # Seen from somewhere along the fire front
+            bearing = self.rng.uniform(0, 2 * math.pi)
+            lat, long = offset(fire.lat, fire.long, radius * math.cos(bearing), radius * math.sin(bearing))
+            reports.append({
+                "data_type": "human_report",
+                "lat": lat,
+                "long": long,
+                "source": "bystander",
+                "report": "Bystander reports a wildfire spreading nearby.",
+            })
+        return reports
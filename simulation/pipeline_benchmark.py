@@ -0,0 +1,349 @@
+import argparse
+import copy
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Add project root to Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from src.utils.redis import RedisUtils
+from src.utils.fake_llm import FakeChatModel
+from src.utils.llm_gateway import LLMGateway
+from src.constants import LLM_GATEWAY_MAX_CONCURRENCY, LLM_GATEWAY_REQUESTS_PER_SECOND, LLM_GATEWAY_BURST
+from simulation.environment_config import EnvironmentConfig, Environment
+from simulation.simulation_runner import use_redis
+
+logger = logging.getLogger(__name__)
+
+BOT_TASK_TYPES = ("drone_bot_agent_task", "ground_bot_agent_task")
+# Stages of an observation on its way to a bot, in pipeline order
+PIPELINE_STAGES = ["data_aggregator", "command_system", "task_allocator", "drone_bot_agent_task", "ground_bot_agent_task"]
+OBSERVATION_TYPES = ["image", "thermal_image", "gas_sensor", "human_report"]
+HUMAN_REPORTS = [
+    "Caller is trapped by smoke and needs help.",
+    "Bystander reports a wildfire spreading nearby.",
+    "Two people injured near the collapsed shed, one unconscious.",
+]
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99/max of a list of seconds, in milliseconds (nearest rank)."""
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(values)
+
+    def rank(percentile: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(percentile * (len(ordered) - 1))))] * 1000, 2)
+
+    return {"p50_ms": rank(0.50), "p95_ms": rank(0.95), "p99_ms": rank(0.99), "max_ms": round(ordered[-1] * 1000, 2)}
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=project_root).stdout.strip() or None
+    except Exception:
+        return None
+
+class PipelineBenchmark:
+    """Load test of the whole pipeline in one process, against Redis and a fake chat model.
+
+    Observations are injected at a fixed rate onto the data_aggregator queue,
+    the way drones and ground bots send them. Every task the agents enqueue is
+    taken over by an in-process queue and run through the worker's
+    process_task by a pool of threads, each standing in for a simple-mode
+    worker, after its delay in real time. Each job remembers the observation
+    that started its chain, so besides queue wait and service time per task
+    type, the report has the time from an observation to each later stage and
+    to the bot task it was allocated to.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        duration_seconds: float,
+        drones: int,
+        ground_bots: int,
+        workers: int,
+        mix: Dict[str, float],
+        hotspots: int = 5,
+        hotspot_radius_meters: float = 300,
+        drain_seconds: float = 30,
+        seed: int = 7,
+    ):
+        self.rate = rate
+        self.duration_seconds = duration_seconds
+        self.workers = workers
+        self.mix = mix
+        self.hotspot_radius_meters = hotspot_radius_meters
+        self.drain_seconds = drain_seconds
+        self.rng = random.Random(seed)
+        # Observations cluster around the fires of an environment, so incidents build up like in an incident
+        self.environment = Environment(EnvironmentConfig({
+            "seed": seed,
+            "fleet": {"drone_bot": {"count": drones}, "ground_bot": {"count": ground_bots}},
+            "fire_count": hotspots,
+            "survivors": {"count": 0},
+        }))
+        self.redis_utils: Optional[RedisUtils] = None
+        self._jobs: List[tuple] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._running = 0
+        self._local = threading.local()
+        self._records: List[Dict[str, Any]] = []
+        self._records_lock = threading.Lock()
+        self.injected = 0
+
+    def _enqueue(self, task_type: str, task_data: Dict[str, Any], delay_seconds: float) -> bool:
+        """Task sink: queue a job for the worker threads, linked to the observation that caused it."""
+        now = time.monotonic()
+        parent = getattr(self._local, "job", None)
+        job = {
+            "task_type": task_type,
+            # Jobs are serialized by RQ, so later changes by the caller must not leak into them
+            "data": copy.deepcopy(task_data),
+            "enqueued_at": now,
+            "due": now + delay_seconds,
+            # Every observation starts a chain; anything else belongs to the chain of the job that enqueued it
+            "origin": now if task_type == "data_aggregator" or parent is None else parent["origin"],
+        }
+        with self._condition:
+            heapq.heappush(self._jobs, (job["due"], next(self._sequence), job))
+            self._condition.notify()
+        return True
+
+    def _next_job(self) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            while not self._stopping:
+                if self._jobs:
+                    wait = self._jobs[0][0] - time.monotonic()
+                    if wait <= 0:
+                        self._running += 1
+                        return heapq.heappop(self._jobs)[2]
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+            return None
+
+    def _work(self) -> None:
+        from src.workers.main_worker import process_task
+
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._local.job = job
+            started_at = time.monotonic()
+            success = process_task(job["data"], job["task_type"])
+            finished_at = time.monotonic()
+            self._local.job = None
+            with self._condition:
+                self._running -= 1
+            with self._records_lock:
+                self._records.append({
+                    "task_type": job["task_type"],
+                    "first_step": "mission" not in job["data"],
+                    "success": bool(success),
+                    "enqueued_at": job["enqueued_at"],
+                    "due": job["due"],
+                    "started_at": started_at,
+                    "finished_at": finished_at,
+                    "origin": job["origin"],
+                })
+
+    def _observation(self) -> Dict[str, Any]:
+        """An observation near one of the hotspots, shaped like the bots send them."""
+        from src.workers.agent_registry import AgentRegistry
+        from src.agents.drone_bot_agent import DroneBotAgent
+        from src.agents.ground_bot_agent import GroundBotAgent
+
+        fire = self.rng.choice(self.environment.fires)
+        lat, long = self.environment.random_point((fire.lat, fire.long), self.hotspot_radius_meters)
+        data_type = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        observation = {
+            "data_id": self.rng.randint(1000000000, 9999999999),
+            "data_type": data_type,
+            "lat": lat,
+            "long": long,
+            "timestamp": datetime.now().isoformat(),
+        }
+        if data_type in ("image", "thermal_image"):
+            drone = AgentRegistry.get(DroneBotAgent)
+            camera_img, thermal_img = drone.get_random_image_pair()
+            image = camera_img if data_type == "image" else thermal_img
+            observation[f"{data_type}_blob"] = drone.blob_store.put(drone.compress_image(image))
+        elif data_type == "gas_sensor":
+            ground = AgentRegistry.get(GroundBotAgent)
+            observation["sensor_data"] = ground.get_sensor_data(self.rng.choice(["normal", "smoke_only", "fire"]))
+        else:
+            observation["source"] = "distress_call"
+            observation["report"] = self.rng.choice(HUMAN_REPORTS)
+        return observation
+
+    def _inject(self) -> None:
+        """Send observations at the configured rate for the configured duration."""
+        started_at = time.monotonic()
+        while True:
+            due = started_at + self.injected / self.rate
+            if due - started_at >= self.duration_seconds:
+                return
+            time.sleep(max(0.0, due - time.monotonic()))
+            self.redis_utils.enqueue_task("data_aggregator", self._observation())
+            self.injected += 1
+
+    def _drain(self) -> None:
+        """Wait until no job is due within the drain window, so delayed mission steps past it are dropped."""
+        deadline = time.monotonic() + self.drain_seconds
+        while time.monotonic() < deadline:
+            with self._condition:
+                idle = self._running == 0 and (not self._jobs or self._jobs[0][0] > deadline)
+            if idle:
+                return
+            time.sleep(0.1)
+
+    def run(self) -> Dict[str, Any]:
+        from src.workers.agent_registry import AgentRegistry
+
+        self.redis_utils = RedisUtils()
+        for bot in self.environment.fleet():
+            self.redis_utils.set_bot_metadata(bot["bot_id"], bot)
+        AgentRegistry.warm_up()
+        RedisUtils.set_task_sink(self._enqueue)
+
+        self._threads = [threading.Thread(target=self._work, name=f"benchmark-worker-{index}", daemon=True) for index in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        started_at = time.monotonic()
+        try:
+            self._inject()
+            self._drain()
+        finally:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify_all()
+            for thread in self._threads:
+                thread.join()
+            RedisUtils.set_task_sink(None)
+        return self.report(time.monotonic() - started_at)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """Machine-readable results: throughput and latency percentiles per stage and end to end."""
+        stages = {}
+        for task_type in sorted({record["task_type"] for record in self._records}):
+            records = [record for record in self._records if record["task_type"] == task_type]
+            stage = {
+                "jobs": len(records),
+                "failed": sum(not record["success"] for record in records),
+                "throughput_per_second": round(len(records) / elapsed, 3) if elapsed else None,
+                "queue_wait": percentiles([record["started_at"] - record["due"] for record in records]),
+                "service": percentiles([record["finished_at"] - record["started_at"] for record in records]),
+            }
+            if task_type in PIPELINE_STAGES:
+                # Only a bot's first mission step follows from the observation, later steps wait on purpose
+                chained = [record for record in records if record["first_step"]]
+                stage["since_observation"] = percentiles([record["started_at"] - record["origin"] for record in chained])
+            stages[task_type] = stage
+
+        allocations = [
+            record for record in self._records
+            if record["task_type"] in BOT_TASK_TYPES and record["first_step"]
+        ]
+        return {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(),
+            "config": {
+                "rate_per_second": self.rate,
+                "duration_seconds": self.duration_seconds,
+                "workers": self.workers,
+                "fleet": {bot_type: spec["count"] for bot_type, spec in self.environment.config["fleet"].items()},
+                "mix": self.mix,
+            },
+            "elapsed_seconds": round(elapsed, 2),
+            "observations": self.injected,
+            "jobs": len(self._records),
+            "pending_jobs": len(self._jobs),
+            "stages": stages,
+            "end_to_end": {
+                "observation_to_allocation": {
+                    "count": len(allocations),
+                    **percentiles([record["enqueued_at"] - record["origin"] for record in allocations]),
+                },
+            },
+            "llm": LLMGateway.get_instance().get_metrics()["families"],
+        }
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        data_type, _, weight = item.partition("=")
+        if data_type.strip() not in OBSERVATION_TYPES:
+            raise argparse.ArgumentTypeError(f"Unknown observation type: {data_type}")
+        mix[data_type.strip()] = float(weight or 1)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-stage and end-to-end latency of the pipeline with a fake chat model")
+    parser.add_argument("--redis", default="fake", help="Redis URL to run against, or fake for an in-memory Redis")
+    parser.add_argument("--rate", type=float, default=2.0, help="Observations per second")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to inject observations for")
+    parser.add_argument("--drain", type=float, default=30, help="Seconds to let queued jobs finish after the last observation")
+    parser.add_argument("--drones", type=int, default=50)
+    parser.add_argument("--ground-bots", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent jobs, like that many simple-mode workers")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("image=2,thermal_image=2,gas_sensor=1,human_report=1"),
+                        help="Observation types with relative weights, e.g. image=2,human_report=1")
+    parser.add_argument("--hotspots", type=int, default=5, help="Areas the observations cluster around")
+    parser.add_argument("--llm-profile", help="FAKE_LLM_PROFILE style JSON file for the fake chat model")
+    parser.add_argument("--llm-concurrency", type=int, default=LLM_GATEWAY_MAX_CONCURRENCY)
+    parser.add_argument("--llm-rps", type=float, default=LLM_GATEWAY_REQUESTS_PER_SECOND)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--history", help="Append the results as one JSON line to this file, to track runs over time")
+    parser.add_argument("--log-level", default="WARNING", help="Agent log level; INFO logs every step of every job")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Agents log to files at DEBUG regardless of handler levels, so filter globally
+    logging.disable(getattr(logging, args.log_level.upper()) - 1)
+
+    use_redis(args.redis)
+    LLMGateway.configure(
+        FakeChatModel.from_file(args.llm_profile),
+        max_concurrency=args.llm_concurrency,
+        requests_per_second=args.llm_rps,
+        burst=max(LLM_GATEWAY_BURST, args.llm_concurrency),
+    )
+    results = PipelineBenchmark(
+        rate=args.rate,
+        duration_seconds=args.duration,
+        drones=args.drones,
+        ground_bots=args.ground_bots,
+        workers=args.workers,
+        mix=args.mix,
+        hotspots=args.hotspots,
+        drain_seconds=args.drain,
+        seed=args.seed,
+    ).run()
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    if args.history:
+        with open(args.history, "a") as f:
+            f.write(json.dumps(results) + "\n")
+
+if __name__ == '__main__':
+    main()
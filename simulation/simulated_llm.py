@@ -0,0 +1,32 @@
+import logging
+import random
+from typing import Any, Dict
+
+from src.utils.fake_llm import FakeChatModel
+from simulation.environment_config import Environment
+
+logger = logging.getLogger(__name__)
+
+# Answers are instant and never fail, so runs only measure the pipeline itself
+SIMULATED_PROFILE = {
+    "defaults": {"latency_ms": 0, "error_rate": 0.0, "rate_limit_rate": 0.0},
+}
+
+class SimulatedChatModel(FakeChatModel):
+    """Fake chat model whose interpretations come from the simulated world.
+
+    Interpretation prompts are answered with what a sensor at the observation's
+    location would see; command and allocation prompts are answered like the
+    fake model does, with one task per incident and need and the first
+    suitable bot.
+    """
+
+    def __init__(self, environment: Environment, clock: Any):
+        super().__init__(SIMULATED_PROFILE)
+        self.environment = environment
+        self.clock = clock
+
+    def observe(self, family: str, observation: Dict[str, Any], rng: random.Random, settings: Dict[str, Any]) -> Dict[str, Any]:
+        context = self.context(observation)
+        seen = self.environment.observe(float(context["lat"]), float(context["long"]), self.clock.now)
+        return {"fire": seen["fire"], "smoke": seen["smoke"], "survivors": len(seen["survivors"])}
@@ -0,0 +1,287 @@
+import argparse
+import copy
+import heapq
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+# Add project root to Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from src.constants import (
+    RedisKeys,
+    LLM_CACHE_BYPASS_ENV,
+    COMMAND_SYSTEM_INCREMENTAL_ENV,
+    DATA_AGGREGATOR_BATCH_MODE_ENV,
+)
+from src.utils.geo_matrix import bot_speeds
+from src.utils.redis import RedisUtils
+from simulation.environment_config import EnvironmentConfig, Environment, distance_meters
+
+logger = logging.getLogger(__name__)
+
+SIMULATION_REDIS_URL = "redis://simulation"
+BOT_TASK_TYPES = ("drone_bot_agent_task", "ground_bot_agent_task")
+RESCUE_TASK_TYPES = ("assist_rescue", "dispatch_aid")
+# Modules that stamp payloads with datetime.now(), which follows the virtual clock during a run
+VIRTUAL_DATETIME_MODULES = [
+    "src.agents.drone_bot_agent",
+    "src.agents.ground_bot_agent",
+    "src.agents.task_allocator",
+]
+
+def use_redis(redis_url: str) -> None:
+    """Point RedisUtils at a Redis server, or at a fresh in-memory one for "fake"."""
+    if redis_url != "fake":
+        os.environ["REDIS_URL"] = redis_url
+        return
+    try:
+        import fakeredis
+        from redis import ConnectionPool
+    except ImportError as e:
+        raise RuntimeError("The fake Redis backend needs fakeredis with Lua support: pip install 'fakeredis[lua]'") from e
+    pool = ConnectionPool(connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer())
+    RedisUtils.register_connection_pool(SIMULATION_REDIS_URL, pool)
+    os.environ["REDIS_URL"] = SIMULATION_REDIS_URL
+
+class VirtualClock:
+    """Simulated time in epoch seconds, only moved forward by the event loop."""
+
+    def __init__(self, start: float):
+        self.now = float(start)
+
+    def time(self) -> float:
+        return self.now
+
+    def advance_to(self, timestamp: float) -> None:
+        self.now = max(self.now, float(timestamp))
+
+    def datetime_class(self) -> type:
+        """A datetime subclass whose now() reads this clock."""
+        clock = self
+
+        class VirtualDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.fromtimestamp(clock.now, tz)
+
+        return VirtualDatetime
+
+class Simulation:
+    """Discrete-event simulation of an incident, run through the real agents on a virtual clock.
+
+    Every task the agents enqueue is handed to the simulator instead of RQ and
+    becomes an event at its due time; events run one at a time through the
+    worker's process_task, with time.time() returning the virtual time, so
+    delays, TTLs and retention windows pass without waiting. Bots travel to
+    their target before a mission starts, ground sensors and the simulated
+    chat model read the environment at the bot's location, and survivors are
+    rescued when a rescue mission reaches them. An hour-long incident with
+    thousands of bots runs in minutes of wall-clock time.
+    """
+
+    def __init__(self, config: EnvironmentConfig):
+        self.config = config
+        self.clock = VirtualClock(config["start_time"])
+        self.environment = Environment(config)
+        self.end_time = self.clock.now + float(config["duration_seconds"])
+        self._events: List[tuple] = []
+        self._sequence = itertools.count()
+        self._job_stats: Dict[str, Dict[str, Any]] = {}
+        self.redis_utils: Optional[RedisUtils] = None
+        self.gateway = None
+
+    def _schedule(self, due: float, handler: Callable[..., None], *args: Any) -> None:
+        heapq.heappush(self._events, (due, next(self._sequence), handler, args))
+
+    def _configure_backends(self) -> None:
+        """Point Redis and the chat model at the configured stand-ins before any agent is built."""
+        backends = self.config["backends"]
+        os.environ[LLM_CACHE_BYPASS_ENV] = "false" if self.config["llm_cache"] else "true"
+        os.environ[COMMAND_SYSTEM_INCREMENTAL_ENV] = "true" if self.config["incremental_decisions"] else "false"
+        os.environ[DATA_AGGREGATOR_BATCH_MODE_ENV] = "true" if self.config["batch_mode"] else "false"
+
+        use_redis(backends["redis"])
+        RedisUtils.set_task_sink(self._enqueue)
+        self.redis_utils = RedisUtils()
+
+        from src.utils.llm_gateway import LLMGateway
+        if backends["llm"] == "simulated":
+            from simulation.simulated_llm import SimulatedChatModel
+            # Responses are instant, so the gateway's limits would only throttle the run
+            self.gateway = LLMGateway.configure(
+                SimulatedChatModel(self.environment, self.clock),
+                max_concurrency=64,
+                requests_per_second=1e6,
+                burst=1000000,
+            )
+        else:
+            self.gateway = LLMGateway.get_instance()
+
+    def _enqueue(self, task_type: str, task_data: Dict[str, Any], delay_seconds: float) -> bool:
+        """Task sink: turn an enqueued task into an event, after the bot's travel time for a new mission."""
+        # Jobs are serialized by RQ, so later changes by the caller must not leak into them
+        task_data = copy.deepcopy(task_data)
+        if task_type in BOT_TASK_TYPES and "mission" not in task_data:
+            delay_seconds += self._travel_seconds(task_data)
+        self._schedule(self.clock.now + delay_seconds, self._run_job, task_type, task_data)
+        return True
+
+    def _travel_seconds(self, allocation: Dict[str, Any]) -> float:
+        bot = self.redis_utils.get_bot_metadata(str(allocation.get("bot_id")))
+        target = allocation.get("target_location") or {}
+        if not bot or "lat" not in target:
+            return 0.0
+        distance = distance_meters(float(bot["lat"]), float(bot["long"]), float(target["lat"]), float(target["long"]))
+        return float(distance / 1000 / bot_speeds([bot])[0] * 3600)
+
+    def _arrive(self, allocation: Dict[str, Any]) -> None:
+        """Move a bot to its target, draining its battery, and apply what it finds there."""
+        from src.utils.bot_registry import BotRegistry
+
+        bot_id = str(allocation.get("bot_id"))
+        bot = self.redis_utils.get_bot_metadata(bot_id)
+        target = allocation.get("target_location") or {}
+        if not bot or "lat" not in target:
+            return
+        lat, long = float(target["lat"]), float(target["long"])
+        spec = self.config["fleet"].get(bot["bot_type"], {})
+        distance_km = distance_meters(float(bot["lat"]), float(bot["long"]), lat, long) / 1000
+        battery = max(0.0, float(bot.get("battery_level") or 0) - distance_km * float(spec.get("battery_per_km", 0)))
+
+        self.redis_utils.update_bot_fields(bot_id, {"lat": lat, "long": long, "battery_level": round(battery, 1)})
+        BotRegistry.get_instance().invalidate(bot_id)
+
+        if bot["bot_type"] == "ground_bot":
+            allocation["sensor_scenario"] = self.environment.sensor_scenario(lat, long, self.clock.now)
+            if allocation.get("task_type") in RESCUE_TASK_TYPES:
+                self.environment.rescue(lat, long, self.clock.now)
+
+    def _run_job(self, task_type: str, task_data: Dict[str, Any]) -> None:
+        from src.workers.main_worker import process_task
+
+        if task_type in BOT_TASK_TYPES and "mission" not in task_data:
+            self._arrive(task_data)
+
+        started_at = time.perf_counter()
+        success = process_task(task_data, task_type)
+        elapsed = time.perf_counter() - started_at
+
+        stats = self._job_stats.setdefault(task_type, {"count": 0, "failed": 0, "wall_seconds": 0.0, "wall_seconds_max": 0.0})
+        stats["count"] += 1
+        stats["failed"] += 0 if success else 1
+        stats["wall_seconds"] += elapsed
+        stats["wall_seconds_max"] = max(stats["wall_seconds_max"], elapsed)
+
+    def _tick(self) -> None:
+        """Let the world evolve: survivors and bystanders report what they see."""
+        for report in self.environment.human_reports(self.clock.now):
+            report["timestamp"] = datetime.fromtimestamp(self.clock.now).isoformat()
+            self.redis_utils.enqueue_task("data_aggregator", report)
+        next_tick = self.clock.now + float(self.config["tick_seconds"])
+        if next_tick < self.end_time:
+            self._schedule(next_tick, self._tick)
+
+    def _setup(self) -> None:
+        self._configure_backends()
+        fleet = self.environment.fleet()
+        for bot in fleet:
+            self.redis_utils.set_bot_metadata(bot["bot_id"], bot)
+        logger.info(f"Registered {len(fleet)} bots, {len(self.environment.fires)} fires, {len(self.environment.survivors)} survivors")
+        self._schedule(self.clock.now, self._tick)
+
+    def run(self) -> Dict[str, Any]:
+        """Run the scenario to its end and return the report."""
+        wall_started_at = time.perf_counter()
+        patches = [mock.patch("time.time", self.clock.time)] + [
+            mock.patch(f"{module}.datetime", self.clock.datetime_class())
+            for module in VIRTUAL_DATETIME_MODULES
+        ]
+        for patch in patches:
+            patch.start()
+        try:
+            self._setup()
+            events = 0
+            while self._events and self._events[0][0] <= self.end_time:
+                due, _, handler, args = heapq.heappop(self._events)
+                self.clock.advance_to(due)
+                handler(*args)
+                events += 1
+            return self.report(events, time.perf_counter() - wall_started_at)
+        finally:
+            for patch in reversed(patches):
+                patch.stop()
+            RedisUtils.set_task_sink(None)
+
+    @staticmethod
+    def _mean(values: List[float]) -> Optional[float]:
+        return round(sum(values) / len(values), 1) if values else None
+
+    def report(self, events: int, wall_seconds: float) -> Dict[str, Any]:
+        """Machine-readable summary of the run."""
+        survivors = self.environment.survivors
+        start = self.environment.start_time
+        virtual_seconds = self.clock.now - start
+        return {
+            "virtual_seconds": round(virtual_seconds, 1),
+            "wall_seconds": round(wall_seconds, 2),
+            "speedup": round(virtual_seconds / wall_seconds, 1) if wall_seconds else None,
+            "events": events,
+            "pending_events": len(self._events),
+            "jobs": {
+                task_type: {
+                    "count": stats["count"],
+                    "failed": stats["failed"],
+                    "wall_ms_mean": round(stats["wall_seconds"] / stats["count"] * 1000, 2),
+                    "wall_ms_max": round(stats["wall_seconds_max"] * 1000, 2),
+                }
+                for task_type, stats in sorted(self._job_stats.items())
+            },
+            "llm": self.gateway.get_metrics()["families"] if self.gateway else {},
+            "fleet": {
+                "bots": len(self.redis_utils.get_bot_ids()),
+                "in_mission": len(self.redis_utils.get_bot_ids_by_status("in_mission")),
+            },
+            "incidents": self.redis_utils.redis_client.zcard(RedisKeys.INCIDENTS_RECENT.value),
+            "fires": [
+                {"fire_id": fire.fire_id, "radius_meters": round(fire.radius_at(self.clock.now), 1)}
+                for fire in self.environment.fires
+            ],
+            "survivors": {
+                "total": len(survivors),
+                "reported": sum(survivor.reported_at is not None for survivor in survivors),
+                "detected": sum(survivor.detected_at is not None for survivor in survivors),
+                "rescued": sum(survivor.rescued_at is not None for survivor in survivors),
+                "mean_seconds_to_detect": self._mean([survivor.detected_at - start for survivor in survivors if survivor.detected_at is not None]),
+                "mean_seconds_to_rescue": self._mean([survivor.rescued_at - start for survivor in survivors if survivor.rescued_at is not None]),
+            },
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a simulated incident through the agents on a virtual clock")
+    parser.add_argument("--config", default="datasets/sensor_data_samples/simulation1.config", help="Scenario file (JSON)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--log-level", default="WARNING", help="Agent log level; INFO logs every step of every job")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Agents log to files at DEBUG regardless of handler levels, so filter globally
+    logging.disable(getattr(logging, args.log_level.upper()) - 1)
+
+    report = Simulation(EnvironmentConfig.from_file(args.config)).run()
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
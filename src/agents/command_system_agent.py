@@ -1,22 +1,46 @@
 import json
 import logging
 import requests
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 import os
 import base64
+import time
+import uuid
 from src.utils.redis import RedisUtils
-from src.utils.llm import LLMSingleton
-from src.constants import DataSourceType, DataType, RedisKeys, QueueNames
+from src.utils.llm_gateway import LLMGateway
+from src.utils.incident_clusterer import IncidentClusterer
+from src.utils.command_scheduler import CommandScheduler
+from src.constants import (
+    DataSourceType,
+    DataType,
+    RedisKeys,
+    QueueNames,
+    LLMPriority,
+    COMMAND_SYSTEM_INCREMENTAL_ENV,
+    EVENT_RETENTION_SECONDS,
+)
 from time import sleep
 from src.utils.logging_utils import LoggerSetup
 
 class CommandSystemAgent:
-    def __init__(self, session_id: Optional[str] = None):
-        """Initialize CommandSystemAgent with Redis connection and LLM setup."""
+    SUMMARY_TASK_FIELDS = ["task_id", "task_type", "priority", "lat", "long", "context"]
+
+    def __init__(self, session_id: Optional[str] = None, incremental: Optional[bool] = None):
+        """Initialize CommandSystemAgent with Redis connection and LLM setup.
+
+        With incremental enabled, area decisions only send incidents that changed since
+        the area's previous decision, plus a summary of that decision, and apply the
+        returned diff of added, updated and cancelled tasks.
+        """
         self.redis_utils = RedisUtils()
-        self.llm = LLMSingleton.get_instance()
+        self.llm = LLMGateway.get_instance()
+        self.incident_clusterer = IncidentClusterer(self.redis_utils)
+        self.command_scheduler = CommandScheduler(self.redis_utils)
         self.logger = LoggerSetup.get_logger(session_id=session_id, name=__name__)
+        if incremental is None:
+            incremental = os.getenv(COMMAND_SYSTEM_INCREMENTAL_ENV, "false").lower() in ("1", "true", "yes")
+        self.incremental = incremental
 
     def _get_prompt_template(self, data_type: str) -> Optional[str]:
         """Read and prepare the prompt template based on data type."""
@@ -42,20 +66,41 @@ class CommandSystemAgent:
         """Process the data and return a boolean value."""
         self.logger.info("[COMMAND SYSTEM AGENT] Starting to process command system data")
         # self.logger.debug(f"[COMMAND SYSTEM AGENT] Input data: {json.dumps(task_data, indent=4)}")
-        
-        events = task_data.get("events")
-        self.logger.info(f"[COMMAND SYSTEM AGENT] Processing {len(events)} events")
 
+        area = task_data.get("area")
+        if area is None:
+            # Incident summaries or raw events sent directly
+            if "incidents" in task_data:
+                payload = {"incidents": task_data.get("incidents")}
+                self.logger.info(f"[COMMAND SYSTEM AGENT] Processing {len(payload['incidents'])} incidents")
+            else:
+                payload = {"events": task_data.get("events")}
+                self.logger.info(f"[COMMAND SYSTEM AGENT] Processing {len(payload['events'])} events")
+            return self._decide(payload)
+
+        # Scheduled decision for an area: read its incidents now, so coalesced triggers are included
+        self.command_scheduler.begin(area)
+        try:
+            if self.incremental:
+                return self._decide_incremental(area, task_data["lat"], task_data["lon"])
+            incidents = self.incident_clusterer.nearby(task_data["lat"], task_data["lon"])
+            self.logger.info(f"[COMMAND SYSTEM AGENT] Processing {len(incidents)} incidents in area {area}")
+            return self._decide({"incidents": incidents})
+        finally:
+            self.command_scheduler.finish(area)
+
+    def _decide(self, payload: Dict[str, Any]) -> bool:
+        """Ask the LLM for tasks for the given situation and forward them to the task allocator."""
         prompt_template = self._get_prompt_template("command_system")
         if not prompt_template:
             self.logger.error("[COMMAND SYSTEM AGENT] Failed to get prompt template")
             return False
 
-        prompt = self._replace_payload_in_prompt(prompt_template, {"events": events})
+        prompt = self._replace_payload_in_prompt(prompt_template, payload)
         # self.logger.debug(f"[COMMAND SYSTEM AGENT] Generated prompt: {prompt}")
 
         self.logger.info("[COMMAND SYSTEM AGENT] Invoking LLM")
-        response = self.llm.invoke(prompt)
+        response = self.llm.invoke(prompt, priority=LLMPriority.HIGH, family="command_system")
         self.logger.debug(f"[COMMAND SYSTEM AGENT] LLM Response: {json.dumps(json.loads(response.content), indent=4)}")
 
         task_allocator_payload = json.loads(response.content)
@@ -72,3 +117,118 @@ class CommandSystemAgent:
         self.logger.info("[COMMAND SYSTEM AGENT] Processing completed successfully")
         return True
 
+
+    def _decision_key(self, area: str) -> str:
+        return f"{RedisKeys.COMMAND_AREA_DECISION.value}:{area}"
+
+    def _get_decision_state(self, area: str) -> Dict[str, Any]:
+        """Load an area's previous decision, or an empty one."""
+        state = self.redis_utils.redis_client.get(self._decision_key(area))
+        if state:
+            return json.loads(state)
+        return {"decided_at": 0, "tasks": [], "summary": {}}
+
+    def _situation_summary(self, incidents: List[Dict[str, Any]], risk_level: Optional[str]) -> Dict[str, Any]:
+        """Compact summary of all incidents in an area, sent instead of the incidents themselves."""
+        hazards = {}
+        for incident in incidents:
+            for hazard_type, finding in incident.get("hazards", {}).items():
+                hazards[hazard_type] = max(hazards.get(hazard_type, 0.0), finding.get("confidence", 0.0))
+        return {
+            "incident_count": len(incidents),
+            "observation_count": sum(incident.get("observation_count", 0) for incident in incidents),
+            "hazards": {hazard_type: round(confidence, 2) for hazard_type, confidence in hazards.items()},
+            "survivors": sum(incident.get("survivors", {}).get("count", 0) for incident in incidents),
+            "risk_level": risk_level,
+        }
+
+    def _apply_task_diff(self, area: str, tasks: List[Dict[str, Any]], diff: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[str]]:
+        """Apply an added/updated/cancelled diff, returning the active tasks, the changed tasks and the cancelled ids."""
+        active = {task["task_id"]: task for task in tasks}
+
+        cancelled = [task_id for task_id in diff.get("cancelled") or [] if active.pop(task_id, None) is not None]
+
+        changed = []
+        for update in diff.get("updated") or []:
+            task_id = update.get("task_id")
+            if task_id not in active:
+                self.logger.warning(f"[COMMAND SYSTEM AGENT] Ignoring update of unknown task {task_id}")
+                continue
+            active[task_id] = {**active[task_id], **update}
+            changed.append(active[task_id])
+
+        for task in diff.get("added") or []:
+            if not task.get("task_id") or task["task_id"] in active:
+                task["task_id"] = f"{area}-{uuid.uuid4().hex[:8]}"
+            active[task["task_id"]] = task
+            changed.append(task)
+
+        return list(active.values()), changed, cancelled
+
+    def _decide_incremental(self, area: str, lat: float, lon: float) -> bool:
+        """Decide on an area from the incidents that changed since its previous decision."""
+        decided_at = time.time()
+        state = self._get_decision_state(area)
+        incidents = self.incident_clusterer.nearby(lat, lon)
+        new_incidents = [incident for incident in incidents if incident.get("last_seen", 0) > state["decided_at"]]
+
+        if not new_incidents:
+            self.logger.info(f"[COMMAND SYSTEM AGENT] No incidents changed in area {area} since the last decision")
+            return True
+        self.logger.info(f"[COMMAND SYSTEM AGENT] Processing {len(new_incidents)} of {len(incidents)} incidents in area {area}")
+
+        prompt_template = self._get_prompt_template("command_system_delta")
+        if not prompt_template:
+            self.logger.error("[COMMAND SYSTEM AGENT] Failed to get prompt template")
+            return False
+
+        payload = {
+            "summary": state["summary"],
+            "active_tasks": [
+                {field: task.get(field) for field in self.SUMMARY_TASK_FIELDS}
+                for task in state["tasks"]
+            ],
+            "new_incidents": new_incidents,
+        }
+        prompt = self._replace_payload_in_prompt(prompt_template, payload)
+
+        self.logger.info("[COMMAND SYSTEM AGENT] Invoking LLM")
+        response = self.llm.invoke(prompt, priority=LLMPriority.HIGH, family="command_system")
+        diff = json.loads(response.content)
+
+        previous_ids = {task["task_id"] for task in state["tasks"]}
+        tasks, changed, cancelled = self._apply_task_diff(area, state["tasks"], diff)
+        updated = [task["task_id"] for task in changed if task["task_id"] in previous_ids]
+        self.logger.info(
+            f"[COMMAND SYSTEM AGENT] Area {area}: {len(changed) - len(updated)} added, "
+            f"{len(updated)} updated, {len(cancelled)} cancelled"
+        )
+
+        new_state = {
+            "decided_at": decided_at,
+            "tasks": tasks,
+            "summary": self._situation_summary(
+                incidents,
+                (diff.get("metadata") or {}).get("risk_level") or state["summary"].get("risk_level")
+            ),
+        }
+        if changed or cancelled:
+            # The allocator frees the bots of updated and cancelled tasks before allocating
+            self.logger.info("[COMMAND SYSTEM AGENT] Forwarding changed tasks to Task Allocator")
+            enqueued = self.redis_utils.enqueue_task(
+                "task_allocator",
+                {"tasks": changed, "updated": updated, "cancelled": cancelled, "metadata": diff.get("metadata")}
+            )
+            if not enqueued:
+                # Keeping the previous state makes the next decision see these incidents again
+                self.logger.error(f"[COMMAND SYSTEM AGENT] Failed to forward tasks of area {area}, decision state not stored")
+                return False
+
+        self.logger.info("[COMMAND SYSTEM AGENT] Storing decision state in Redis")
+        pipe = self.redis_utils.redis_client.pipeline()
+        pipe.set(self._decision_key(area), json.dumps(new_state), ex=EVENT_RETENTION_SECONDS)
+        pipe.set(RedisKeys.COMMAND_SYSTEM_RESPONSE.value, response.content)
+        pipe.execute()
+
+        self.logger.info("[COMMAND SYSTEM AGENT] Processing completed successfully")
+        return True
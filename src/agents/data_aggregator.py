@@ -1,24 +1,85 @@
 import json
 import logging
 import requests
-from typing import Dict, Any, Optional, List
-from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
 import os
 import base64
 from src.utils.redis import RedisUtils
-from src.utils.llm import LLMSingleton
-from src.constants import DataSourceType, DataType, RedisKeys, QueueNames
+from src.utils.llm_gateway import LLMGateway
+from src.utils.llm_cache import LLMResponseCache
+from src.utils.image_hash import ImageDeduplicator
+from src.utils.gas_rules import GasSensorRuleEngine
+from src.utils.event_store import EventStore
+from src.utils.incident_clusterer import IncidentClusterer
+from src.utils.command_scheduler import CommandScheduler
+from src.utils.blob_store import BlobStore
+from src.constants import (
+    DataSourceType,
+    DataType,
+    RedisKeys,
+    QueueNames,
+    LLMPriority,
+    DATA_AGGREGATOR_BATCH_MODE_ENV,
+    DATA_AGGREGATOR_BATCH_MAX_WAIT_MS,
+    DATA_AGGREGATOR_BATCH_MAX_ITEMS,
+)
 from time import sleep
 from src.utils.logging_utils import LoggerSetup
 
 class DataAggregator:
-    def __init__(self, session_id: Optional[str] = None):
-        """Initialize DataAggregator with Redis connection and LLM setup."""
+    IMAGE_FIELDS = {
+        DataType.IMAGE.value: "image_base64",
+        DataType.THERMAL_IMAGE.value: "thermal_image_base64",
+    }
+    # Claim-check alternative to the inline fields: the digest of the image in the blob store
+    BLOB_FIELDS = {
+        DataType.IMAGE.value: "image_blob",
+        DataType.THERMAL_IMAGE.value: "thermal_image_blob",
+    }
+    # Raw bytes of a blob image, kept next to its base64 form while an observation is processed
+    IMAGE_BYTES_FIELD = "_image_bytes"
+    LLM_PRIORITIES = {
+        DataType.HUMAN_REPORT.value: LLMPriority.HIGH,
+        DataType.IMAGE.value: LLMPriority.NORMAL,
+        DataType.THERMAL_IMAGE.value: LLMPriority.NORMAL,
+        DataType.GAS_SENSOR.value: LLMPriority.LOW,
+    }
+    BATCHABLE_DATA_TYPES = [
+        DataType.IMAGE.value,
+        DataType.THERMAL_IMAGE.value,
+        DataType.HUMAN_REPORT.value,
+        DataType.GAS_SENSOR.value,
+    ]
+
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        batch_mode: Optional[bool] = None,
+        batch_max_wait_ms: int = DATA_AGGREGATOR_BATCH_MAX_WAIT_MS,
+        batch_max_items: int = DATA_AGGREGATOR_BATCH_MAX_ITEMS,
+    ):
+        """Initialize DataAggregator with Redis connection and LLM setup.
+
+        With batch_mode enabled, observations of the same data type are collected
+        for up to batch_max_wait_ms or batch_max_items and interpreted in one LLM call.
+        """
         self.redis_utils = RedisUtils()
-        self.llm = LLMSingleton.get_instance()
+        self.llm = LLMGateway.get_instance()
+        self.llm_cache = LLMResponseCache(self.redis_utils)
+        self.image_deduplicator = ImageDeduplicator(self.redis_utils)
+        self.gas_rule_engine = GasSensorRuleEngine()
+        self.event_store = EventStore(self.redis_utils)
+        self.incident_clusterer = IncidentClusterer(self.redis_utils)
+        self.command_scheduler = CommandScheduler(self.redis_utils)
+        self.blob_store = BlobStore(self.redis_utils)
         self.weather_api_key = os.getenv("OPENWEATHER_API_KEY")
         self.weather_api_url = "http://api.openweathermap.org/data/2.5/weather"
         self.logger = LoggerSetup.get_logger(session_id=session_id, name=__name__)
+        if batch_mode is None:
+            batch_mode = os.getenv(DATA_AGGREGATOR_BATCH_MODE_ENV, "false").lower() in ("1", "true", "yes")
+        self.batch_mode = batch_mode
+        self.batch_max_wait_ms = batch_max_wait_ms
+        self.batch_max_items = batch_max_items
 
     def _get_prompt_template(self, data_type: str) -> Optional[str]:
         """Read and prepare the prompt template based on data type."""
@@ -40,6 +101,106 @@ class DataAggregator:
             self.logger.error(f"[DATA AGGREGATOR] Error replacing payload in prompt: {str(e)}")
             return ""
 
+    def _gas_readings(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Gas readings arrive as gas_levels, or as sensor_data from ground bots."""
+        return data.get("gas_levels") or data.get("sensor_data")
+
+    def _resolve_images(self, data: Dict[str, Any], data_type: str) -> Dict[str, Any]:
+        """Load a claim-checked image from the blob store into a copy of the observation.
+
+        The bytes are read once and base64 encoded once, here at the point of use.
+        """
+        blob_field = self.BLOB_FIELDS.get(data_type)
+        if not blob_field or not data.get(blob_field) or data.get(self.IMAGE_FIELDS[data_type]):
+            return data
+        image_bytes = self.blob_store.get(data[blob_field])
+        if image_bytes is None:
+            self.logger.error(f"[DATA AGGREGATOR] Image blob {data[blob_field]} is missing")
+            return data
+        return {
+            **data,
+            self.IMAGE_FIELDS[data_type]: base64.b64encode(image_bytes).decode("utf-8"),
+            self.IMAGE_BYTES_FIELD: image_bytes,
+        }
+
+    def _release_blobs(self, data: Dict[str, Any]) -> None:
+        """Give back the blob references an observation was sent with."""
+        for blob_field in self.BLOB_FIELDS.values():
+            if data.get(blob_field):
+                self.blob_store.release(data[blob_field])
+
+    def _cache_payload(self, data: Dict[str, Any], data_type: str) -> Dict[str, Any]:
+        """Select the parts of an observation that determine its interpretation."""
+        if data_type == DataType.HUMAN_REPORT.value:
+            return {"human_report": data.get("report"), "lat": data.get("lat"), "long": data.get("long")}
+        if data_type == DataType.GAS_SENSOR.value:
+            return {"gas_levels": self._gas_readings(data)}
+        if data_type in self.IMAGE_FIELDS:
+            # A blob digest already identifies the image content
+            blob_field = self.BLOB_FIELDS[data_type]
+            if data.get(blob_field):
+                return {blob_field: data.get(blob_field)}
+            image_field = self.IMAGE_FIELDS[data_type]
+            return {image_field: data.get(image_field)}
+        return {}
+
+    def _lookup_known_interpretation(self, data: Dict[str, Any], data_type: str, prompt_template: str) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        """Find an interpretation from the gas rule engine, a near-duplicate frame or the response cache.
+
+        Returns the interpretation (or None) together with the image hash, so the
+        caller can index the frame once it has been interpreted.
+        """
+        if data_type == DataType.GAS_SENSOR.value:
+            rule_interpretation = self.gas_rule_engine.evaluate(self._gas_readings(data))
+            if rule_interpretation is not None:
+                self.logger.info("[DATA AGGREGATOR] Gas sensor readings interpreted by rule engine")
+                return rule_interpretation, None
+
+        bypass_cache = bool(data.get("bypass_cache"))
+        image_hash = None
+        if data_type in self.IMAGE_FIELDS and not bypass_cache:
+            image_hash = self.image_deduplicator.compute_hash(
+                data.get(self.IMAGE_BYTES_FIELD) or data.get(self.IMAGE_FIELDS[data_type])
+            )
+            duplicate = self.image_deduplicator.find_duplicate(data_type, image_hash, data.get("lat"), data.get("long"))
+            if duplicate is not None:
+                self.logger.info(f"[DATA AGGREGATOR] Skipping LLM call for near-duplicate {data_type}")
+                return duplicate, image_hash
+
+        cache_key = self.llm_cache.build_key(data_type, prompt_template, self._cache_payload(data, data_type))
+        cached_response = self.llm_cache.get(cache_key, data_type, bypass=bypass_cache)
+        if cached_response is not None:
+            self.logger.info(f"[DATA AGGREGATOR] LLM cache hit for {data_type}")
+        return cached_response, image_hash
+
+    def _remember_interpretation(self, data: Dict[str, Any], data_type: str, prompt_template: str, processed_data: Dict[str, Any], image_hash: Optional[int]) -> None:
+        """Store a fresh interpretation in the response cache and the near-duplicate index."""
+        if not processed_data:
+            return
+        bypass_cache = bool(data.get("bypass_cache"))
+        cache_key = self.llm_cache.build_key(data_type, prompt_template, self._cache_payload(data, data_type))
+        self.llm_cache.set(cache_key, data_type, processed_data, bypass=bypass_cache)
+        if data_type in self.IMAGE_FIELDS:
+            self.image_deduplicator.remember(data_type, image_hash, data.get("lat"), data.get("long"), processed_data)
+
+    def _interpret(self, data: Dict[str, Any], data_type: str, prompt_template: str, prompt: str) -> Optional[Dict[str, Any]]:
+        """Invoke the LLM for a prompt unless the observation was already interpreted."""
+        known_interpretation, image_hash = self._lookup_known_interpretation(data, data_type, prompt_template)
+        if known_interpretation is not None:
+            return known_interpretation
+
+        self.logger.info(f"[DATA AGGREGATOR] Invoking LLM for {data_type} processing")
+        response = self.llm.invoke(
+            prompt,
+            priority=self.LLM_PRIORITIES.get(data_type, LLMPriority.NORMAL),
+            family=data_type
+        )
+        processed_data = json.loads(response.content)
+        self.logger.debug(f"[DATA AGGREGATOR] LLM Response: {json.dumps(processed_data, indent=4)}")
+
+        self._remember_interpretation(data, data_type, prompt_template, processed_data, image_hash)
+        return processed_data
+
     def _process_image_data(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         try:
             self.logger.info("[DATA AGGREGATOR] Processing image data")
@@ -73,11 +234,7 @@ class DataAggregator:
             prompt = json.dumps(payload, indent=4, ensure_ascii=False, default=str)
             # self.logger.debug(f"[DATA AGGREGATOR] Generated prompt: {prompt}")
 
-            self.logger.info("[DATA AGGREGATOR] Invoking LLM for image processing")
-            response = self.llm.invoke(prompt)
-            self.logger.debug(f"[DATA AGGREGATOR] LLM Response: {json.dumps(json.loads(response.content), indent=4)}")
-            
-            return json.loads(response.content)
+            return self._interpret(data, DataType.IMAGE.value, prompt_template, prompt)
         except Exception as e:
             self.logger.error(f"[DATA AGGREGATOR] Error processing image data: {str(e)}")
             return None
@@ -118,11 +275,7 @@ class DataAggregator:
             prompt = json.dumps(payload, indent=4, ensure_ascii=False, default=str)
             # self.logger.debug(f"[DATA AGGREGATOR] Generated prompt: {prompt}")
             
-            self.logger.info("[DATA AGGREGATOR] Invoking LLM for thermal image processing")
-            response = self.llm.invoke(prompt)
-            self.logger.debug(f"[DATA AGGREGATOR] LLM Response: {json.dumps(json.loads(response.content), indent=4)}")
-            
-            return json.loads(response.content)
+            return self._interpret(data, DataType.THERMAL_IMAGE.value, prompt_template, prompt)
         
         except Exception as e:
             self.logger.error(f"[DATA AGGREGATOR] Error processing thermal image data: {str(e)}")
@@ -155,11 +308,7 @@ class DataAggregator:
                 return None
 
             # self.logger.debug(f"[DATA AGGREGATOR] Generated prompt: {prompt}")
-            self.logger.info("[DATA AGGREGATOR] Invoking LLM for human report processing")
-            response = self.llm.invoke(prompt)
-            self.logger.debug(f"[DATA AGGREGATOR] LLM Response: {json.dumps(json.loads(response.content), indent=4)}")
-            
-            return json.loads(response.content)
+            return self._interpret(data, DataType.HUMAN_REPORT.value, prompt_template, prompt)
         except Exception as e:
             self.logger.error(f"[DATA AGGREGATOR] Error processing human report: {str(e)}")
             return None
@@ -172,7 +321,7 @@ class DataAggregator:
                 return None
 
             payload = {
-                "gas_levels": data.get("gas_levels"),
+                "gas_levels": self._gas_readings(data),
                 "context": {
                     "lat": data.get("lat"),
                     "long": data.get("long"),
@@ -186,11 +335,7 @@ class DataAggregator:
                 return None
 
             # self.logger.debug(f"[DATA AGGREGATOR] Generated prompt: {prompt}")
-            self.logger.info("[DATA AGGREGATOR] Invoking LLM for gas sensor data processing")
-            response = self.llm.invoke(prompt)
-            self.logger.debug(f"[DATA AGGREGATOR] LLM Response: {json.dumps(json.loads(response.content), indent=4)}")
-
-            return json.loads(response.content)
+            return self._interpret(data, DataType.GAS_SENSOR.value, prompt_template, prompt)
         except Exception as e:
             self.logger.error(f"[DATA AGGREGATOR] Error processing gas sensor data: {str(e)}")
             return None
@@ -218,49 +363,196 @@ class DataAggregator:
         """Store event data in Redis with geospatial indexing."""
         try:
             self.logger.info("[DATA AGGREGATOR] Storing event data")
-            event_id = f"event:{datetime.now().timestamp()}"
-            self.redis_utils.redis_client.set(event_id, json.dumps(event_data))
-            
             # self.logger.debug(f"[DATA AGGREGATOR] Event data: {json.dumps(event_data, indent=4)}")
 
-            self.logger.info("[DATA AGGREGATOR] Adding to geospatial index")
-            self.redis_utils.redis_client.geoadd(
-                RedisKeys.EVENTS_BY_LOCATION.value,
-                [ event_data["lon"], event_data["lat"], event_id]
-            )
-            self.logger.info("[DATA AGGREGATOR] Successfully added event data to geospatial index")
+            event_id = self.event_store.store(event_data)
+            if not event_id:
+                return False
+            self.logger.info(f"[DATA AGGREGATOR] Successfully stored {event_id} in the geospatial index")
 
+            self.event_store.request_compaction()
             return True
         except Exception as e:
             self.logger.error(f"[DATA AGGREGATOR] Error storing event: {str(e)}")
             return False
 
-    def _get_nearby_events(self, lat: float, lon: float, radius: float = 1.0) -> List[Dict[str, Any]]:
-        """Get events within a specified radius of coordinates."""
+    def _forward_event(self, data: Dict[str, Any], processed_data: Dict[str, Any]) -> bool:
+        """Store an interpreted observation, merge it into its incident and trigger the command system for its area."""
+        event_data = {
+            "source": data.get("source"),
+            "timestamp": data.get("timestamp"),
+            "lat": data.get("lat"),
+            "lon": data.get("long"),
+            "data_type": data.get("data_type"),
+            "processed_data": processed_data
+        }
+        
+        self.logger.debug(f"[DATA AGGREGATOR] Event data: {json.dumps(event_data, indent=4)}")
+        
+        if not self._store_event(event_data):
+            self.logger.error("[DATA AGGREGATOR] Failed to store event")
+            return False
+
+        incident, changed = self.incident_clusterer.add_event(event_data)
+        if incident is None and not changed:
+            self.logger.warning("[DATA AGGREGATOR] Event could not be clustered, not forwarding to command system")
+            return True
+        if not changed:
+            self.logger.info(f"[DATA AGGREGATOR] Incident {incident['incident_id']} unchanged, not forwarding to command system")
+            return True
+
+        # The command system reads the area's incidents when the decision runs
+        self.logger.info("[DATA AGGREGATOR] Triggering command system for the event's area")
+        self.command_scheduler.trigger(float(data.get("lat")), float(data.get("long")))
+        return True
+
+    def _batch_key(self, data_type: str) -> str:
+        return f"{RedisKeys.DATA_AGGREGATOR_BATCH.value}:{data_type}"
+
+    def _add_to_batch(self, data: Dict[str, Any], data_type: str) -> bool:
+        """Queue an observation for batched interpretation, flushing when the batch is full."""
+        try:
+            batch_size = self.redis_utils.redis_client.rpush(self._batch_key(data_type), json.dumps(data, default=str))
+            self.logger.info(f"[DATA AGGREGATOR] Added {data_type} observation to batch ({batch_size}/{self.batch_max_items})")
+
+            if batch_size >= self.batch_max_items:
+                return self.flush_batch(data_type)
+
+            if batch_size == 1:
+                # First observation of a new batch starts the wait window
+                self.redis_utils.enqueue_task_in(
+                    "data_aggregator_flush",
+                    {"data_type": data_type},
+                    self.batch_max_wait_ms / 1000
+                )
+            return True
+        except Exception as e:
+            self.logger.error(f"[DATA AGGREGATOR] Error adding observation to batch: {str(e)}")
+            return False
+
+    def _observation_payload(self, data: Dict[str, Any], data_type: str) -> Dict[str, Any]:
+        """Build the per-observation entry of a batched prompt."""
+        if data_type in self.IMAGE_FIELDS:
+            image_field = self.IMAGE_FIELDS[data_type]
+            payload = {image_field: data.get(image_field)}
+        else:
+            payload = self._cache_payload(data, data_type)
+        payload["context"] = {
+            "lat": data.get("lat"),
+            "long": data.get("long"),
+            "timestamp": data.get("timestamp"),
+            "source": data.get("source")
+        }
+        return payload
+
+    def _interpret_batch(self, data_type: str, prompt_template: str, observations: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Interpret several observations with one LLM call, returning interpretations by index."""
         try:
-            self.logger.info(f"[DATA AGGREGATOR] Getting nearby events for coordinates: {lat}, {lon}")
-            event_ids = self.redis_utils.redis_client.geosearch(
-                RedisKeys.EVENTS_BY_LOCATION.value,
-                longitude=lon,
-                latitude=lat,
-                radius=radius,
-                unit="km"
+            batch_template = self._get_prompt_template("batch")
+            if not batch_template:
+                return {}
+
+            instructions = prompt_template.replace("<replace_payload>", "(each observation listed in the batch input)")
+            batch_prompt = batch_template.replace("<replace_instructions>", instructions)
+            batch_prompt = batch_prompt.replace("<replace_count>", str(len(observations)))
+            prompt = self._replace_payload_in_prompt(batch_prompt, {
+                "observations": [
+                    {"index": index, **self._observation_payload(observation, data_type)}
+                    for index, observation in enumerate(observations)
+                ]
+            })
+            if not prompt:
+                return {}
+
+            self.logger.info(f"[DATA AGGREGATOR] Invoking LLM for batch of {len(observations)} {data_type} observations")
+            response = self.llm.invoke(
+                prompt,
+                priority=self.LLM_PRIORITIES.get(data_type, LLMPriority.NORMAL),
+                family=data_type
             )
+            results = json.loads(response.content).get("results", [])
+            self.logger.debug(f"[DATA AGGREGATOR] Batch LLM Response: {json.dumps(results, indent=4)}")
 
-            events = []
-            for event_id in event_ids:
-                event_data = self.redis_utils.redis_client.get(event_id)
-                if event_data:
-                    events.append(json.loads(event_data))
+            return {
+                int(result["index"]): result["interpretation"]
+                for result in results
+                if isinstance(result, dict) and "index" in result and result.get("interpretation")
+            }
+        except Exception as e:
+            self.logger.error(f"[DATA AGGREGATOR] Error interpreting {data_type} batch: {str(e)}")
+            return {}
+
+    def flush_batch(self, data_type: str) -> bool:
+        """Interpret all observations waiting in the batch for a data type."""
+        success = True
+        try:
+            while True:
+                raw_items = self.redis_utils.redis_client.lpop(self._batch_key(data_type), self.batch_max_items)
+                if not raw_items:
+                    break
 
-            self.logger.debug(f"[DATA AGGREGATOR] Found {len(events)} nearby events")
-            return events
+                observations = [json.loads(item) for item in raw_items]
+                self.logger.info(f"[DATA AGGREGATOR] Flushing batch of {len(observations)} {data_type} observations")
+                try:
+                    success = self._process_batch(data_type, observations) and success
+                finally:
+                    for observation in observations:
+                        self._release_blobs(observation)
+
+                if len(raw_items) < self.batch_max_items:
+                    break
+            return success
         except Exception as e:
-            self.logger.error(f"[DATA AGGREGATOR] Error getting nearby events: {str(e)}")
-            return []
+            self.logger.error(f"[DATA AGGREGATOR] Error flushing {data_type} batch: {str(e)}")
+            return False
+
+    def _process_batch(self, data_type: str, observations: List[Dict[str, Any]]) -> bool:
+        """Interpret a batch of observations and fan the results out into individual events."""
+        prompt_template = self._get_prompt_template(data_type)
+        if not prompt_template:
+            return False
+
+        interpreted = []
+        pending = []
+        for observation in observations:
+            observation = self._resolve_images(observation, data_type)
+            known_interpretation, image_hash = self._lookup_known_interpretation(observation, data_type, prompt_template)
+            if known_interpretation is not None:
+                interpreted.append((observation, known_interpretation))
+            else:
+                pending.append((observation, image_hash))
+
+        success = True
+        if pending:
+            interpretations = self._interpret_batch(data_type, prompt_template, [observation for observation, _ in pending])
+            for index, (observation, image_hash) in enumerate(pending):
+                processed_data = interpretations.get(index)
+                if not processed_data:
+                    self.logger.warning(f"[DATA AGGREGATOR] No batch result for observation {index}, processing individually")
+                    success = self._process_single(observation) and success
+                    continue
+                self._remember_interpretation(observation, data_type, prompt_template, processed_data, image_hash)
+                interpreted.append((observation, processed_data))
+
+        for observation, processed_data in interpreted:
+            success = self._forward_event(observation, processed_data) and success
+        return success
 
     def process_data(self, data: Dict[str, Any]) -> bool:
         """Process incoming data and store events."""
+        data_type = data.get("data_type")
+        if data_type == "jpeg":
+            data_type = DataType.IMAGE.value
+
+        if self.batch_mode and data_type in self.BATCHABLE_DATA_TYPES:
+            return self._add_to_batch(data, data_type)
+        try:
+            return self._process_single(self._resolve_images(data, data_type))
+        finally:
+            self._release_blobs(data)
+
+    def _process_single(self, data: Dict[str, Any]) -> bool:
+        """Interpret a single observation and store it as an event."""
         try:
             self.logger.info("[DATA AGGREGATOR] Starting data processing")
             # self.logger.debug(f"[DATA AGGREGATOR] Input data: {json.dumps(data, indent=4)}")
@@ -283,41 +575,12 @@ class DataAggregator:
                 self.logger.error(f"[DATA AGGREGATOR] Failed to process data of type {data_type}")
                 return False
 
-            event_data = {
-                "source": data.get("source"),
-                "timestamp": data.get("timestamp"),
-                "lat": data.get("lat"),
-                "lon": data.get("long"),
-                "data_type": data_type,
-                "processed_data": processed_data
-            }
-            
-            self.logger.debug(f"[DATA AGGREGATOR] Event data: {json.dumps(event_data, indent=4)}")
-            
-            if not self._store_event(event_data):
-                self.logger.error("[DATA AGGREGATOR] Failed to store event")
+            if not self._forward_event(data, processed_data):
                 return False
 
-            nearby_events = self._get_nearby_events(
-                float(data.get("lat")),
-                float(data.get("long"))
-            )
-
-            command_system_payload = {
-                "events": nearby_events,
-            }
-            
-            self.logger.debug(f"[DATA AGGREGATOR] Command system payload: {json.dumps(command_system_payload, indent=4)}")
-            
-            self.logger.info("[DATA AGGREGATOR] Forwarding to command system")
-            self.redis_utils.enqueue_task(
-                "command_system",
-                command_system_payload
-            )
-
             self.logger.info("[DATA AGGREGATOR] Processing completed successfully")
             return True
 
         except Exception as e:
             self.logger.error(f"[DATA AGGREGATOR] Error processing data: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
@@ -3,13 +3,22 @@ import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
 from src.utils.redis import RedisUtils
+from src.utils.bot_reservations import BotReservations
+from src.utils.blob_store import BlobStore
+from src.utils.mission_scheduler import MissionScheduler
 from src.utils.logging_utils import LoggerSetup
-import time
 import random
 import os
 import io
 import base64
+from functools import lru_cache
 from PIL import Image
+from src.constants import (
+    DRONE_IMAGE_CACHE_SIZE,
+    DRONE_IMAGE_PATH_PREFIX,
+    DRONE_MISSION_SURVEY_SECONDS,
+    DRONE_MISSION_CAPTURE_INTERVAL_SECONDS,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -18,11 +27,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _encode_jpeg(img, quality):
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+@lru_cache(maxsize=DRONE_IMAGE_CACHE_SIZE)
+def _prepare_image(image_path, mtime_ns, file_size, max_size, quality, max_file_size_kb, min_quality=20):
+    """Resize and JPEG-encode an image at the highest quality (down to min_quality) within the size limit.
+
+    mtime_ns and file_size are only part of the cache key, so an edited file is prepared again.
+    """
+    with Image.open(image_path) as img:
+        # Convert to RGB if necessary (for PNG with transparency)
+        if img.mode in ('RGBA', 'LA'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Resize image while maintaining aspect ratio
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        max_bytes = max_file_size_kb * 1024
+        compressed_data = _encode_jpeg(img, quality)
+        if len(compressed_data) <= max_bytes:
+            return compressed_data
+
+        # Bisect for the highest quality that fits; fall back to min_quality if none does
+        best = None
+        low, high = min_quality, quality - 1
+        while low <= high:
+            middle = (low + high) // 2
+            candidate = _encode_jpeg(img, middle)
+            if len(candidate) <= max_bytes:
+                best = candidate
+                low = middle + 1
+            else:
+                high = middle - 1
+        return best if best is not None else _encode_jpeg(img, min_quality)
+
 
 class DroneBotAgent:
-    def __init__(self, session_id: Optional[str] = None, image_path_prefix="/Users/laxmena/workplace/github/asap_project/datasets/sensor_data_samples/camera_images/"):
+    def __init__(self, session_id: Optional[str] = None, image_path_prefix=DRONE_IMAGE_PATH_PREFIX):
         self.image_path_prefix = image_path_prefix
         self.redis_utils = RedisUtils()
+        self.reservations = BotReservations(self.redis_utils)
+        self.blob_store = BlobStore(self.redis_utils)
+        self.missions = MissionScheduler(self.redis_utils)
         self.logger = LoggerSetup.get_logger(session_id=session_id, name=__name__)
         self._setup_image_pairs()
 
@@ -37,8 +90,15 @@ class DroneBotAgent:
         }
 
     def encode_image_to_base64(self, image_path, max_size=(640, 480), quality=60, max_file_size_kb=100):
+        """Compress an image and encode it to base64, for payloads that carry images inline."""
+        return base64.b64encode(self.compress_image(image_path, max_size, quality, max_file_size_kb)).decode("utf-8")
+
+    def compress_image(self, image_path, max_size=(640, 480), quality=60, max_file_size_kb=100):
         """
-        Resize and compress image before encoding to base64.
+        Resize and compress image to JPEG bytes.
+
+        Prepared images are cached per process by path, modification time and
+        file size, so repeated captures of the same file cost a stat call.
         
         Args:
             image_path: Path to the image file
@@ -47,114 +107,113 @@ class DroneBotAgent:
             max_file_size_kb: Maximum allowed file size in KB
         
         Returns:
-            Base64 encoded string of the compressed image
+            JPEG bytes of the compressed image
         """
         try:
-            self.logger.info(f"[DRONE BOT AGENT] Processing image: {image_path}")
-            
-            # Create temp directory if it doesn't exist
-            temp_dir = os.path.join(os.path.dirname(image_path), "temp")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Generate temp file path
-            original_filename = os.path.basename(image_path)
-            temp_filename = f"compressed_{original_filename}"
-            temp_path = os.path.join(temp_dir, temp_filename)
-            
-            # Open and resize image
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary (for PNG with transparency)
-                if img.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1])
-                    img = background
-                
-                # Resize image while maintaining aspect ratio
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                
-                # Save to bytes buffer with compression
-                buffer = io.BytesIO()
-                img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
-                
-                # Get the compressed image data
-                compressed_data = buffer.getvalue()
-                
-                # If still too large, reduce quality further
-                while len(compressed_data) > max_file_size_kb * 1024 and quality > 20:
-                    quality -= 10
-                    buffer = io.BytesIO()
-                    img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
-                    compressed_data = buffer.getvalue()
-                    self.logger.info(f"[DRONE BOT AGENT] Reducing quality to {quality} to meet size requirements")
-                
-                # Save compressed image to temp file
-                with open(temp_path, 'wb') as f:
-                    f.write(compressed_data)
-                self.logger.info(f"[DRONE BOT AGENT] Saved compressed image to: {temp_path}")
-                
-                # Encode to base64
-                encoded_image = base64.b64encode(compressed_data).decode("utf-8")
-                
-                # Log compression results
-                original_size = os.path.getsize(image_path)
-                compressed_size = len(compressed_data)
-                reduction = (original_size - compressed_size) / original_size * 100
-                self.logger.info(f"[DRONE BOT AGENT] Image compression: {original_size/1024:.1f}KB -> {compressed_size/1024:.1f}KB ({reduction:.1f}% reduction)")
-                
-                return encoded_image
+            stat = os.stat(image_path)
+            cache_info = _prepare_image.cache_info()
+            compressed_data = _prepare_image(image_path, stat.st_mtime_ns, stat.st_size, tuple(max_size), quality, max_file_size_kb)
+            if _prepare_image.cache_info().hits > cache_info.hits:
+                self.logger.info(f"[DRONE BOT AGENT] Using prepared image: {image_path}")
+            else:
+                reduction = (stat.st_size - len(compressed_data)) / stat.st_size * 100
+                self.logger.info(f"[DRONE BOT AGENT] Image compression: {stat.st_size/1024:.1f}KB -> {len(compressed_data)/1024:.1f}KB ({reduction:.1f}% reduction)")
+            return compressed_data
         except Exception as e:
             self.logger.error(f"[DRONE BOT AGENT] Error processing image: {str(e)}")
             raise
 
+    def warm_up(self):
+        """Prepare every image pair ahead of the first capture."""
+        self.logger.info("[DRONE BOT AGENT] Pre-warming image cache")
+        for camera_img, thermal_img in self.image_pairs.values():
+            for image_path in (camera_img, thermal_img):
+                try:
+                    self.compress_image(image_path)
+                except Exception:
+                    # compress_image already logged it; the capture will retry
+                    pass
+
     def process_task(self, payload: Dict[str, Any]) -> bool:
-        self.logger.info("[DRONE BOT AGENT] Starting task processing")
-        # self.logger.debug(f"[DRONE BOT AGENT] Input payload: {json.dumps(payload, indent=4)}")
+        """Run the current step of a drone mission.
 
-        self.logger.info("[DRONE BOT AGENT] Simulating task execution (sleeping for 10s)")
-        time.sleep(10)
+        A mission surveys the target, sends a camera image, then a thermal
+        image a few seconds later. Waiting between steps is left to the
+        mission scheduler, so the worker is free in the meantime. A step that
+        fails ends the mission and releases the bot.
+        """
+        try:
+            if self._run_step(payload):
+                return True
+        except Exception as e:
+            self.logger.error(f"[DRONE BOT AGENT] Mission step failed: {str(e)}")
+        self.reservations.release(payload.get("bot_id"), payload.get("task_id"))
+        return False
 
-        self.logger.info("[DRONE BOT AGENT] Selecting random image pair")
-        camera_img, thermal_img = self.get_random_image_pair()
-        self.logger.debug(f"[DRONE BOT AGENT] Selected images: {camera_img}, {thermal_img}")
-                
-        self.logger.info("[DRONE BOT AGENT] Processing camera image")
-        data_aggregator_payload = {
-            "data_id": random.randint(1000000000, 9999999999),
-            "task_type": "data_aggregator",
-            "data_type": "image",
-            "lat": 37.7749, 
-            "long": -122.4194,
-            "timestamp": datetime.now().isoformat(),
-            "image_base64": self.encode_image_to_base64(camera_img)
-        }
-        
-        self.logger.info("[DRONE BOT AGENT] Forwarding camera image to DataAggregator")
-        self.redis_utils.enqueue_task(
-            "data_aggregator",
-            data_aggregator_payload
-        )
-        
-        time.sleep(3)
-        
-        self.logger.info("[DRONE BOT AGENT] Processing thermal image")
-        data_aggregator_payload = {
-            "data_id": random.randint(1000000000, 9999999999),
-            "task_type": "data_aggregator",
-            "data_type": "thermal_image",
-            "lat": 37.7749, 
-            "long": -122.4194,
-            "timestamp": datetime.now().isoformat(),
-            "thermal_image_base64": self.encode_image_to_base64(thermal_img)
-        }
-        
-        self.logger.info("[DRONE BOT AGENT] Forwarding thermal image to DataAggregator")
-        self.redis_utils.enqueue_task(
-            "data_aggregator",
-            data_aggregator_payload
-        )
-        
-        self.logger.info("[DRONE BOT AGENT] Task completed successfully")
-        return True
+    def _run_step(self, payload: Dict[str, Any]) -> bool:
+        step = (payload.get("mission") or {}).get("step", "start")
+        # Observations are reported at the task's target
+        location = payload.get("target_location") or {}
+
+        if step == "start":
+            self.logger.info("[DRONE BOT AGENT] Starting task processing")
+            self.logger.info(f"[DRONE BOT AGENT] Simulating task execution ({DRONE_MISSION_SURVEY_SECONDS}s)")
+            return self._schedule_step(payload, "capture_camera", DRONE_MISSION_SURVEY_SECONDS)
+
+        if step == "capture_camera":
+            camera_img, thermal_img = self.get_random_image_pair()
+            self.logger.debug(f"[DRONE BOT AGENT] Selected images: {camera_img}, {thermal_img}")
+
+            self.logger.info("[DRONE BOT AGENT] Processing camera image")
+            data_aggregator_payload = {
+                "data_id": random.randint(1000000000, 9999999999),
+                "task_type": "data_aggregator",
+                "data_type": "image",
+                "lat": location.get("lat", 37.7749),
+                "long": location.get("long", -122.4194),
+                "timestamp": datetime.now().isoformat(),
+                # Only the digest travels in the job, the aggregator loads the bytes
+                "image_blob": self.blob_store.put(self.compress_image(camera_img))
+            }
+            
+            self.logger.info("[DRONE BOT AGENT] Forwarding camera image to DataAggregator")
+            self.redis_utils.enqueue_task(
+                "data_aggregator",
+                data_aggregator_payload
+            )
+            return self._schedule_step(
+                payload, "capture_thermal", DRONE_MISSION_CAPTURE_INTERVAL_SECONDS, {"thermal_img": thermal_img}
+            )
+
+        if step == "capture_thermal":
+            self.logger.info("[DRONE BOT AGENT] Processing thermal image")
+            data_aggregator_payload = {
+                "data_id": random.randint(1000000000, 9999999999),
+                "task_type": "data_aggregator",
+                "data_type": "thermal_image",
+                "lat": location.get("lat", 37.7749),
+                "long": location.get("long", -122.4194),
+                "timestamp": datetime.now().isoformat(),
+                "thermal_image_blob": self.blob_store.put(self.compress_image(payload["mission"]["thermal_img"]))
+            }
+            
+            self.logger.info("[DRONE BOT AGENT] Forwarding thermal image to DataAggregator")
+            self.redis_utils.enqueue_task(
+                "data_aggregator",
+                data_aggregator_payload
+            )
+            
+            # The bot is free for new tasks once its mission is over
+            self.reservations.release(payload.get("bot_id"), payload.get("task_id"))
+
+            self.logger.info("[DRONE BOT AGENT] Task completed successfully")
+            return True
+
+        self.logger.error(f"[DRONE BOT AGENT] Unknown mission step: {step}")
+        return False
+
+    def _schedule_step(self, payload: Dict[str, Any], step: str, delay_seconds: float, state: Optional[Dict[str, Any]] = None) -> bool:
+        return self.missions.schedule("drone_bot_agent_task", payload, step, delay_seconds, state) is not None
 
     def get_random_image_pair(self):
         self.logger.info("[DRONE BOT AGENT] Selecting random image pair")
@@ -3,33 +3,61 @@ import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
 from src.utils.redis import RedisUtils
+from src.utils.bot_reservations import BotReservations
+from src.utils.mission_scheduler import MissionScheduler
 from src.utils.logging_utils import LoggerSetup
-import time
+from src.constants import GROUND_MISSION_SURVEY_SECONDS
 import random
 
 class GroundBotAgent:
     def __init__(self, session_id: Optional[str] = None):
         self.redis_utils = RedisUtils()
+        self.reservations = BotReservations(self.redis_utils)
+        self.missions = MissionScheduler(self.redis_utils)
         self.logger = LoggerSetup.get_logger(session_id=session_id, name=__name__)
         self._setup()
 
     def process_task(self, payload: Dict[str, Any]) -> bool:
-        self.logger.info("[GROUND BOT AGENT] Starting task processing")
-        self.logger.debug(f"[GROUND BOT AGENT] Input payload: {json.dumps(payload, indent=4)}")
+        """Run the current step of a ground bot mission.
 
-        self.logger.info("[GROUND BOT AGENT] Simulating task execution (sleeping for 10s)")
-        time.sleep(10)
+        The bot surveys the target before reporting its sensor data; the wait
+        is left to the mission scheduler, so the worker is free in the meantime.
+        A step that fails ends the mission and releases the bot.
+        """
+        try:
+            if self._run_step(payload):
+                return True
+        except Exception as e:
+            self.logger.error(f"[GROUND BOT AGENT] Mission step failed: {str(e)}")
+        self.reservations.release(payload.get("bot_id"), payload.get("task_id"))
+        return False
+
+    def _run_step(self, payload: Dict[str, Any]) -> bool:
+        step = (payload.get("mission") or {}).get("step", "start")
+
+        if step == "start":
+            self.logger.info("[GROUND BOT AGENT] Starting task processing")
+            self.logger.debug(f"[GROUND BOT AGENT] Input payload: {json.dumps(payload, indent=4)}")
+
+            self.logger.info(f"[GROUND BOT AGENT] Simulating task execution ({GROUND_MISSION_SURVEY_SECONDS}s)")
+            return self.missions.schedule("ground_bot_agent_task", payload, "report", GROUND_MISSION_SURVEY_SECONDS) is not None
+
+        if step != "report":
+            self.logger.error(f"[GROUND BOT AGENT] Unknown mission step: {step}")
+            return False
 
         self.logger.info("[GROUND BOT AGENT] Collecting sensor data")
-        sensor_data = self.get_sensor_data()
+        # Observations are reported at the task's target; a simulated world can pick the readings there
+        location = payload.get("target_location") or {}
+        sensor_data = self.get_sensor_data(payload.get("sensor_scenario", "normal"))
         self.logger.debug(f"[GROUND BOT AGENT] Sensor data: {json.dumps(sensor_data, indent=4)}")
 
         data_aggregator_payload = {
             "data_id": random.randint(1000000000, 9999999999),
             "task_type": "data_aggregator",
             "data_type": "gas_sensor",
-            "lat": 37.7749, 
-            "long": -122.4194,
+            "lat": location.get("lat", 37.7749),
+            "long": location.get("long", -122.4194),
             "timestamp": datetime.now().isoformat(),
             "sensor_data": sensor_data
         }
@@ -40,6 +68,9 @@ class GroundBotAgent:
             data_aggregator_payload
         )
         
+        # The bot is free for new tasks once its mission is over
+        self.reservations.release(payload.get("bot_id"), payload.get("task_id"))
+
         self.logger.info("[GROUND BOT AGENT] Task completed successfully")
         return True
     
@@ -1,10 +1,14 @@
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 from src.utils.redis import RedisUtils
-from src.utils.llm import LLMSingleton
+from src.utils.bot_registry import BotRegistry
+from src.utils.llm_gateway import LLMGateway
+from src.utils.task_assignment import TaskAssignmentEngine
+from src.utils.bot_reservations import BotReservations
 from src.utils.logging_utils import LoggerSetup
+from src.constants import LLMPriority, ASSIGNMENT_RESERVE_ATTEMPTS, BOT_TYPES, NEAREST_BOTS_K, TASK_TYPE_BOT_TYPES
 
 # Configure logging
 logging.basicConfig(
@@ -17,13 +21,27 @@ class TaskAllocator:
     def __init__(self, session_id: Optional[str] = None):
         """Initialize TaskAllocator with Redis connection and LLM setup."""
         self.redis_utils = RedisUtils()
-        self.llm = LLMSingleton.get_instance()
+        self.llm = LLMGateway.get_instance()
+        self.bot_registry = BotRegistry.get_instance()
+        self.assignment_engine = TaskAssignmentEngine()
+        self.reservations = BotReservations(self.redis_utils)
         self.logger = LoggerSetup.get_logger(session_id=session_id, name=__name__)
 
-    def _construct_payload(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """Construct payload for LLM prompt."""
+    def _construct_payload(self, task: Dict[str, Any], bots_metadata: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Construct payload for LLM prompt, with the nearest available bots of the types the task needs unless candidate bots are given."""
         self.logger.info("[TASK ALLOCATOR] Constructing payload for task")
-        bots_metadata = self.redis_utils.get_all_bots_metadata()
+        if bots_metadata is None:
+            # Only the nearest bots, so the prompt does not grow with the fleet. Busy,
+            # reserved and in-mission bots are left out, the LLM could not get them.
+            lat, long = float(task["lat"]), float(task["long"])
+            bots_metadata = sorted(
+                (
+                    bot
+                    for bot_type in TASK_TYPE_BOT_TYPES.get(task.get("task_type"), BOT_TYPES)
+                    for bot in self.redis_utils.nearest_available(lat, long, bot_type)
+                ),
+                key=lambda bot: bot["distance_km"],
+            )[:NEAREST_BOTS_K]
         return {
             "tasks": [task],
             "bots_metadata": bots_metadata
@@ -80,8 +98,87 @@ class TaskAllocator:
         required_fields = ["task_id", "task_type", "lat", "long", "timestamp"]
         return all(field in task for field in required_fields)
 
+    def _assign_and_reserve(self, tasks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Match tasks to bots and reserve the matched bots.
+
+        Returns the allocations whose bot was reserved, and the solved entries
+        that need the LLM (ties and tasks no bot qualifies for). Tasks whose bot
+        was reserved by another allocator in the meantime are solved again, and
+        are left to the LLM if that keeps failing.
+        """
+        self.reservations.release_expired()
+        allocations = []
+        llm_results = []
+        pending = tasks
+        for attempt in range(ASSIGNMENT_RESERVE_ATTEMPTS):
+            results = self.assignment_engine.solve(self.bot_registry.get_all_bots(), pending)
+            pending = []
+            for result in results:
+                if result["bot"] is None or len(result["candidates"]) > 1:
+                    llm_results.append(result)
+                elif self.reservations.reserve(result["bot"]["bot_id"], result["task"]["task_id"]):
+                    allocations.append(self.assignment_engine.to_allocation(result))
+                else:
+                    self.logger.info(f"[TASK ALLOCATOR] Bot {result['bot']['bot_id']} was taken, re-solving task {result['task']['task_id']}")
+                    self.bot_registry.invalidate(result["bot"]["bot_id"])
+                    pending.append(result["task"])
+            if not pending:
+                break
+
+        for task in pending:
+            self.logger.info(f"[TASK ALLOCATOR] Could not reserve a bot for task {task.get('task_id')}")
+            llm_results.append({"task": task, "bot": None, "distance_km": None, "eta_seconds": None, "candidates": []})
+        return allocations, llm_results
+
+    def _reserve_llm_choice(self, result: Dict[str, Any], llm_response: Dict[str, Any]) -> bool:
+        """Reserve the bot the LLM chose among tied candidates, or the next free candidate.
+
+        Without candidates (no bot qualified) only the chosen bot itself is tried,
+        so the choice is rejected unless that bot can be reserved.
+        """
+        task_id = result["task"]["task_id"]
+        chosen = str(llm_response.get("bot_id"))
+        if result["bot"] is None:
+            chosen_bot = self.bot_registry.get_bot(chosen)
+            pool = [chosen_bot] if chosen_bot else []
+        else:
+            pool = result["candidates"]
+        candidates = [bot for bot in pool if str(bot["bot_id"]) == chosen]
+        candidates += [bot for bot in pool if str(bot["bot_id"]) != chosen]
+        for bot in candidates:
+            if self.reservations.reserve(bot["bot_id"], task_id):
+                llm_response.update({"bot_id": bot["bot_id"], "bot_type": bot["bot_type"], "task_id": task_id})
+                return True
+            self.bot_registry.invalidate(bot["bot_id"])
+        return False
+
+    def _release_tasks(self, task_ids: List[str]) -> None:
+        """Free the bots reserved for, or on a mission for, any of the given tasks."""
+        task_ids = {str(task_id) for task_id in task_ids}
+        if not task_ids:
+            return
+        bot_ids = self.redis_utils.get_bot_ids_by_status("reserved") + self.redis_utils.get_bot_ids_by_status("in_mission")
+        for bot_id, bot in zip(bot_ids, self.redis_utils.get_bots(bot_ids)):
+            task_id = (bot or {}).get("current_task_id")
+            if task_id is None or str(task_id) not in task_ids:
+                continue
+            if self.reservations.release(bot_id, task_id):
+                self.logger.info(f"[TASK ALLOCATOR] Released bot {bot_id} from task {task_id}")
+                self.bot_registry.invalidate(bot_id)
+
     def process_task(self, payload: Dict[str, Any]) -> bool:
-        """Process a single task and allocate it to an appropriate bot."""
+        """Allocate all tasks in the payload to bots and dispatch them.
+
+        Tasks are matched to bots by the assignment engine in one pass. The LLM
+        is only asked when several bots are equally good for a task (it picks
+        among those candidates) or when no bot qualifies (it sees the nearest bots).
+        Every bot, whether matched or chosen by the LLM, is reserved atomically
+        before dispatch, so several allocators can run at once without giving a
+        bot two tasks. An LLM choice that cannot be reserved is rejected.
+
+        Bots still holding a task listed as "cancelled" or "updated" are released
+        first, so cancelled missions stop and updated tasks get a single bot.
+        """
         self.logger.info("[TASK ALLOCATOR] Starting task processing")
         # self.logger.debug(f"[TASK ALLOCATOR] Input payload: {json.dumps(payload, indent=4)}")
         
@@ -97,9 +194,23 @@ class TaskAllocator:
                     self.logger.error(f"[TASK ALLOCATOR] Invalid task data: {json.dumps(task, indent=4)}")
                     return False
 
+            self._release_tasks((payload.get("cancelled") or []) + (payload.get("updated") or []))
+
+            allocations, llm_results = self._assign_and_reserve(tasks)
+            # Every dispatched allocation holds a reservation on its bot
+            dispatches = list(allocations)
+
+            prompts = []
+            for result in llm_results:
+                task = result["task"]
                 self.logger.info(f"[TASK ALLOCATOR] Processing task {task.get('task_id')}")
 
-                payload = self._construct_payload(task)
+                if result["bot"] is None:
+                    self.logger.info(f"[TASK ALLOCATOR] No bot qualifies for task {task.get('task_id')}, asking LLM with the nearest bots")
+                    payload = self._construct_payload(task)
+                else:
+                    self.logger.info(f"[TASK ALLOCATOR] {len(result['candidates'])} bots tie for task {task.get('task_id')}, asking LLM")
+                    payload = self._construct_payload(task, result["candidates"])
                 self.logger.debug(f"[TASK ALLOCATOR] Constructed payload: {json.dumps(payload, indent=4)}")
 
                 prompt_template = self._get_prompt_template()
@@ -111,27 +222,51 @@ class TaskAllocator:
                 if not prompt:
                     self.logger.error("[TASK ALLOCATOR] Failed to prepare prompt")
                     return False
+                prompts.append(prompt)
 
-                self.logger.info("[TASK ALLOCATOR] Invoking LLM")
-                response = self.llm.invoke(prompt)
-                # self.logger.debug(f"[TASK ALLOCATOR] LLM Response: {response.content}")
+            success = True
+            if prompts:
+                # Allocation prompts are independent, so they are in flight concurrently
+                self.logger.info(f"[TASK ALLOCATOR] Invoking LLM for {len(prompts)} tasks")
+                responses = self.llm.invoke_many(prompts, priority=LLMPriority.HIGH, family="task_allocator")
 
-                try:
-                    llm_response = json.loads(response.content)
-                    self.logger.info(f"[TASK ALLOCATOR] Parsed LLM response: {json.dumps(llm_response, indent=4)}")
-                except json.JSONDecodeError as e:
-                    self.logger.error(f"[TASK ALLOCATOR] Error parsing LLM response: {str(e)}")
-                    return False
+                for result, response in zip(llm_results, responses):
+                    task = result["task"]
+                    if response is None:
+                        self.logger.error(f"[TASK ALLOCATOR] LLM call failed for task {task.get('task_id')}")
+                        success = False
+                        continue
+                    # self.logger.debug(f"[TASK ALLOCATOR] LLM Response: {response.content}")
+
+                    try:
+                        llm_response = json.loads(response.content)
+                        self.logger.info(f"[TASK ALLOCATOR] Parsed LLM response: {json.dumps(llm_response, indent=4)}")
+                    except json.JSONDecodeError as e:
+                        self.logger.error(f"[TASK ALLOCATOR] Error parsing LLM response: {str(e)}")
+                        success = False
+                        continue
 
-                success = self._dispatch_task(llm_response)
-                if success:
-                    self.logger.info(f"[TASK ALLOCATOR] Successfully dispatched task {task.get('task_id')}")
+                    if self._reserve_llm_choice(result, llm_response):
+                        dispatches.append(llm_response)
+                    elif result["bot"] is None:
+                        self.logger.error(f"[TASK ALLOCATOR] Bot {llm_response.get('bot_id')} chosen for task {task.get('task_id')} could not be reserved")
+                        success = False
+                    else:
+                        self.logger.error(f"[TASK ALLOCATOR] No tied candidate is still free for task {task.get('task_id')}")
+                        success = False
+
+            for allocation in dispatches:
+                if self._dispatch_task(allocation):
+                    self.logger.info(f"[TASK ALLOCATOR] Successfully dispatched task {allocation.get('task_id')}")
+                    self.reservations.commit(allocation["bot_id"], allocation["task_id"])
                 else:
-                    self.logger.error(f"[TASK ALLOCATOR] Failed to dispatch task {task.get('task_id')}")
+                    self.logger.error(f"[TASK ALLOCATOR] Failed to dispatch task {allocation.get('task_id')}")
+                    self.reservations.release(allocation["bot_id"], allocation["task_id"])
+                    success = False
 
             self.logger.info("[TASK ALLOCATOR] Task processing completed")
             return success
 
         except Exception as e:
             self.logger.error(f"[TASK ALLOCATOR] Error processing task: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
@@ -1,16 +1,72 @@
 from enum import Enum
 
 class QueueNames(Enum):
-    MAIN_QUEUE = "main_queue"  # Single queue for all tasks
+    MAIN_QUEUE = "main_queue"  # Fallback for task types without a dedicated queue
+    COMMAND_SYSTEM = "command_system_queue"
+    TASK_ALLOCATOR = "task_allocator_queue"
+    BOT_TASKS = "bot_task_queue"
+    DATA_AGGREGATOR = "data_aggregator_queue"
+
+# Queue each task type is routed to by RedisUtils.enqueue_task
+TASK_QUEUE_ROUTES = {
+    "command_system": QueueNames.COMMAND_SYSTEM,
+    "task_allocator": QueueNames.TASK_ALLOCATOR,
+    "ground_bot_agent_task": QueueNames.BOT_TASKS,
+    "drone_bot_agent_task": QueueNames.BOT_TASKS,
+    "data_aggregator": QueueNames.DATA_AGGREGATOR,
+    "data_aggregator_flush": QueueNames.DATA_AGGREGATOR,
+    "mission_dispatch": QueueNames.BOT_TASKS,
+}
+
+# Relative share of dequeues per queue in weighted scheduling. In strict
+# scheduling queues are always drained in descending weight order.
+QUEUE_WEIGHTS = {
+    QueueNames.COMMAND_SYSTEM.value: 8,
+    QueueNames.TASK_ALLOCATOR.value: 8,
+    QueueNames.BOT_TASKS.value: 4,
+    QueueNames.DATA_AGGREGATOR.value: 2,
+    QueueNames.MAIN_QUEUE.value: 1,
+}
 
 class RedisKeys(Enum):
     BOTS_METADATA = "bots:metadata"
+    BOT_IDS = "bots:ids"
+    BOT_CHANGES = "bots:changes"  # Pub/sub channel carrying the id of each changed bot
+    BOTS_LOCATION = "bots:location"  # Prefix of the per bot type GEO sets
+    BOTS_AVAILABLE_LOCATION = "bots:available"  # Prefix of the per bot type GEO sets of available bots
+    BOTS_STATUS = "bots:status"  # Prefix of the per status sets of bot ids
+    BOT_RESERVATION = "bots:reservation"  # Prefix of the expiring per bot reservation keys
     TASK_ALLOCATOR_PROMPT = "task_allocator:prompt"
     EVENTS = "events"
-    EVENTS_BY_LOCATION = "events:location"
+    EVENTS_BY_LOCATION = "events:location"  # Prefix of the per time bucket GEO sets
+    EVENTS_COMPACTION_LOCK = "events:compaction_lock"
+    INCIDENTS = "incidents"
+    INCIDENTS_BY_LOCATION = "incidents:location"
+    INCIDENTS_RECENT = "incidents:recent"
+    INCIDENTS_CELL_LOCK = "incidents:lock"
     WEATHER_DATA = "weather:data"
     WEATHER_LAST_UPDATE = "weather:last_update"
     COMMAND_SYSTEM_RESPONSE = "command_system:response"
+    COMMAND_AREA_STATE = "command_system:area_state"
+    COMMAND_AREA_DIRTY = "command_system:area_dirty"
+    COMMAND_AREA_DECISION = "command_system:area_decision"
+    LLM_CACHE = "llm_cache"
+    LLM_CACHE_INDEX = "llm_cache:index"
+    LLM_CACHE_STATS = "llm_cache:stats"
+    IMAGE_HASH_LOCATION = "image_hash:location"
+    IMAGE_HASH_RECENT = "image_hash:recent"
+    IMAGE_HASH_ENTRY = "image_hash:entry"
+    IMAGE_HASH_STATS = "image_hash:stats"
+    BLOBS = "blobs"  # Prefix of the content-addressed blob keys
+    BLOB_REFS = "blobs:refs"  # Prefix of the blob reference counters
+    DATA_AGGREGATOR_BATCH = "data_aggregator:batch"
+    MISSIONS = "missions"  # Prefix of the per mission state of the next step
+    MISSIONS_DUE = "missions:due"  # Mission ids scored by the due time of their next step
+    MISSIONS_DISPATCH_PENDING = "missions:dispatch_pending"  # Due time of the scheduled dispatcher
+    TRACES = "traces"  # Prefix of the per trace span lists
+    TRACE_SPANS = "traces:spans"  # Stream of every finished span
+    TRACE_OBSERVATIONS = "traces:observations"  # Prefix of the span that interpreted an observation, by data_id
+    METRICS = "metrics"  # Counters and histogram buckets shared by every worker, by Prometheus series
 
 class BotTypes(Enum):
     DRONE = "drone_bot"
@@ -28,6 +84,217 @@ database_url = 'https://firdb-2025-default-rtdb.firebaseio.com/'
 LLM_MODEL = "claude-3-opus-20240229"
 ANTHROPIC_API_KEY_ENV = "ANTHROPIC_API_KEY"
 
+# Redis Configuration
+REDIS_MAX_CONNECTIONS = 50
+REDIS_BATCH_SIZE = 500  # Keys per SCAN page and MGET call
+
+# Event Store Configuration
+EVENT_RETENTION_SECONDS = 2 * 60 * 60
+EVENT_BUCKET_SECONDS = 5 * 60
+EVENT_COMPACTION_INTERVAL_SECONDS = 60
+
+# Incident Clustering Configuration
+# Observations within the radius and time window of an incident are merged into it
+INCIDENT_CLUSTER_RADIUS_METERS = 200
+INCIDENT_CLUSTER_WINDOW_SECONDS = 15 * 60
+# Minimum confidence increase that makes a merged observation worth forwarding
+INCIDENT_CONFIDENCE_DELTA = 0.1
+INCIDENT_FORWARD_RADIUS_KM = 1.0
+# Clustering locks the grid cells around an event for at most this long, and waits as long for them
+INCIDENT_LOCK_TIMEOUT_SECONDS = 10
+
+# Command System Scheduling Configuration
+# Decisions are coalesced per grid cell of this size (about 1.1 km of latitude)
+COMMAND_AREA_CELL_DEGREES = 0.01
+COMMAND_DEBOUNCE_SECONDS = 5
+# Safety expiry of an area's pending/running state if a worker dies mid-decision
+COMMAND_AREA_STATE_TTL_SECONDS = 300
+# Set to true to send only incidents changed since an area's last decision and get task diffs back
+COMMAND_SYSTEM_INCREMENTAL_ENV = "COMMAND_SYSTEM_INCREMENTAL"
+
+# Travel Estimates
+# Used when a bot's metadata has no speed_kmh / vertical_speed_ms of its own
+BOT_SPEEDS_KMH = {
+    "drone_bot": 40.0,
+    "ground_bot": 8.0,
+}
+DEFAULT_BOT_SPEED_KMH = 5.0
+# Bots without a vertical speed do not change altitude on their own (ground bots)
+BOT_VERTICAL_SPEEDS_MS = {
+    "drone_bot": 3.0,
+}
+
+# Task Assignment Configuration
+# Capability keyword a bot's capabilities must mention for each task type
+TASK_TYPE_CAPABILITIES = {
+    "search": "search",
+    "assist_rescue": "assist rescue",
+    "dispatch_aid": "dispatch aid",
+}
+# Bot types offered to the LLM when no bot qualifies for a task; other task types get every type
+TASK_TYPE_BOT_TYPES = {
+    "search": ["drone_bot", "ground_bot"],
+    "assist_rescue": ["ground_bot"],
+    "dispatch_aid": ["ground_bot"],
+}
+ASSIGNMENT_MIN_BATTERY_LEVEL = 15.0
+# Costs are in kilometers of travel: an empty battery counts like this many extra km
+ASSIGNMENT_BATTERY_WEIGHT_KM = 2.0
+# A priority 1 task is preferred as if it were this many km closer
+ASSIGNMENT_PRIORITY_WEIGHT_KM = 5.0
+# Candidates within this cost of the chosen bot are a tie, broken by the LLM
+ASSIGNMENT_TIE_MARGIN_KM = 0.05
+# Task columns kept in the distance cache; tasks of every area share it, the least recently solved go first
+ASSIGNMENT_DISTANCE_CACHE_MAX_TASKS = 2000
+
+# Fleet Index Configuration
+# Bot types and statuses with their own location/status indexes;
+# "reserved" is only set by BotReservations between reserve and commit
+BOT_TYPES = ["ground_bot", "drone_bot"]
+BOT_STATUSES = ["available", "in_mission", "busy", "charging", "reserved"]
+# Candidates considered near a task when a query does not ask for a count
+NEAREST_BOTS_K = 10
+
+# Bot Reservation Configuration
+# A reserved bot that is not committed within this time is released again
+BOT_RESERVATION_TTL_SECONDS = 30
+# How often the allocator re-solves tasks whose bot was taken by another allocator
+ASSIGNMENT_RESERVE_ATTEMPTS = 3
+
+# Blob Store Configuration
+# Upper bound on how long a blob outlives a consumer that never released it
+BLOB_TTL_SECONDS = 60 * 60
+
+# Drone Image Preparation
+# Sample images a simulated drone captures, relative to the project root
+DRONE_IMAGE_PATH_PREFIX = "datasets/sensor_data_samples/camera_images/"
+# Prepared (resized and compressed) images kept per process
+DRONE_IMAGE_CACHE_SIZE = 64
+
+# Bot Mission Configuration
+# Simulated time a bot spends on its mission before reporting
+DRONE_MISSION_SURVEY_SECONDS = 10
+GROUND_MISSION_SURVEY_SECONDS = 10
+# Gap between the drone's camera and thermal captures
+DRONE_MISSION_CAPTURE_INTERVAL_SECONDS = 3
+# Mission steps moved onto the bot queue per claim
+MISSION_DISPATCH_BATCH_SIZE = 500
+# Earliest a dispatcher is scheduled, matching the RQ scheduler's resolution
+MISSION_DISPATCH_MIN_DELAY_SECONDS = 1
+# A dispatcher that has not run this long after its due time is considered lost
+MISSION_DISPATCH_GRACE_SECONDS = 60
+# Upper bound on how long a step's state outlives a dispatcher that never ran
+MISSION_STATE_TTL_SECONDS = 60 * 60
+
+# Tracing Configuration
+TRACING_ENV = "TRACING"  # Set to false to stop propagating trace context and recording spans
+# Approximate length the span stream is trimmed to
+TRACE_STREAM_MAX_LENGTH = 100000
+# How long the spans of a trace stay queryable by trace id or observation
+TRACE_TTL_SECONDS = 2 * 60 * 60
+
+# Metrics Configuration
+# Every worker serves the cluster-wide metrics in Prometheus text format on
+# http://METRICS_HOST:METRICS_PORT/metrics; a worker finding the port taken skips it.
+METRICS_HOST_ENV = "METRICS_HOST"
+METRICS_PORT_ENV = "METRICS_PORT"  # Set to 0 to disable the endpoint
+METRICS_DEFAULT_HOST = "127.0.0.1"
+METRICS_DEFAULT_PORT = 9108
+# Histogram bucket upper bounds, in seconds for latencies and in calls for round trips
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+METRICS_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Bot Registry Cache Configuration
+# Upper bound on staleness if a change notification is missed
+BOT_CACHE_MAX_AGE_SECONDS = 30
+
+# Worker Configuration
+WORKER_MODE_ENV = "WORKER_MODE"  # fork|simple
+WORKER_QUEUES_ENV = "WORKER_QUEUES"  # Comma separated queue names, defaults to all queues
+QUEUE_SCHEDULING_ENV = "QUEUE_SCHEDULING"  # strict|weighted
+
+# LLM Gateway Configuration
+LLM_GATEWAY_MAX_CONCURRENCY = 8
+LLM_GATEWAY_REQUESTS_PER_SECOND = 2.0
+LLM_GATEWAY_BURST = 5
+LLM_GATEWAY_MAX_RETRIES = 3
+# A synchronous caller stops waiting for the model after this long, queue wait included
+LLM_GATEWAY_TIMEOUT_SECONDS = 120.0
+
+# LLM Backend Configuration
+LLM_BACKEND_ENV = "LLM_BACKEND"  # anthropic|fake
+FAKE_LLM_PROFILE_ENV = "FAKE_LLM_PROFILE"  # Path of a JSON profile overriding FAKE_LLM_PROFILE
+# Behaviour of the fake chat model per prompt family. Families take their
+# settings from "defaults" unless they set their own. Distributions are a
+# number (constant) or {"distribution": "constant", "value"},
+# {"distribution": "uniform", "min", "max"}, {"distribution": "normal", "mean", "stddev"},
+# {"distribution": "lognormal", "median", "sigma"} or {"distribution": "exponential", "mean"}.
+FAKE_LLM_PROFILE = {
+    "seed": 7,
+    "defaults": {
+        "latency_ms": {"distribution": "lognormal", "median": 2000, "sigma": 0.5},
+        "output_tokens": {"distribution": "uniform", "min": 150, "max": 500},
+        "error_rate": 0.0,  # Share of calls failing with a server error
+        "rate_limit_rate": 0.0,  # Share of calls failing with a 429, which the gateway retries
+        "hazard_probability": 0.3,  # Chance an interpretation reports fire (and, independently, smoke)
+        "survivor_probability": 0.2,  # Chance an interpretation reports survivors
+    },
+    "families": {
+        "image": {"latency_ms": {"distribution": "lognormal", "median": 4000, "sigma": 0.4}},
+        "thermal_image": {"latency_ms": {"distribution": "lognormal", "median": 4000, "sigma": 0.4}},
+        "gas_sensor": {"latency_ms": {"distribution": "lognormal", "median": 1500, "sigma": 0.3}},
+        "human_report": {
+            "latency_ms": {"distribution": "lognormal", "median": 2500, "sigma": 0.4},
+            "output_tokens": {"distribution": "uniform", "min": 400, "max": 900},
+        },
+        "command_system": {
+            "latency_ms": {"distribution": "lognormal", "median": 6000, "sigma": 0.5},
+            "output_tokens": {"distribution": "uniform", "min": 400, "max": 1200},
+        },
+        "task_allocator": {
+            "latency_ms": {"distribution": "lognormal", "median": 2500, "sigma": 0.4},
+            "output_tokens": {"distribution": "uniform", "min": 80, "max": 200},
+        },
+    },
+}
+
+class LLMPriority(Enum):
+    HIGH = 0  # Human reports and decision making
+    NORMAL = 1
+    LOW = 2  # Routine sensor readings
+
+# LLM Response Cache Configuration
+LLM_CACHE_TTL_SECONDS = 6 * 60 * 60
+LLM_CACHE_MAX_ENTRIES = 5000
+LLM_CACHE_BYPASS_ENV = "LLM_CACHE_BYPASS"
+
+# Near-Duplicate Image Suppression Configuration
+IMAGE_HASH_ALGORITHM = "dhash"  # dhash|phash
+IMAGE_HASH_MAX_HAMMING_DISTANCE = 6
+IMAGE_HASH_MAX_GEO_DISTANCE_METERS = 50
+IMAGE_HASH_WINDOW_SECONDS = 10 * 60
+IMAGE_HASH_MAX_CANDIDATES = 25
+
+# Gas Sensor Rule Engine Configuration
+# Readings at or below normal_max are clearly normal, readings at or above
+# critical_min are clearly critical, anything in between is sent to the LLM.
+# Gas limits follow the warning and high risk levels of the gas sensor prompt.
+GAS_SENSOR_THRESHOLDS = {
+    "temperature": {"normal_max": 40, "critical_min": 100, "unit": "celsius"},
+    "CO": {"normal_max": 50, "critical_min": 400, "unit": "ppm"},
+    "CO2": {"normal_max": 1000, "critical_min": 5000, "unit": "ppm"},
+    "CH4": {"normal_max": 1000, "critical_min": 10000, "unit": "ppm"},
+    "H2S": {"normal_max": 10, "critical_min": 20, "unit": "ppm"},
+    "smoke_particles": {"normal_max": 35, "critical_min": 250, "unit": "ug/m3"},
+    # Applies to the temperature of each entry in heat_sensors
+    "heat_sensors": {"normal_max": 40, "critical_min": 100, "unit": "celsius"},
+}
+
+# Data Aggregator Batching Configuration
+DATA_AGGREGATOR_BATCH_MODE_ENV = "DATA_AGGREGATOR_BATCH_MODE"
+DATA_AGGREGATOR_BATCH_MAX_WAIT_MS = 1000
+DATA_AGGREGATOR_BATCH_MAX_ITEMS = 8
+
 class DataSourceType(Enum):
     WEATHER = "weather"
     DRONE_BOT = "drone_bot"
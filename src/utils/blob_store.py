@@ -0,0 +1,93 @@
+import hashlib
+import logging
+from typing import Optional
+
+from src.constants import RedisKeys, BLOB_TTL_SECONDS
+from src.utils.redis import RedisUtils
+
+logger = logging.getLogger(__name__)
+
+# Drop one reference and delete the blob with its last reference
+RELEASE_SCRIPT = """
+local refs = redis.call('DECR', KEYS[2])
+if refs <= 0 then
+    redis.call('DEL', KEYS[1], KEYS[2])
+end
+return refs
+"""
+
+class BlobStore:
+    """Content-addressed, reference-counted store for binary payloads such as images.
+
+    Producers ``put`` raw bytes and pass the returned digest through job
+    payloads (claim check) instead of base64 text. Identical content is stored
+    once, and every ``put`` or ``acquire`` adds a reference that the consumer
+    gives back with ``release``. A blob is deleted with its last reference,
+    or after ``ttl_seconds`` if a consumer never releases it.
+    """
+
+    def __init__(self, redis_utils: Optional[RedisUtils] = None, ttl_seconds: int = BLOB_TTL_SECONDS):
+        """Initialize the blob store on top of an existing Redis connection."""
+        self.redis_utils = redis_utils or RedisUtils()
+        self.redis_client = self.redis_utils.redis_client
+        self.ttl_seconds = ttl_seconds
+        self._release = self.redis_client.register_script(RELEASE_SCRIPT)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _blob_key(self, digest: str) -> str:
+        return f"{RedisKeys.BLOBS.value}:{digest}"
+
+    def _refs_key(self, digest: str) -> str:
+        return f"{RedisKeys.BLOB_REFS.value}:{digest}"
+
+    def put(self, data: bytes) -> Optional[str]:
+        """Store bytes (once per distinct content) with one reference, returning their digest."""
+        try:
+            digest = self.digest(data)
+            pipe = self.redis_client.pipeline()
+            pipe.set(self._blob_key(digest), data, ex=self.ttl_seconds, nx=True)
+            pipe.expire(self._blob_key(digest), self.ttl_seconds)
+            pipe.incr(self._refs_key(digest))
+            pipe.expire(self._refs_key(digest), self.ttl_seconds)
+            stored = pipe.execute()[0]
+            logger.info(f"{'Stored' if stored else 'Referenced existing'} blob {digest[:12]} ({len(data) / 1024:.1f}KB)")
+            return digest
+        except Exception as e:
+            logger.error(f"Error storing blob: {str(e)}")
+            return None
+
+    def acquire(self, digest: str) -> bool:
+        """Add a reference to an existing blob, e.g. before handing its digest to a second consumer."""
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.exists(self._blob_key(digest))
+            pipe.incr(self._refs_key(digest))
+            pipe.expire(self._refs_key(digest), self.ttl_seconds)
+            exists = pipe.execute()[0]
+            if not exists:
+                self._release(keys=[self._blob_key(digest), self._refs_key(digest)])
+            return bool(exists)
+        except Exception as e:
+            logger.error(f"Error acquiring blob {digest}: {str(e)}")
+            return False
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Load the bytes of a blob, or None if it does not exist (anymore)."""
+        try:
+            data = self.redis_client.get(self._blob_key(digest))
+            if data is None:
+                logger.warning(f"Blob {digest} not found")
+            return data
+        except Exception as e:
+            logger.error(f"Error loading blob {digest}: {str(e)}")
+            return None
+
+    def release(self, digest: str) -> None:
+        """Give back one reference, deleting the blob with its last reference."""
+        try:
+            self._release(keys=[self._blob_key(digest), self._refs_key(digest)])
+        except Exception as e:
+            logger.error(f"Error releasing blob {digest}: {str(e)}")
@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from src.constants import RedisKeys, BOT_CACHE_MAX_AGE_SECONDS
+from src.utils.redis import RedisUtils
+
+logger = logging.getLogger(__name__)
+
+class BotRegistry:
+    """Per-process read-through cache of bot metadata.
+
+    Writes go through RedisUtils, which publishes the id of every changed bot
+    on the bots:changes channel. A background subscriber marks those bots dirty,
+    so reads only go back to Redis for bots that actually changed. The whole
+    fleet is reloaded after BOT_CACHE_MAX_AGE_SECONDS in case a notification
+    was missed.
+    """
+
+    _instance: Optional["BotRegistry"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, redis_utils: Optional[RedisUtils] = None, max_age_seconds: float = BOT_CACHE_MAX_AGE_SECONDS):
+        """Initialize the cache; the subscriber starts on first read."""
+        self.redis_utils = redis_utils or RedisUtils()
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._bots: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Set[str] = set()
+        self._loaded_at: Optional[float] = None
+        self._subscriber = None
+        self._subscriber_pid: Optional[int] = None
+
+    @classmethod
+    def get_instance(cls) -> "BotRegistry":
+        """Get or create the registry for this process."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _ensure_subscribed(self) -> None:
+        """Start the change-feed subscriber, restarting it in a forked child."""
+        if self._subscriber_pid == os.getpid():
+            return
+        try:
+            pubsub = self.redis_utils.redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{RedisKeys.BOT_CHANGES.value: self._on_change})
+            self._subscriber = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            self._subscriber_pid = os.getpid()
+            # Anything cached before subscribing may have missed notifications
+            self.invalidate()
+        except Exception as e:
+            logger.error(f"Error subscribing to bot changes: {str(e)}")
+
+    def _on_change(self, message: Dict[str, Any]) -> None:
+        bot_id = message.get("data")
+        bot_id = bot_id.decode() if isinstance(bot_id, bytes) else bot_id
+        with self._lock:
+            self._dirty.add(bot_id)
+
+    def invalidate(self, bot_id: Optional[str] = None) -> None:
+        """Mark one bot, or the whole fleet, for reloading on the next read."""
+        with self._lock:
+            if bot_id is None:
+                self._loaded_at = None
+            else:
+                self._dirty.add(bot_id)
+
+    def _refresh(self) -> None:
+        with self._lock:
+            full_reload = self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age_seconds
+            dirty = set(self._dirty)
+            self._dirty.clear()
+
+        if full_reload:
+            loaded_at = time.monotonic()
+            bot_ids = self.redis_utils.get_bot_ids()
+            bots = {
+                bot_id: metadata
+                for bot_id, metadata in zip(bot_ids, self.redis_utils.get_bots(bot_ids))
+                if metadata is not None
+            }
+            with self._lock:
+                self._bots = bots
+                self._loaded_at = loaded_at
+            return
+
+        if dirty:
+            dirty_ids = list(dirty)
+            for bot_id, metadata in zip(dirty_ids, self.redis_utils.get_bots(dirty_ids)):
+                with self._lock:
+                    if metadata is None:
+                        self._bots.pop(bot_id, None)
+                    else:
+                        self._bots[bot_id] = metadata
+
+    def get_all_bots(self) -> List[Dict[str, Any]]:
+        """Return metadata for every bot, reading Redis only for changed bots."""
+        try:
+            self._ensure_subscribed()
+            self._refresh()
+            with self._lock:
+                return [dict(bot) for bot in self._bots.values()]
+        except Exception as e:
+            logger.error(f"Error reading bot registry: {str(e)}")
+            return self.redis_utils.get_all_bots_metadata()
+
+    def get_bot(self, bot_id: str) -> Optional[Dict[str, Any]]:
+        """Return metadata for one bot, reading Redis only for changed bots."""
+        try:
+            self._ensure_subscribed()
+            self._refresh()
+            with self._lock:
+                bot = self._bots.get(bot_id)
+                return dict(bot) if bot else None
+        except Exception as e:
+            logger.error(f"Error reading bot {bot_id} from registry: {str(e)}")
+            return self.redis_utils.get_bot_metadata(bot_id)
@@ -0,0 +1,173 @@
+import logging
+from typing import List, Optional
+
+from src.constants import (
+    RedisKeys,
+    ASSIGNMENT_MIN_BATTERY_LEVEL,
+    BOT_RESERVATION_TTL_SECONDS,
+)
+from src.utils.redis import RedisUtils, BOT_INDEX_FUNCTION
+
+logger = logging.getLogger(__name__)
+
+# Every script takes the BOT_INDEX_FUNCTION KEYS followed by the reservation key,
+# and the BOT_INDEX_FUNCTION ARGV followed by the bot changes channel and its own arguments.
+SCRIPT_PREAMBLE = BOT_INDEX_FUNCTION + """
+local bot_key = KEYS[1]
+local reservation_key = KEYS[#KEYS]
+local n_index_args = 3 + tonumber(ARGV[2]) + tonumber(ARGV[3])
+local channel = ARGV[n_index_args + 1]
+
+local function field(name)
+    local value = redis.call('HGET', bot_key, name)
+    if value then
+        value = cjson.decode(value)
+        if value ~= cjson.null then
+            return value
+        end
+    end
+    return nil
+end
+
+local function set_status(status, task_id)
+    redis.call('HSET', bot_key, 'status', cjson.encode(status))
+    if task_id then
+        redis.call('HSET', bot_key, 'current_task_id', cjson.encode(task_id))
+    else
+        redis.call('HDEL', bot_key, 'current_task_id')
+    end
+    reindex_bot()
+    redis.call('PUBLISH', channel, ARGV[1])
+end
+"""
+
+# ARGV extras: task id, minimum battery level, reservation TTL
+RESERVE_SCRIPT = SCRIPT_PREAMBLE + """
+local task_id = ARGV[n_index_args + 2]
+local min_battery = tonumber(ARGV[n_index_args + 3])
+local ttl = ARGV[n_index_args + 4]
+
+if field('status') ~= 'available' then
+    return 0
+end
+local battery = field('battery_level')
+if type(battery) ~= 'number' or battery < min_battery then
+    return 0
+end
+set_status('reserved', task_id)
+redis.call('SET', reservation_key, task_id, 'EX', ttl)
+return 1
+"""
+
+# ARGV extras: task id
+COMMIT_SCRIPT = SCRIPT_PREAMBLE + """
+local task_id = ARGV[n_index_args + 2]
+
+if field('status') ~= 'reserved' or redis.call('GET', reservation_key) ~= task_id
+        or field('current_task_id') ~= task_id then
+    return 0
+end
+redis.call('DEL', reservation_key)
+set_status('in_mission', task_id)
+return 1
+"""
+
+# ARGV extras: task id, or an empty string to release only an expired reservation
+RELEASE_SCRIPT = SCRIPT_PREAMBLE + """
+local task_id = ARGV[n_index_args + 2]
+local current_task_id = field('current_task_id')
+
+if task_id == '' then
+    if field('status') ~= 'reserved' or redis.call('EXISTS', reservation_key) == 1 then
+        return 0
+    end
+elseif current_task_id ~= task_id then
+    return 0
+end
+redis.call('DEL', reservation_key)
+set_status('available', nil)
+return 1
+"""
+
+class BotReservations:
+    """Atomic reserve/commit/release protocol for assigning bots to tasks.
+
+    ``reserve`` only succeeds for an available bot with enough battery, and
+    marks it reserved with the task id, so concurrent allocators cannot hand
+    the same bot two tasks. ``commit`` turns the reservation into a mission once
+    the task was dispatched, and ``release`` makes the bot available again
+    when dispatch failed or the mission is over. Reservations that are never
+    committed expire and are released by ``release_expired``. Each step is a
+    single Lua script that also updates the fleet indexes.
+    """
+
+    def __init__(
+        self,
+        redis_utils: Optional[RedisUtils] = None,
+        min_battery_level: float = ASSIGNMENT_MIN_BATTERY_LEVEL,
+        ttl_seconds: int = BOT_RESERVATION_TTL_SECONDS,
+    ):
+        """Initialize the protocol on top of an existing Redis connection."""
+        self.redis_utils = redis_utils or RedisUtils()
+        self.redis_client = self.redis_utils.redis_client
+        self.min_battery_level = min_battery_level
+        self.ttl_seconds = ttl_seconds
+        self._reserve = self.redis_client.register_script(RESERVE_SCRIPT)
+        self._commit = self.redis_client.register_script(COMMIT_SCRIPT)
+        self._release = self.redis_client.register_script(RELEASE_SCRIPT)
+
+    def _reservation_key(self, bot_id: str) -> str:
+        return f"{RedisKeys.BOT_RESERVATION.value}:{bot_id}"
+
+    def _run(self, script, bot_id: str, *args, client=None):
+        return script(
+            keys=self.redis_utils.bot_index_keys(bot_id) + [self._reservation_key(bot_id)],
+            args=self.redis_utils.bot_index_args(bot_id) + [RedisKeys.BOT_CHANGES.value] + list(args),
+            client=client,
+        )
+
+    def reserve(self, bot_id: str, task_id: str) -> bool:
+        """Reserve an available bot for a task; False if it is taken, missing or low on battery."""
+        try:
+            reserved = bool(self._run(self._reserve, str(bot_id), str(task_id), self.min_battery_level, self.ttl_seconds))
+            logger.info(f"Reservation of bot {bot_id} for task {task_id}: {'ok' if reserved else 'unavailable'}")
+            return reserved
+        except Exception as e:
+            logger.error(f"Error reserving bot {bot_id} for task {task_id}: {str(e)}")
+            return False
+
+    def commit(self, bot_id: str, task_id: str) -> bool:
+        """Turn a reservation into a mission; False if the reservation expired or belongs to another task."""
+        try:
+            committed = bool(self._run(self._commit, str(bot_id), str(task_id)))
+            if not committed:
+                logger.warning(f"Reservation of bot {bot_id} for task {task_id} was lost before commit")
+            return committed
+        except Exception as e:
+            logger.error(f"Error committing bot {bot_id} to task {task_id}: {str(e)}")
+            return False
+
+    def release(self, bot_id: str, task_id: str) -> bool:
+        """Make a bot available again if it is still reserved for, or on a mission for, the task."""
+        try:
+            return bool(self._run(self._release, str(bot_id), str(task_id)))
+        except Exception as e:
+            logger.error(f"Error releasing bot {bot_id} from task {task_id}: {str(e)}")
+            return False
+
+    def release_expired(self) -> List[str]:
+        """Release reserved bots whose reservation expired without a commit, returning their ids."""
+        try:
+            bot_ids = self.redis_utils.get_bot_ids_by_status("reserved")
+            if not bot_ids:
+                return []
+            pipe = self.redis_client.pipeline()
+            for bot_id in bot_ids:
+                self._run(self._release, bot_id, "", client=pipe)
+            released = [bot_id for bot_id, result in zip(bot_ids, pipe.execute()) if result]
+            if released:
+                logger.info(f"Released expired reservations of bots {released}")
+            return released
+        except Exception as e:
+            logger.error(f"Error releasing expired reservations: {str(e)}")
+            return []
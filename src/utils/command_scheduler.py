@@ -0,0 +1,118 @@
+import logging
+import math
+from typing import Any, Dict, Optional, Tuple
+
+from src.constants import (
+    RedisKeys,
+    COMMAND_AREA_CELL_DEGREES,
+    COMMAND_DEBOUNCE_SECONDS,
+    COMMAND_AREA_STATE_TTL_SECONDS,
+)
+from src.utils.redis import RedisUtils
+
+logger = logging.getLogger(__name__)
+
+# Start a decision unless one is pending or running; a running one marks the area dirty
+TRIGGER_SCRIPT = """
+local state = redis.call('GET', KEYS[1])
+if not state then
+    redis.call('SET', KEYS[1], 'pending', 'EX', ARGV[1])
+    return 1
+end
+if state == 'running' then
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[1])
+end
+return 0
+"""
+
+# Hand a dirty area over to a follow-up decision, otherwise release it
+FINISH_SCRIPT = """
+if redis.call('DEL', KEYS[2]) == 1 then
+    redis.call('SET', KEYS[1], 'pending', 'EX', ARGV[1])
+    return 1
+end
+redis.call('DEL', KEYS[1])
+return 0
+"""
+
+class CommandScheduler:
+    """Coalescing, debounced trigger for command-system decisions per area cell.
+
+    The first trigger for an idle area enqueues a decision immediately. Triggers
+    while that decision is still queued are absorbed by it, since the decision
+    reads the area's incidents when it runs. Triggers while it is running mark
+    the area dirty, and finishing a dirty area schedules exactly one follow-up
+    decision after the debounce window. Each area therefore has at most one
+    decision queued or running, whatever the ingest rate.
+    """
+
+    def __init__(
+        self,
+        redis_utils: Optional[RedisUtils] = None,
+        cell_degrees: float = COMMAND_AREA_CELL_DEGREES,
+        debounce_seconds: float = COMMAND_DEBOUNCE_SECONDS,
+        state_ttl_seconds: int = COMMAND_AREA_STATE_TTL_SECONDS,
+    ):
+        """Initialize the scheduler on top of an existing Redis connection."""
+        self.redis_utils = redis_utils or RedisUtils()
+        self.redis_client = self.redis_utils.redis_client
+        self.cell_degrees = cell_degrees
+        self.debounce_seconds = debounce_seconds
+        self.state_ttl_seconds = state_ttl_seconds
+        self._trigger = self.redis_client.register_script(TRIGGER_SCRIPT)
+        self._finish = self.redis_client.register_script(FINISH_SCRIPT)
+
+    def area_cell(self, lat: float, lon: float) -> str:
+        """Id of the grid cell containing a point."""
+        return f"{math.floor(lat / self.cell_degrees)}:{math.floor(lon / self.cell_degrees)}"
+
+    def area_center(self, area: str) -> Tuple[float, float]:
+        """Center (lat, lon) of a grid cell."""
+        row, col = (int(index) for index in area.split(":"))
+        return (row + 0.5) * self.cell_degrees, (col + 0.5) * self.cell_degrees
+
+    def _keys(self, area: str):
+        return [
+            f"{RedisKeys.COMMAND_AREA_STATE.value}:{area}",
+            f"{RedisKeys.COMMAND_AREA_DIRTY.value}:{area}",
+        ]
+
+    def _payload(self, area: str) -> Dict[str, Any]:
+        lat, lon = self.area_center(area)
+        return {"area": area, "lat": lat, "lon": lon}
+
+    def trigger(self, lat: float, lon: float) -> bool:
+        """Request a decision for the area containing a point; returns whether a new decision was enqueued."""
+        area = self.area_cell(lat, lon)
+        try:
+            if not self._trigger(keys=self._keys(area), args=[self.state_ttl_seconds]):
+                logger.info(f"Command system decision for area {area} coalesced")
+                return False
+            if not self.redis_utils.enqueue_task("command_system", self._payload(area)):
+                self.redis_client.delete(self._keys(area)[0])
+                return False
+            return True
+        except Exception as e:
+            logger.error(f"Error triggering command system for area {area}: {str(e)}")
+            return False
+
+    def begin(self, area: str) -> None:
+        """Mark an area's decision as running; triggers from now on require a follow-up."""
+        try:
+            self.redis_client.set(self._keys(area)[0], "running", ex=self.state_ttl_seconds)
+        except Exception as e:
+            logger.error(f"Error starting command system decision for area {area}: {str(e)}")
+
+    def finish(self, area: str) -> bool:
+        """Release an area, scheduling one debounced follow-up if it was marked dirty."""
+        try:
+            if not self._finish(keys=self._keys(area), args=[self.state_ttl_seconds]):
+                return False
+            logger.info(f"Area {area} changed during its decision, follow-up in {self.debounce_seconds}s")
+            if not self.redis_utils.enqueue_task_in("command_system", self._payload(area), self.debounce_seconds):
+                self.redis_client.delete(self._keys(area)[0])
+                return False
+            return True
+        except Exception as e:
+            logger.error(f"Error finishing command system decision for area {area}: {str(e)}")
+            return False
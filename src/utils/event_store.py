@@ -0,0 +1,157 @@
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.constants import (
+    RedisKeys,
+    REDIS_BATCH_SIZE,
+    EVENT_RETENTION_SECONDS,
+    EVENT_BUCKET_SECONDS,
+    EVENT_COMPACTION_INTERVAL_SECONDS,
+)
+from src.utils.metrics import Metrics
+from src.utils.redis import RedisUtils
+
+logger = logging.getLogger(__name__)
+
+class EventStore:
+    """Retention-managed event storage with time-bucketed geospatial indexes.
+
+    Each event is stored with a TTL and added to the GEO set of the time bucket
+    it was stored in. Nearby queries only search the buckets within the
+    retention period, so their cost follows recent activity rather than the
+    full mission history, and ``since`` narrows them further to the buckets
+    that can hold newer events. Bucket sets expire once all their events have
+    expired.
+    """
+
+    def __init__(
+        self,
+        redis_utils: Optional[RedisUtils] = None,
+        retention_seconds: int = EVENT_RETENTION_SECONDS,
+        bucket_seconds: int = EVENT_BUCKET_SECONDS,
+        compaction_interval_seconds: int = EVENT_COMPACTION_INTERVAL_SECONDS,
+    ):
+        """Initialize the event store on top of an existing Redis connection."""
+        self.redis_utils = redis_utils or RedisUtils()
+        self.redis_client = self.redis_utils.redis_client
+        self.retention_seconds = retention_seconds
+        self.bucket_seconds = bucket_seconds
+        self.compaction_interval_seconds = compaction_interval_seconds
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def _bucket_key(self, bucket: int) -> str:
+        return f"{RedisKeys.EVENTS_BY_LOCATION.value}:{bucket}"
+
+    def _bucket_keys(self, since: float, until: float) -> List[str]:
+        """Keys of the buckets overlapping [since, until], newest first."""
+        return [
+            self._bucket_key(bucket)
+            for bucket in range(self._bucket(until), self._bucket(since) - 1, -1)
+        ]
+
+    def store(self, event_data: Dict[str, Any]) -> Optional[str]:
+        """Store an event with its retention TTL and index it in the current time bucket."""
+        try:
+            stored_at = time.time()
+            event_id = f"event:{datetime.now().timestamp()}"
+            event_data["stored_at"] = stored_at
+            bucket_key = self._bucket_key(self._bucket(stored_at))
+
+            pipe = self.redis_client.pipeline()
+            pipe.set(event_id, json.dumps(event_data), ex=self.retention_seconds)
+            pipe.geoadd(bucket_key, [event_data["lon"], event_data["lat"], event_id])
+            # The bucket outlives its newest possible event by one retention period
+            pipe.expireat(bucket_key, int((self._bucket(stored_at) + 1) * self.bucket_seconds + self.retention_seconds))
+            pipe.execute()
+            Metrics.get_instance().inc("asap_events_stored_total", {"data_type": event_data.get("data_type") or "unknown"})
+            return event_id
+        except Exception as e:
+            logger.error(f"Error storing event: {str(e)}")
+            return None
+
+    def nearby(self, lat: float, lon: float, radius_km: float = 1.0, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Get the retained events within radius_km of a point, stored at or after since (epoch seconds) if given."""
+        try:
+            now = time.time()
+            oldest = now - self.retention_seconds
+            since = oldest if since is None else max(since, oldest)
+            pipe = self.redis_client.pipeline()
+            # Only the buckets that can hold events stored since then are searched
+            for bucket_key in self._bucket_keys(since, now):
+                pipe.geosearch(bucket_key, longitude=lon, latitude=lat, radius=radius_km, unit="km")
+            event_ids = [event_id for bucket_ids in pipe.execute() for event_id in bucket_ids]
+            return [
+                event for event in self.redis_utils.get_events(event_ids)
+                if event.get("stored_at", 0) >= since
+            ]
+        except Exception as e:
+            logger.error(f"Error getting nearby events: {str(e)}")
+            return []
+
+    def request_compaction(self) -> bool:
+        """Enqueue a compaction job unless one was already requested within the compaction interval."""
+        try:
+            if self.redis_client.set(RedisKeys.EVENTS_COMPACTION_LOCK.value, 1, nx=True, ex=self.compaction_interval_seconds):
+                return self.redis_utils.enqueue_task("event_store_compaction", {})
+            return False
+        except Exception as e:
+            logger.error(f"Error requesting event store compaction: {str(e)}")
+            return False
+
+    def compact(self) -> int:
+        """Remove GEO members whose events have expired from the live buckets, returning how many were removed."""
+        removed = 0
+        try:
+            now = time.time()
+            for index_key in self._bucket_keys(now - self.retention_seconds, now):
+                members = self.redis_client.zrange(index_key, 0, -1)
+                for start in range(0, len(members), REDIS_BATCH_SIZE):
+                    chunk = members[start:start + REDIS_BATCH_SIZE]
+                    pipe = self.redis_client.pipeline()
+                    for member in chunk:
+                        pipe.exists(member)
+                    expired = [member for member, exists in zip(chunk, pipe.execute()) if not exists]
+                    if expired:
+                        self.redis_client.zrem(index_key, *expired)
+                        removed += len(expired)
+
+            logger.info(f"Event store compaction removed {removed} expired index entries")
+            return removed
+        except Exception as e:
+            logger.error(f"Error compacting event store: {str(e)}")
+            return removed
+
+    def migrate_legacy_index(self) -> int:
+        """Give the events of the un-bucketed index from before retention management a TTL and drop that index.
+
+        Those events are never returned by ``nearby``, so they only need to
+        expire. Returns how many events were given a TTL.
+        """
+        legacy_key = RedisKeys.EVENTS_BY_LOCATION.value
+        migrated = 0
+        try:
+            if self.redis_client.type(legacy_key) not in (b"zset", "zset"):
+                return 0
+            members = self.redis_client.zrange(legacy_key, 0, -1)
+            for start in range(0, len(members), REDIS_BATCH_SIZE):
+                chunk = members[start:start + REDIS_BATCH_SIZE]
+                pipe = self.redis_client.pipeline()
+                for member in chunk:
+                    pipe.ttl(member)
+                # -1 is an event without TTL; expired events are gone already
+                unexpiring = [member for member, ttl in zip(chunk, pipe.execute()) if ttl == -1]
+                pipe = self.redis_client.pipeline()
+                for member in unexpiring:
+                    pipe.expire(member, self.retention_seconds)
+                pipe.execute()
+                migrated += len(unexpiring)
+            self.redis_client.delete(legacy_key)
+            logger.info(f"Dropped the legacy event index, {migrated} of its {len(members)} events will expire")
+        except Exception as e:
+            logger.error(f"Error migrating the legacy event index: {str(e)}")
+        return migrated
@@ -0,0 +1,344 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.messages import AIMessage
+
+from src.constants import FAKE_LLM_PROFILE
+
+logger = logging.getLogger(__name__)
+
+# Text that identifies each prompt family, checked in order. The batch prompt
+# embeds a family's instructions, and the thermal prompt mentions image analysis.
+FAMILY_MARKERS = [
+    ("batch", "Return exactly one result per observation"),
+    ("command_system", "Emergency Disaster Command Center"),
+    ("task_allocator", "Task allocator"),
+    ("thermal_image", "thermal image analysis expert"),
+    ("human_report", "human report analysis expert"),
+    ("gas_sensor", "gas sensor data"),
+    ("image", "image analysis expert"),
+]
+CHARS_PER_TOKEN = 4
+
+class FakeLLMError(Exception):
+    """Injected model failure; rate limits carry status_code 429 like the provider's errors."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+def prompt_family(prompt: str) -> str:
+    """Prompt family of a prompt built from one of the templates in prompts/, or "default"."""
+    for family, marker in FAMILY_MARKERS:
+        if marker in prompt:
+            return family
+    return "default"
+
+def batch_family(prompt: str) -> str:
+    """Family of the instructions embedded in a batch prompt."""
+    for family, marker in FAMILY_MARKERS[1:]:
+        if marker in prompt:
+            return family
+    return "default"
+
+def input_payload(prompt: str) -> Dict[str, Any]:
+    """The JSON payload of a prompt: the whole prompt for image prompts, else the last <input> section."""
+    try:
+        return json.loads(prompt)
+    except ValueError:
+        start = prompt.rfind("<input>")
+        end = prompt.rfind("</input>")
+        try:
+            return json.loads(prompt[start + len("<input>"):end])
+        except ValueError:
+            return {}
+
+def sample(spec: Any, rng: random.Random) -> float:
+    """Draw a value from a distribution spec of FAKE_LLM_PROFILE."""
+    if isinstance(spec, (int, float)):
+        return float(spec)
+    distribution = spec.get("distribution", "constant")
+    if distribution == "constant":
+        return float(spec["value"])
+    if distribution == "uniform":
+        return rng.uniform(spec["min"], spec["max"])
+    if distribution == "normal":
+        return max(0.0, rng.gauss(spec["mean"], spec["stddev"]))
+    if distribution == "lognormal":
+        return rng.lognormvariate(math.log(spec["median"]), spec["sigma"])
+    if distribution == "exponential":
+        return rng.expovariate(1 / spec["mean"]) if spec["mean"] else 0.0
+    raise ValueError(f"Unknown distribution: {distribution}")
+
+class FakeChatModel:
+    """Deterministic chat model stand-in for offline load tests.
+
+    Recognises the prompt family from the template text and answers with a
+    response in that template's output schema, after a latency drawn from the
+    family's profile, failing at the profile's error rates and reporting
+    token usage like the real model. Every draw comes from a generator seeded
+    with the profile seed, the prompt and how often the prompt was seen, so a
+    run is reproducible no matter in which order concurrent calls complete.
+    """
+
+    def __init__(self, profile: Optional[Dict[str, Any]] = None):
+        self.profile = profile or {}
+        self.seed = self.profile.get("seed", FAKE_LLM_PROFILE["seed"])
+        self._lock = threading.Lock()
+        self._occurrences: Dict[str, int] = {}
+        # Task ids issued so far, so repeated decisions for an area do not re-issue tasks
+        self.issued_task_ids: Set[str] = set()
+
+    @classmethod
+    def from_file(cls, path: Optional[str]) -> "FakeChatModel":
+        """Build the model from a JSON profile file, or with the built-in profile when there is none."""
+        if not path:
+            return cls()
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def family_profile(self, family: str) -> Dict[str, Any]:
+        """Settings of a family; the profile's defaults override the built-in per family settings."""
+        return {
+            **FAKE_LLM_PROFILE["defaults"],
+            **FAKE_LLM_PROFILE["families"].get(family, {}),
+            **self.profile.get("defaults", {}),
+            **self.profile.get("families", {}).get(family, {}),
+        }
+
+    def _rng(self, family: str, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+        return random.Random(f"{self.seed}:{family}:{digest}:{occurrence}")
+
+    def _prepare(self, prompt: Any) -> Tuple[str, str, random.Random, Dict[str, Any], float]:
+        prompt = str(prompt)
+        family = prompt_family(prompt)
+        settings_family = batch_family(prompt) if family == "batch" else family
+        rng = self._rng(family, prompt)
+        settings = self.family_profile(settings_family)
+        latency = sample(settings["latency_ms"], rng) / 1000
+        return prompt, family, rng, settings, latency
+
+    def _complete(self, prompt: str, family: str, rng: random.Random, settings: Dict[str, Any]) -> AIMessage:
+        draw = rng.random()
+        if draw < settings["rate_limit_rate"]:
+            raise FakeLLMError(f"Rate limited ({family})", 429)
+        if draw < settings["rate_limit_rate"] + settings["error_rate"]:
+            raise FakeLLMError(f"Internal server error ({family})", 500)
+
+        response = self.respond(family, prompt, rng, settings)
+        content = json.dumps(response)
+        output_tokens = int(sample(settings["output_tokens"], rng))
+        if family == "batch":
+            output_tokens *= max(1, len(response.get("results") or []))
+        input_tokens = len(prompt) // CHARS_PER_TOKEN
+        return AIMessage(
+            content=content,
+            usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens},
+        )
+
+    async def ainvoke(self, prompt: Any) -> AIMessage:
+        prompt, family, rng, settings, latency = self._prepare(prompt)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return self._complete(prompt, family, rng, settings)
+
+    def invoke(self, prompt: Any) -> AIMessage:
+        prompt, family, rng, settings, latency = self._prepare(prompt)
+        if latency > 0:
+            time.sleep(latency)
+        return self._complete(prompt, family, rng, settings)
+
+    def respond(self, family: str, prompt: str, rng: random.Random, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Response of a prompt family, following the output schema of its template."""
+        payload = input_payload(prompt)
+        if family == "batch":
+            inner_family = batch_family(prompt)
+            return {
+                "results": [
+                    {"index": observation.get("index"), "interpretation": self.interpret(inner_family, observation, rng, settings)}
+                    for observation in payload.get("observations") or []
+                ]
+            }
+        if family == "command_system":
+            return self.decide(payload)
+        if family == "task_allocator":
+            return self.allocate(payload)
+        return self.interpret(family, payload, rng, settings)
+
+    @staticmethod
+    def context(observation: Dict[str, Any]) -> Dict[str, Any]:
+        """Find the context with the observation's location anywhere in its payload."""
+        if "context" in observation:
+            return observation["context"]
+        for item in observation.get("content") or []:
+            if isinstance(item, dict) and "context" in item:
+                return item["context"]
+        return {}
+
+    def observe(self, family: str, observation: Dict[str, Any], rng: random.Random, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """What the observation shows: whether there is fire or smoke, and how many survivors."""
+        hazard_probability = float(settings["hazard_probability"])
+        survivor_probability = float(settings["survivor_probability"])
+        return {
+            "fire": rng.random() < hazard_probability,
+            "smoke": rng.random() < hazard_probability,
+            "survivors": rng.randint(1, 4) if rng.random() < survivor_probability else 0,
+        }
+
+    def interpret(self, family: str, observation: Dict[str, Any], rng: random.Random, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Interpretation of one observation in the shape its family's prompt asks for."""
+        seen = self.observe(family, observation, rng, settings)
+        hazards = []
+        if seen["fire"]:
+            hazards.append({"type": "fire", "severity": "high", "confidence": 0.9, "description": "Active flames"})
+        if seen["smoke"]:
+            hazards.append({"type": "smoke", "severity": "medium", "confidence": 0.8, "description": "Dense smoke"})
+        count = seen["survivors"]
+        recommendations = ["Dispatch rescue team"] if count else (["Monitor hazard spread"] if hazards else [])
+
+        if family == "human_report":
+            # The caller is at the reported location, so the report itself is a survivor sighting
+            count = count or 1
+            context = self.context(observation)
+            return {
+                "report_type": {"primary": "survivor", "secondary": ["hazard"] if hazards else []},
+                "priority": {"urgency": "immediate" if hazards else "high", "reasoning": "Survivor requesting help", "time_sensitive": True},
+                "reliability": {"confidence": 0.7, "source_type": "first_hand", "verification_needed": []},
+                "incidents": {
+                    "hazards": [
+                        {"type": hazard["type"], "severity": hazard["severity"], "status": "active", "radius_meters": None, "description": hazard["description"]}
+                        for hazard in hazards
+                    ],
+                    "casualties": [{"count": count, "condition": "serious", "medical_needs": [], "accessibility": "difficult", "location_details": None}],
+                    "infrastructure": [],
+                },
+                "response_requirements": {
+                    "immediate_needs": recommendations or ["Dispatch rescue team"],
+                    "equipment_needed": [],
+                    "specialist_teams": ["search_rescue"],
+                    "access_routes": {"recommended": None, "blocked": []},
+                },
+                "location_data": {
+                    "coordinates": {"primary": {"lat": context.get("lat"), "lon": context.get("long")}, "perimeter": []},
+                    "landmarks": [],
+                    "access_points": [],
+                },
+            }
+        if family == "gas_sensor":
+            readings = observation.get("gas_levels") or {}
+            return {
+                "gas_readings": [
+                    {"gas_type": gas, "concentration": str(value), "threshold_exceeded": bool(hazards), "hazard_level": "danger" if hazards else "safe", "confidence": 0.8}
+                    for gas, value in readings.items()
+                ],
+                "hazards": hazards,
+                "risk_assessment": {"overall_risk": "high" if hazards else "low", "immediate_action_required": bool(hazards), "confidence": 0.8},
+                "recommendations": recommendations,
+            }
+        if family == "thermal_image":
+            signatures = [
+                {"type": hazard["type"] if hazard["type"] == "fire" else "hot_spot", "temperature_range": "high", "confidence": hazard["confidence"], "description": hazard["description"]}
+                for hazard in hazards
+            ]
+            if count:
+                signatures.append({"type": "human", "temperature_range": "medium", "confidence": 0.85, "description": "Body heat"})
+            return {
+                "heat_signatures": signatures,
+                "survivors": [{"count": count, "heat_signature": "strong", "confidence": 0.85, "description": "Human heat signatures"}] if count else [],
+                "hazards": hazards,
+            }
+        return {
+            "hazards": hazards,
+            "survivors": [{"count": count, "condition": "injured", "confidence": 0.85, "description": "People visible in the frame"}] if count else [],
+            "terrain": {"accessibility": "partially_accessible" if hazards else "accessible", "obstacles": [], "confidence": 0.7},
+            "recommendations": recommendations,
+        }
+
+    def _task(self, incident: Dict[str, Any], task_type: str, priority: float, context: str) -> Dict[str, Any]:
+        return {
+            "task_id": f"{incident['incident_id']}:{task_type}",
+            "task_type": task_type,
+            "priority": priority,
+            "lat": incident["lat"],
+            "long": incident["lon"],
+            "timestamp": time.time(),
+            "context": context,
+            "requirements": {"capabilities": [task_type], "equipment": [], "urgency_minutes": 10 if priority > 0.8 else 30},
+            "dependencies": {"prerequisite_tasks": [], "environmental_conditions": {}},
+        }
+
+    def _incident_tasks(self, incidents: List[Dict[str, Any]], active_task_ids: Set[str]) -> List[Dict[str, Any]]:
+        """One rescue task per incident with survivors and one survey per unconfirmed hazard, each issued once."""
+        tasks = []
+        for incident in incidents:
+            survivors = (incident.get("survivors") or {}).get("count", 0)
+            hazards = incident.get("hazards") or {}
+            candidates = []
+            if survivors:
+                candidates.append(self._task(incident, "assist_rescue", 0.95, f"{survivors} survivors reported"))
+            if hazards and max(finding.get("confidence", 0) for finding in hazards.values()) < 0.95:
+                # Unconfirmed hazards are surveyed before committing rescue resources
+                candidates.append(self._task(incident, "search", 0.6, f"Confirm {', '.join(hazards)}"))
+            with self._lock:
+                for task in candidates:
+                    if task["task_id"] in active_task_ids or task["task_id"] in self.issued_task_ids:
+                        continue
+                    self.issued_task_ids.add(task["task_id"])
+                    tasks.append(task)
+        return tasks
+
+    @staticmethod
+    def _risk_level(incidents: List[Dict[str, Any]]) -> str:
+        if any((incident.get("survivors") or {}).get("count") for incident in incidents):
+            return "critical"
+        if any(incident.get("hazards") for incident in incidents):
+            return "high"
+        return "low"
+
+    def decide(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Command decision, as a task diff for incremental prompts and a task list otherwise."""
+        if "new_incidents" in payload:
+            incidents = payload["new_incidents"]
+            active_task_ids = {task.get("task_id") for task in payload.get("active_tasks") or []}
+            return {
+                "added": self._incident_tasks(incidents, active_task_ids),
+                "updated": [],
+                "cancelled": [],
+                "metadata": {"risk_level": self._risk_level(incidents)},
+            }
+        incidents = payload.get("incidents") or []
+        return {
+            "tasks": self._incident_tasks(incidents, set()),
+            "metadata": {"risk_level": self._risk_level(incidents)},
+        }
+
+    def allocate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Allocation of the first task to the first available candidate bot."""
+        tasks = payload.get("tasks") or []
+        bots = payload.get("bots_metadata") or []
+        available = [bot for bot in bots if bot.get("status") == "available"]
+        bot: Optional[Dict[str, Any]] = (available or bots or [None])[0]
+        if not tasks or bot is None:
+            return {}
+        task = tasks[0]
+        return {
+            "bot_type": bot["bot_type"],
+            "bot_id": bot["bot_id"],
+            "task_id": task["task_id"],
+            "task_type": task["task_type"],
+            "target_location": {"lat": task["lat"], "long": task["long"]},
+            "context": task.get("context"),
+            "reason": "First available bot among the candidates",
+            "task_allocated_timestamp": time.time(),
+        }
@@ -0,0 +1,142 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from src.constants import GAS_SENSOR_THRESHOLDS
+
+logger = logging.getLogger(__name__)
+
+NORMAL = "normal"
+AMBIGUOUS = "ambiguous"
+CRITICAL = "critical"
+
+HEAT_SENSORS = "heat_sensors"
+# Fire fields of the readings that are passed through to the interpretation
+FIRE_FIELDS = ("has_fire", "fire_location", "fire_locations")
+
+class GasSensorRuleEngine:
+    """Threshold rules that interpret clearly normal or clearly critical gas sensor readings.
+
+    ``evaluate`` returns a ``processed_data`` dict in the same shape as the
+    gas sensor prompt's JSON response, or None when the readings are ambiguous
+    and should be interpreted by the LLM.
+    """
+
+    HAZARD_LEVELS = {NORMAL: "safe", AMBIGUOUS: "warning", CRITICAL: "danger"}
+
+    def __init__(self, thresholds: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Initialize the rule engine with per-metric thresholds."""
+        self.thresholds = thresholds or GAS_SENSOR_THRESHOLDS
+
+    def _classify(self, metric: str, value: Any) -> Optional[str]:
+        """Classify a single reading, or return None when it cannot be judged."""
+        if metric not in self.thresholds or not isinstance(value, (int, float)) or isinstance(value, bool):
+            return None
+        limits = self.thresholds[metric]
+        if value >= limits["critical_min"]:
+            return CRITICAL
+        if value <= limits["normal_max"]:
+            return NORMAL
+        return AMBIGUOUS
+
+    def _classify_heat_sensor(self, sensor: Dict[str, Any]) -> str:
+        """A heat sensor without a usable temperature is ambiguous."""
+        return self._classify(HEAT_SENSORS, sensor.get("temperature")) or AMBIGUOUS
+
+    def _classify_heat_sensors(self, heat_sensors: List[Dict[str, Any]]) -> str:
+        """Critical if any heat sensor is hot, normal if all of them are cool, ambiguous otherwise."""
+        levels = [self._classify_heat_sensor(sensor) for sensor in heat_sensors]
+        if CRITICAL in levels:
+            return CRITICAL
+        if all(level == NORMAL for level in levels):
+            return NORMAL
+        return AMBIGUOUS
+
+    def evaluate(self, readings: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Interpret readings that are clearly normal or clearly critical."""
+        if not isinstance(readings, dict):
+            return None
+
+        classifications = {
+            metric: self._classify(metric, readings.get(metric))
+            for metric in self.thresholds
+            if metric != HEAT_SENSORS
+        }
+        classifications = {metric: level for metric, level in classifications.items() if level is not None}
+        if not classifications:
+            return None
+
+        heat_sensors = readings.get("heat_sensors") or []
+        heat_level = self._classify_heat_sensors(heat_sensors)
+        levels = list(classifications.values()) + [heat_level]
+
+        if CRITICAL in levels:
+            overall = CRITICAL
+        elif all(level == NORMAL for level in levels):
+            overall = NORMAL
+        else:
+            logger.info("Gas sensor readings are ambiguous, deferring to LLM")
+            return None
+
+        return self._build_processed_data(readings, classifications, heat_sensors, overall)
+
+    def _build_processed_data(
+        self,
+        readings: Dict[str, Any],
+        classifications: Dict[str, str],
+        heat_sensors: List[Dict[str, Any]],
+        overall: str,
+    ) -> Dict[str, Any]:
+        gas_readings = []
+        hazards = []
+        for metric, level in classifications.items():
+            limits = self.thresholds[metric]
+            value = readings.get(metric)
+            if metric != "temperature":
+                gas_readings.append({
+                    "gas_type": metric,
+                    "concentration": f"{value} {limits['unit']}",
+                    "threshold_exceeded": level != NORMAL,
+                    "hazard_level": self.HAZARD_LEVELS[level],
+                    "confidence": 1.0
+                })
+            if level == CRITICAL:
+                hazards.append({
+                    "type": "extreme_heat" if metric == "temperature" else "toxic_air",
+                    "severity": "high",
+                    "confidence": 1.0,
+                    "description": f"{metric} reading of {value} {limits['unit']} is at or above the critical threshold of {limits['critical_min']} {limits['unit']}"
+                })
+
+        for sensor in heat_sensors:
+            level = self._classify_heat_sensor(sensor)
+            if level == NORMAL:
+                continue
+            hazards.append({
+                "type": "fire",
+                "severity": "high" if level == CRITICAL else "medium",
+                "confidence": 1.0,
+                "description": f"Heat sensor reports {sensor.get('temperature')} celsius over {sensor.get('area')} m2 at ({sensor.get('lat')}, {sensor.get('long')})"
+            })
+
+        if overall == CRITICAL:
+            recommendations = [
+                "Evacuate personnel from the affected area",
+                "Dispatch responders with respiratory protection",
+                "Keep monitoring readings for spread"
+            ]
+        else:
+            recommendations = ["Continue routine monitoring"]
+
+        processed_data = {
+            "gas_readings": gas_readings,
+            "hazards": hazards,
+            "risk_assessment": {
+                "overall_risk": "high" if overall == CRITICAL else "low",
+                "immediate_action_required": overall == CRITICAL,
+                "confidence": 1.0
+            },
+            "recommendations": recommendations,
+            "interpreted_by": "rule_engine"
+        }
+        processed_data.update({field: readings[field] for field in FIRE_FIELDS if field in readings})
+        return processed_data
@@ -0,0 +1,197 @@
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from src.constants import BOT_SPEEDS_KMH, DEFAULT_BOT_SPEED_KMH, BOT_VERTICAL_SPEEDS_MS
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+def _unit_vectors(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+def haversine_matrix(lats_a: np.ndarray, lons_a: np.ndarray, lats_b: np.ndarray, lons_b: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km between every point of a and every point of b.
+
+    Computed from the chord between unit vectors, so the pairwise part is a
+    single matrix product; this equals the haversine formula to well under a
+    meter at Earth scale.
+    """
+    dots = _unit_vectors(lats_a, lons_a) @ _unit_vectors(lats_b, lons_b).T
+    half_chords = np.sqrt(np.clip(2 - 2 * dots, 0.0, 4.0)) / 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(half_chords, 1.0))
+
+def pairwise_distance_matrix(points: Sequence[Dict[str, Any]], lon_field: str = "long") -> np.ndarray:
+    """Symmetric distances in km between every pair of points (e.g. events x events)."""
+    lats = np.array([float(point["lat"]) for point in points])
+    lons = np.array([float(point[lon_field]) for point in points])
+    return haversine_matrix(lats, lons, lats, lons)
+
+def bot_speeds(bots: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Horizontal speed of each bot in km/h, from its metadata or its type's default."""
+    return np.array([
+        float(bot.get("speed_kmh") or BOT_SPEEDS_KMH.get(bot.get("bot_type"), DEFAULT_BOT_SPEED_KMH))
+        for bot in bots
+    ])
+
+def bot_vertical_speeds(bots: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Vertical speed of each bot in m/s, 0 for bots that cannot change altitude."""
+    return np.array([
+        float(bot.get("vertical_speed_ms") or BOT_VERTICAL_SPEEDS_MS.get(bot.get("bot_type"), 0.0))
+        for bot in bots
+    ])
+
+def eta_matrix(
+    distances_km: np.ndarray,
+    speeds_kmh: np.ndarray,
+    altitude_changes_m: Optional[np.ndarray] = None,
+    vertical_speeds_ms: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Travel time in seconds for each bot (row) to each target (column).
+
+    Horizontal and vertical legs are flown one after the other. Altitude
+    changes are ignored for bots with no vertical speed.
+    """
+    etas = distances_km / np.maximum(speeds_kmh, 1e-6)[:, None] * 3600
+    if altitude_changes_m is not None and vertical_speeds_ms is not None:
+        vertical = np.where(
+            vertical_speeds_ms[:, None] > 0,
+            np.abs(altitude_changes_m) / np.maximum(vertical_speeds_ms, 1e-6)[:, None],
+            0.0,
+        )
+        etas = etas + vertical
+    return etas
+
+class FleetDistanceCache:
+    """Bots x targets distance matrix that is updated incrementally.
+
+    Rows are keyed by bot_id and columns by target id, each with the position
+    it was computed for. When bots or targets move, only their rows or columns
+    are recomputed, so a target id that comes back at a new location is never
+    served a stale column. Lookups return the sub-matrix for the requested bots
+    and targets, in request order. With ``max_targets`` set, the columns of the
+    least recently requested targets are dropped once there are more than that.
+    """
+
+    def __init__(self, target_id_field: str = "task_id", max_targets: Optional[int] = None):
+        self.target_id_field = target_id_field
+        self.max_targets = max_targets
+        self._lookups = 0
+        self._target_last_lookup: Dict[str, int] = {}
+        self._bot_index: Dict[str, int] = {}
+        self._bot_positions = np.empty((0, 2))
+        self._target_index: Dict[str, int] = {}
+        self._target_positions = np.empty((0, 2))
+        self._distances = np.empty((0, 0))
+
+    @staticmethod
+    def _positions(items: Sequence[Dict[str, Any]]) -> np.ndarray:
+        return np.array([[float(item["lat"]), float(item["long"])] for item in items]).reshape(-1, 2)
+
+    def update_bots(self, bots: Sequence[Dict[str, Any]]) -> int:
+        """Add new bots and recompute the rows of bots that moved, returning how many rows were computed."""
+        positions = self._positions(bots)
+        bot_ids = [str(bot["bot_id"]) for bot in bots]
+
+        new_ids = [bot_id for bot_id in dict.fromkeys(bot_ids) if bot_id not in self._bot_index]
+        if new_ids:
+            for bot_id in new_ids:
+                self._bot_index[bot_id] = len(self._bot_index)
+            # Placeholder positions never match, so the new rows are computed below
+            self._bot_positions = np.vstack([self._bot_positions, np.full((len(new_ids), 2), np.nan)])
+            self._distances = np.vstack([self._distances, np.empty((len(new_ids), self._distances.shape[1]))])
+
+        rows = np.array([self._bot_index[bot_id] for bot_id in bot_ids], dtype=int)
+        moved = np.flatnonzero((self._bot_positions[rows] != positions).any(axis=1))
+        if moved.size == 0:
+            return 0
+
+        stale_rows = rows[moved]
+        self._bot_positions[stale_rows] = positions[moved]
+        if self._target_index:
+            self._distances[stale_rows] = haversine_matrix(
+                positions[moved, 0], positions[moved, 1],
+                self._target_positions[:, 0], self._target_positions[:, 1],
+            )
+        return int(moved.size)
+
+    def update_targets(self, targets: Sequence[Dict[str, Any]]) -> int:
+        """Add new targets and recompute the columns of targets that moved, returning how many columns were computed."""
+        positions = self._positions(targets)
+        target_ids = [str(target[self.target_id_field]) for target in targets]
+
+        new_ids = [target_id for target_id in dict.fromkeys(target_ids) if target_id not in self._target_index]
+        if new_ids:
+            for target_id in new_ids:
+                self._target_index[target_id] = len(self._target_index)
+            # Placeholder positions never match, so the new columns are computed below
+            self._target_positions = np.vstack([self._target_positions, np.full((len(new_ids), 2), np.nan)])
+            self._distances = np.hstack([self._distances, np.empty((self._distances.shape[0], len(new_ids)))])
+
+        columns = np.array([self._target_index[target_id] for target_id in target_ids], dtype=int)
+        moved = np.flatnonzero((self._target_positions[columns] != positions).any(axis=1))
+        if moved.size == 0:
+            return 0
+
+        stale_columns = columns[moved]
+        self._target_positions[stale_columns] = positions[moved]
+        if self._bot_index:
+            self._distances[:, stale_columns] = haversine_matrix(
+                self._bot_positions[:, 0], self._bot_positions[:, 1],
+                positions[moved, 0], positions[moved, 1],
+            )
+        return int(moved.size)
+
+    def retain_bots(self, bot_ids: Sequence[str]) -> None:
+        """Drop the rows of every bot not in bot_ids."""
+        keep = [bot_id for bot_id in dict.fromkeys(str(bot_id) for bot_id in bot_ids) if bot_id in self._bot_index]
+        rows = [self._bot_index[bot_id] for bot_id in keep]
+        self._bot_positions = self._bot_positions[rows].reshape(-1, 2)
+        self._distances = self._distances[rows, :]
+        self._bot_index = {bot_id: row for row, bot_id in enumerate(keep)}
+
+    def retain_targets(self, target_ids: Sequence[str]) -> None:
+        """Drop the columns of every target not in target_ids."""
+        keep = [target_id for target_id in dict.fromkeys(str(target_id) for target_id in target_ids) if target_id in self._target_index]
+        columns = [self._target_index[target_id] for target_id in keep]
+        self._target_positions = self._target_positions[columns].reshape(-1, 2)
+        self._distances = self._distances[:, columns]
+        self._target_index = {target_id: column for column, target_id in enumerate(keep)}
+        self._target_last_lookup = {target_id: self._target_last_lookup.get(target_id, 0) for target_id in keep}
+
+    def distances(self, bots: Sequence[Dict[str, Any]], targets: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Bots x targets distances in km, refreshing the cache for moved bots and new targets."""
+        self.update_bots(bots)
+        self.update_targets(targets)
+        rows = [self._bot_index[str(bot["bot_id"])] for bot in bots]
+        target_ids = [str(target[self.target_id_field]) for target in targets]
+        distances = self._distances[np.ix_(rows, [self._target_index[target_id] for target_id in target_ids])]
+
+        self._lookups += 1
+        for target_id in target_ids:
+            self._target_last_lookup[target_id] = self._lookups
+        if self.max_targets is not None and len(self._target_index) > self.max_targets:
+            recent = sorted(self._target_index, key=lambda target_id: self._target_last_lookup.get(target_id, 0), reverse=True)
+            self.retain_targets(recent[:self.max_targets])
+        return distances
+
+    def etas(self, bots: Sequence[Dict[str, Any]], targets: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Bots x targets travel times in seconds."""
+        altitude_changes = (
+            np.array([float(target.get("altitude") or 0) for target in targets])[None, :]
+            - np.array([float(bot.get("altitude") or 0) for bot in bots])[:, None]
+        )
+        # Targets without an altitude are reached at the bot's current altitude
+        has_altitude = np.array([target.get("altitude") is not None for target in targets])[None, :]
+        altitude_changes = np.where(has_altitude, altitude_changes, 0.0)
+        return eta_matrix(
+            self.distances(bots, targets),
+            bot_speeds(bots),
+            altitude_changes,
+            bot_vertical_speeds(bots),
+        )
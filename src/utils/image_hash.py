@@ -0,0 +1,182 @@
+import base64
+import io
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+from PIL import Image
+from scipy.fft import dct
+
+from src.constants import (
+    RedisKeys,
+    IMAGE_HASH_ALGORITHM,
+    IMAGE_HASH_MAX_HAMMING_DISTANCE,
+    IMAGE_HASH_MAX_GEO_DISTANCE_METERS,
+    IMAGE_HASH_WINDOW_SECONDS,
+    IMAGE_HASH_MAX_CANDIDATES,
+)
+from src.utils.redis import RedisUtils
+
+logger = logging.getLogger(__name__)
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """Pack a boolean array into an integer, most significant bit first."""
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """Difference hash: compares horizontally adjacent pixels of a downscaled grayscale image."""
+    pixels = np.asarray(
+        image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS),
+        dtype=np.int16
+    )
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+def phash(image: Image.Image, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """Perceptual hash: thresholds the low-frequency DCT coefficients against their median."""
+    img_size = hash_size * highfreq_factor
+    pixels = np.asarray(
+        image.convert("L").resize((img_size, img_size), Image.Resampling.LANCZOS),
+        dtype=np.float64
+    )
+    coefficients = dct(dct(pixels, axis=0, norm="ortho"), axis=1, norm="ortho")
+    low_freq = coefficients[:hash_size, :hash_size]
+    return _bits_to_int(low_freq > np.median(low_freq))
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(hash_a ^ hash_b).count("1")
+
+class ImageDeduplicator:
+    """Suppresses LLM calls for frames that look like a recent frame from the same spot.
+
+    Recent hashes are kept per data type in a Redis GEO set, so a lookup only
+    compares against frames captured within ``max_geo_distance_meters``.
+    """
+
+    HASH_FUNCTIONS = {"dhash": dhash, "phash": phash}
+
+    def __init__(
+        self,
+        redis_utils: Optional[RedisUtils] = None,
+        algorithm: str = IMAGE_HASH_ALGORITHM,
+        max_hamming_distance: int = IMAGE_HASH_MAX_HAMMING_DISTANCE,
+        max_geo_distance_meters: float = IMAGE_HASH_MAX_GEO_DISTANCE_METERS,
+        window_seconds: int = IMAGE_HASH_WINDOW_SECONDS,
+        max_candidates: int = IMAGE_HASH_MAX_CANDIDATES,
+    ):
+        """Initialize the deduplicator on top of an existing Redis connection."""
+        if algorithm not in self.HASH_FUNCTIONS:
+            raise ValueError(f"Unknown image hash algorithm: {algorithm}")
+        self.redis_utils = redis_utils or RedisUtils()
+        self.redis_client = self.redis_utils.redis_client
+        self.algorithm = algorithm
+        self.max_hamming_distance = max_hamming_distance
+        self.max_geo_distance_meters = max_geo_distance_meters
+        self.window_seconds = window_seconds
+        self.max_candidates = max_candidates
+
+    def compute_hash(self, image: Union[str, bytes, None]) -> Optional[int]:
+        """Compute the perceptual hash of an image given as raw bytes or base64 text."""
+        if not image:
+            return None
+        try:
+            image_bytes = image if isinstance(image, (bytes, bytearray, memoryview)) else base64.b64decode(image)
+            with Image.open(io.BytesIO(image_bytes)) as img:
+                return self.HASH_FUNCTIONS[self.algorithm](img)
+        except Exception as e:
+            logger.error(f"Error computing image hash: {str(e)}")
+            return None
+
+    def _entry_key(self, data_type: str, member: str) -> str:
+        return f"{RedisKeys.IMAGE_HASH_ENTRY.value}:{data_type}:{member}"
+
+    def find_duplicate(self, data_type: str, image_hash: Optional[int], lat: Any, lon: Any) -> Optional[Dict[str, Any]]:
+        """Return the interpretation of a recent near-identical frame captured nearby, if any."""
+        if image_hash is None or lat is None or lon is None:
+            return None
+        try:
+            self._prune(data_type)
+            members = self.redis_client.geosearch(
+                f"{RedisKeys.IMAGE_HASH_LOCATION.value}:{data_type}",
+                longitude=float(lon),
+                latitude=float(lat),
+                radius=self.max_geo_distance_meters,
+                unit="m",
+                sort="ASC",
+                count=self.max_candidates
+            )
+
+            for member in members:
+                member = member.decode() if isinstance(member, bytes) else member
+                candidate_hash = int(member.split(":", 1)[0], 16)
+                distance = hamming_distance(image_hash, candidate_hash)
+                if distance > self.max_hamming_distance:
+                    continue
+
+                entry = self.redis_client.get(self._entry_key(data_type, member))
+                if entry is None:
+                    continue
+
+                self._record(data_type, "skipped")
+                logger.info(f"Reusing interpretation of near-duplicate {data_type} frame (hamming distance {distance})")
+                return json.loads(entry)
+
+            self._record(data_type, "unique")
+            return None
+        except Exception as e:
+            logger.error(f"Error searching for near-duplicate {data_type} frames: {str(e)}")
+            return None
+
+    def remember(self, data_type: str, image_hash: Optional[int], lat: Any, lon: Any, interpretation: Dict[str, Any]) -> bool:
+        """Index a frame's hash and interpretation so that later near-duplicates can reuse it."""
+        if image_hash is None or lat is None or lon is None:
+            return False
+        try:
+            now = time.time()
+            member = f"{image_hash:016x}:{now}"
+            pipe = self.redis_client.pipeline()
+            pipe.set(self._entry_key(data_type, member), json.dumps(interpretation), ex=self.window_seconds)
+            pipe.geoadd(f"{RedisKeys.IMAGE_HASH_LOCATION.value}:{data_type}", [float(lon), float(lat), member])
+            pipe.zadd(f"{RedisKeys.IMAGE_HASH_RECENT.value}:{data_type}", {member: now})
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error indexing {data_type} frame hash: {str(e)}")
+            return False
+
+    def _prune(self, data_type: str) -> None:
+        """Remove hashes older than the suppression window from the location index."""
+        recent_key = f"{RedisKeys.IMAGE_HASH_RECENT.value}:{data_type}"
+        expired = self.redis_client.zrangebyscore(recent_key, "-inf", time.time() - self.window_seconds)
+        if expired:
+            pipe = self.redis_client.pipeline()
+            pipe.zrem(f"{RedisKeys.IMAGE_HASH_LOCATION.value}:{data_type}", *expired)
+            pipe.zrem(recent_key, *expired)
+            pipe.execute()
+
+    def _record(self, data_type: str, outcome: str) -> None:
+        """Increment the total and per data type counters for a lookup outcome."""
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hincrby(RedisKeys.IMAGE_HASH_STATS.value, outcome, 1)
+            pipe.hincrby(RedisKeys.IMAGE_HASH_STATS.value, f"{data_type}:{outcome}", 1)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error recording image hash {outcome}: {str(e)}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return how many LLM calls were skipped and how many frames were unique."""
+        try:
+            raw_stats = self.redis_client.hgetall(RedisKeys.IMAGE_HASH_STATS.value)
+            return {
+                (k.decode() if isinstance(k, bytes) else k): int(v)
+                for k, v in raw_stats.items()
+            }
+        except Exception as e:
+            logger.error(f"Error fetching image hash stats: {str(e)}")
+            return {}
@@ -0,0 +1,295 @@
+import json
+import logging
+import math
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.constants import (
+    RedisKeys,
+    EVENT_RETENTION_SECONDS,
+    INCIDENT_CLUSTER_RADIUS_METERS,
+    INCIDENT_CLUSTER_WINDOW_SECONDS,
+    INCIDENT_CONFIDENCE_DELTA,
+    INCIDENT_FORWARD_RADIUS_KM,
+    INCIDENT_LOCK_TIMEOUT_SECONDS,
+)
+from src.utils.redis import RedisUtils
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = ["low", "medium", "high", "critical"]
+MAX_RECOMMENDATIONS = 5
+METERS_PER_DEGREE = 111320.0
+
+# Takes every cell lock or none, so overlapping lock sets cannot deadlock
+LOCK_CELLS_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        return 0
+    end
+end
+for _, key in ipairs(KEYS) do
+    redis.call('SET', key, ARGV[1], 'PX', ARGV[2])
+end
+return 1
+"""
+
+UNLOCK_CELLS_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        redis.call('DEL', key)
+    end
+end
+return 1
+"""
+
+def _severity_rank(severity: Any) -> int:
+    return SEVERITY_ORDER.index(severity) if severity in SEVERITY_ORDER else -1
+
+def _merge_confidence(existing: float, new: float) -> float:
+    """Noisy-OR: independent observations of the same finding reinforce each other."""
+    return 1 - (1 - existing) * (1 - new)
+
+def _as_confidence(value: Any, default: float) -> float:
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return default
+
+def extract_findings(processed_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Pull hazards, survivors and recommendations out of any data type's processed_data."""
+    processed_data = processed_data or {}
+    incidents = processed_data.get("incidents") or {}
+    default_confidence = _as_confidence((processed_data.get("reliability") or {}).get("confidence"), 0.5)
+
+    hazards = {}
+    hazard_items = list(processed_data.get("hazards") or []) + list(incidents.get("hazards") or [])
+    for signature in processed_data.get("heat_signatures") or []:
+        if isinstance(signature, dict) and signature.get("type") != "human":
+            hazard_items.append(signature)
+    for hazard in hazard_items:
+        if not isinstance(hazard, dict) or not hazard.get("type"):
+            continue
+        confidence = _as_confidence(hazard.get("confidence"), default_confidence)
+        finding = hazards.setdefault(hazard["type"], {"confidence": 0.0, "severity": None})
+        finding["confidence"] = max(finding["confidence"], confidence)
+        if _severity_rank(hazard.get("severity")) > _severity_rank(finding["severity"]):
+            finding["severity"] = hazard.get("severity")
+
+    survivor_count = 0
+    survivor_confidence = 0.0
+    survivor_items = list(processed_data.get("survivors") or []) + list(incidents.get("casualties") or [])
+    for survivor in survivor_items:
+        if not isinstance(survivor, dict):
+            continue
+        count = survivor.get("count")
+        survivor_count += count if isinstance(count, int) else 1
+        survivor_confidence = max(survivor_confidence, _as_confidence(survivor.get("confidence"), default_confidence))
+
+    recommendations = processed_data.get("recommendations") or []
+    return {
+        "hazards": hazards,
+        "survivors": {"count": survivor_count, "confidence": survivor_confidence},
+        "recommendations": [r for r in recommendations if isinstance(r, str)],
+    }
+
+class IncidentClusterer:
+    """Incrementally merges observations into spatio-temporal incident clusters.
+
+    A new event joins the nearest incident whose centroid lies within
+    ``radius_meters`` and which was last observed within ``window_seconds``,
+    otherwise it starts a new incident. Incidents are compact summaries, and
+    ``add_event`` reports whether the summary changed enough to be worth
+    forwarding to the command system.
+
+    Workers lock the grid cells (one cluster radius wide) that can hold an
+    incident within the radius of the event, so events in different places
+    are clustered in parallel.
+    """
+
+    def __init__(
+        self,
+        redis_utils: Optional[RedisUtils] = None,
+        radius_meters: float = INCIDENT_CLUSTER_RADIUS_METERS,
+        window_seconds: int = INCIDENT_CLUSTER_WINDOW_SECONDS,
+        confidence_delta: float = INCIDENT_CONFIDENCE_DELTA,
+        retention_seconds: int = EVENT_RETENTION_SECONDS,
+        lock_timeout_seconds: float = INCIDENT_LOCK_TIMEOUT_SECONDS,
+    ):
+        """Initialize the clusterer on top of an existing Redis connection."""
+        self.redis_utils = redis_utils or RedisUtils()
+        self.redis_client = self.redis_utils.redis_client
+        self.radius_meters = radius_meters
+        self.window_seconds = window_seconds
+        self.confidence_delta = confidence_delta
+        self.retention_seconds = retention_seconds
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self._lock_cells_script = self.redis_client.register_script(LOCK_CELLS_SCRIPT)
+        self._unlock_cells_script = self.redis_client.register_script(UNLOCK_CELLS_SCRIPT)
+
+    def _incident_key(self, incident_id: str) -> str:
+        return f"{RedisKeys.INCIDENTS.value}:{incident_id}"
+
+    def _cell_lock_keys(self, lat: float, lon: float) -> List[str]:
+        """Lock keys of the grid cells covering every point within the cluster radius of a point."""
+        cell_degrees = self.radius_meters / METERS_PER_DEGREE
+        lat_radius = cell_degrees
+        # Degrees of longitude shrink towards the poles, so the radius spans more of them
+        widest_lat = min(abs(lat) + lat_radius, 89.0)
+        lon_radius = cell_degrees / math.cos(math.radians(widest_lat))
+        return [
+            f"{RedisKeys.INCIDENTS_CELL_LOCK.value}:{row}:{col}"
+            for row in range(math.floor((lat - lat_radius) / cell_degrees), math.floor((lat + lat_radius) / cell_degrees) + 1)
+            for col in range(math.floor((lon - lon_radius) / cell_degrees), math.floor((lon + lon_radius) / cell_degrees) + 1)
+        ]
+
+    def _lock_cells(self, lock_keys: List[str]) -> Optional[str]:
+        """Wait for all cell locks, returning the token that releases them or None on timeout."""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout_seconds
+        while True:
+            if self._lock_cells_script(keys=lock_keys, args=[token, int(self.lock_timeout_seconds * 1000)]):
+                return token
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.01)
+
+    def _get_incidents(self, incident_ids: List[Any]) -> List[Dict[str, Any]]:
+        incident_ids = [i.decode() if isinstance(i, bytes) else i for i in incident_ids]
+        return self.redis_utils.get_events([self._incident_key(incident_id) for incident_id in incident_ids])
+
+    def _find_incident(self, lat: float, lon: float, observed_at: float) -> Optional[Dict[str, Any]]:
+        """Nearest incident within the cluster radius that is still active."""
+        incident_ids = self.redis_client.geosearch(
+            RedisKeys.INCIDENTS_BY_LOCATION.value,
+            longitude=lon,
+            latitude=lat,
+            radius=self.radius_meters,
+            unit="m",
+            sort="ASC"
+        )
+        for incident in self._get_incidents(incident_ids):
+            if observed_at - incident["last_seen"] <= self.window_seconds:
+                return incident
+        return None
+
+    def _new_incident(self, lat: float, lon: float, observed_at: float) -> Dict[str, Any]:
+        return {
+            "incident_id": uuid.uuid4().hex[:12],
+            "lat": lat,
+            "lon": lon,
+            "first_seen": observed_at,
+            "last_seen": observed_at,
+            "observation_count": 0,
+            "data_types": {},
+            "hazards": {},
+            "survivors": {"count": 0, "confidence": 0.0},
+            "recommendations": [],
+        }
+
+    def _merge(self, incident: Dict[str, Any], event_data: Dict[str, Any], lat: float, lon: float, observed_at: float) -> bool:
+        """Fold an event into an incident, returning whether the summary changed significantly."""
+        findings = extract_findings(event_data.get("processed_data"))
+        changed = incident["observation_count"] == 0
+
+        count = incident["observation_count"]
+        incident["lat"] = (incident["lat"] * count + lat) / (count + 1)
+        incident["lon"] = (incident["lon"] * count + lon) / (count + 1)
+        incident["observation_count"] = count + 1
+        incident["last_seen"] = max(incident["last_seen"], observed_at)
+        data_type = event_data.get("data_type") or "unknown"
+        incident["data_types"][data_type] = incident["data_types"].get(data_type, 0) + 1
+
+        for hazard_type, finding in findings["hazards"].items():
+            existing = incident["hazards"].get(hazard_type)
+            if existing is None:
+                incident["hazards"][hazard_type] = {
+                    "confidence": finding["confidence"],
+                    "severity": finding["severity"],
+                    "observations": 1,
+                }
+                changed = True
+                continue
+            merged = _merge_confidence(existing["confidence"], finding["confidence"])
+            if merged - existing["confidence"] >= self.confidence_delta:
+                changed = True
+            existing["confidence"] = merged
+            existing["observations"] += 1
+            if _severity_rank(finding["severity"]) > _severity_rank(existing["severity"]):
+                existing["severity"] = finding["severity"]
+                changed = True
+
+        survivors = incident["survivors"]
+        new_survivors = findings["survivors"]
+        if new_survivors["count"] > survivors["count"]:
+            # Repeated sightings of the same people should not add up
+            survivors["count"] = new_survivors["count"]
+            changed = True
+        if new_survivors["count"]:
+            merged = _merge_confidence(survivors["confidence"], new_survivors["confidence"])
+            if merged - survivors["confidence"] >= self.confidence_delta:
+                changed = True
+            survivors["confidence"] = merged
+
+        for recommendation in findings["recommendations"]:
+            if recommendation not in incident["recommendations"] and len(incident["recommendations"]) < MAX_RECOMMENDATIONS:
+                incident["recommendations"].append(recommendation)
+
+        return changed
+
+    def add_event(self, event_data: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Merge an event into its incident; returns the incident and whether it should be forwarded."""
+        try:
+            lat = float(event_data["lat"])
+            lon = float(event_data["lon"])
+            observed_at = event_data.get("stored_at") or time.time()
+
+            # Searching and updating incidents must not interleave across workers
+            lock_keys = self._cell_lock_keys(lat, lon)
+            token = self._lock_cells(lock_keys)
+            if token is None:
+                logger.warning(f"Timed out waiting for the incident cells around {lat}, {lon}, not forwarding the event")
+                return None, False
+            try:
+                self._prune()
+                incident = self._find_incident(lat, lon, observed_at) or self._new_incident(lat, lon, observed_at)
+                changed = self._merge(incident, event_data, lat, lon, observed_at)
+
+                pipe = self.redis_client.pipeline()
+                pipe.set(self._incident_key(incident["incident_id"]), json.dumps(incident), ex=self.retention_seconds)
+                pipe.geoadd(RedisKeys.INCIDENTS_BY_LOCATION.value, [incident["lon"], incident["lat"], incident["incident_id"]])
+                pipe.zadd(RedisKeys.INCIDENTS_RECENT.value, {incident["incident_id"]: incident["last_seen"]})
+                pipe.execute()
+            finally:
+                self._unlock_cells_script(keys=lock_keys, args=[token])
+
+            logger.info(f"Merged {event_data.get('data_type')} event into incident {incident['incident_id']} (changed: {changed})")
+            return incident, changed
+        except Exception as e:
+            logger.error(f"Error clustering event: {str(e)}")
+            return None, True
+
+    def nearby(self, lat: float, lon: float, radius_km: float = INCIDENT_FORWARD_RADIUS_KM) -> List[Dict[str, Any]]:
+        """Get the summaries of incidents within radius_km of a point."""
+        try:
+            incident_ids = self.redis_client.geosearch(
+                RedisKeys.INCIDENTS_BY_LOCATION.value,
+                longitude=lon,
+                latitude=lat,
+                radius=radius_km,
+                unit="km"
+            )
+            return self._get_incidents(incident_ids)
+        except Exception as e:
+            logger.error(f"Error getting nearby incidents: {str(e)}")
+            return []
+
+    def _prune(self) -> None:
+        """Drop incidents that were not observed within the retention period from the indexes."""
+        expired = self.redis_client.zrangebyscore(RedisKeys.INCIDENTS_RECENT.value, "-inf", time.time() - self.retention_seconds)
+        if expired:
+            pipe = self.redis_client.pipeline()
+            pipe.zrem(RedisKeys.INCIDENTS_BY_LOCATION.value, *expired)
+            pipe.zrem(RedisKeys.INCIDENTS_RECENT.value, *expired)
+            pipe.execute()
@@ -1,18 +1,22 @@
 import os
-from typing import Optional
+from typing import Any, Optional
 from dotenv import load_dotenv
 from langchain_anthropic import ChatAnthropic
 
-from src.constants import ANTHROPIC_API_KEY_ENV, LLM_MODEL
+from src.constants import ANTHROPIC_API_KEY_ENV, LLM_MODEL, LLM_BACKEND_ENV, FAKE_LLM_PROFILE_ENV
 
 class LLMSingleton:
-    _instance: Optional[ChatAnthropic] = None
+    _instance: Optional[Any] = None
 
     @classmethod
-    def get_instance(cls) -> ChatAnthropic:
-        """Get or create the LLM instance."""
+    def get_instance(cls) -> Any:
+        """Get or create the LLM instance: ChatAnthropic, or the fake model when LLM_BACKEND=fake."""
         if cls._instance is None:
             load_dotenv()
+            if os.getenv(LLM_BACKEND_ENV, "anthropic").lower() == "fake":
+                from src.utils.fake_llm import FakeChatModel
+                cls._instance = FakeChatModel.from_file(os.getenv(FAKE_LLM_PROFILE_ENV))
+                return cls._instance
             cls._instance = ChatAnthropic(
                 model=LLM_MODEL,
                 anthropic_api_key=os.getenv(ANTHROPIC_API_KEY_ENV)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from src.constants import (
+    RedisKeys,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_BYPASS_ENV,
+)
+from src.utils.redis import RedisUtils
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    """Redis-backed cache of parsed LLM interpretations keyed by content hash.
+
+    Entries expire after ``ttl_seconds`` without being read, and the least
+    recently used entries are evicted once more than ``max_entries`` are stored.
+    """
+
+    def __init__(
+        self,
+        redis_utils: Optional[RedisUtils] = None,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        bypass: Optional[bool] = None,
+    ):
+        """Initialize the cache on top of an existing Redis connection."""
+        self.redis_utils = redis_utils or RedisUtils()
+        self.redis_client = self.redis_utils.redis_client
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        if bypass is None:
+            bypass = os.getenv(LLM_CACHE_BYPASS_ENV, "false").lower() in ("1", "true", "yes")
+        self.bypass = bypass
+
+    @staticmethod
+    def build_key(data_type: str, prompt_template: str, payload: Dict[str, Any]) -> str:
+        """Build the cache key from the data type, prompt template version and normalized payload."""
+        template_version = hashlib.sha256(prompt_template.encode("utf-8")).hexdigest()[:16]
+        normalized_payload = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        digest = hashlib.sha256(
+            f"{data_type}\x00{template_version}\x00{normalized_payload}".encode("utf-8")
+        ).hexdigest()
+        return f"{RedisKeys.LLM_CACHE.value}:{data_type}:{digest}"
+
+    def get(self, key: str, data_type: str, bypass: bool = False) -> Optional[Dict[str, Any]]:
+        """Fetch a cached interpretation, refreshing its TTL and LRU position on a hit."""
+        if self.bypass or bypass:
+            self._record(data_type, "bypassed")
+            return None
+        try:
+            cached = self.redis_client.get(key)
+            if cached is None:
+                self._record(data_type, "misses")
+                return None
+
+            pipe = self.redis_client.pipeline()
+            pipe.expire(key, self.ttl_seconds)
+            pipe.zadd(RedisKeys.LLM_CACHE_INDEX.value, {key: time.time()})
+            pipe.execute()
+            self._record(data_type, "hits")
+            return json.loads(cached)
+        except Exception as e:
+            logger.error(f"Error reading LLM cache entry {key}: {str(e)}")
+            return None
+
+    def set(self, key: str, data_type: str, response: Dict[str, Any], bypass: bool = False) -> bool:
+        """Store a parsed interpretation and evict entries beyond the configured limits."""
+        if self.bypass or bypass:
+            return False
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.set(key, json.dumps(response), ex=self.ttl_seconds)
+            pipe.zadd(RedisKeys.LLM_CACHE_INDEX.value, {key: time.time()})
+            pipe.execute()
+            self._evict()
+            return True
+        except Exception as e:
+            logger.error(f"Error writing LLM cache entry {key}: {str(e)}")
+            return False
+
+    def _evict(self) -> None:
+        """Drop index entries whose keys have expired, then trim least recently used entries."""
+        index_key = RedisKeys.LLM_CACHE_INDEX.value
+        self.redis_client.zremrangebyscore(index_key, "-inf", time.time() - self.ttl_seconds)
+
+        overflow = self.redis_client.zcard(index_key) - self.max_entries
+        if overflow <= 0:
+            return
+
+        victims = self.redis_client.zrange(index_key, 0, overflow - 1)
+        if victims:
+            pipe = self.redis_client.pipeline()
+            pipe.delete(*victims)
+            pipe.zrem(index_key, *victims)
+            pipe.execute()
+            logger.info(f"Evicted {len(victims)} least recently used LLM cache entries")
+
+    def _record(self, data_type: str, outcome: str) -> None:
+        """Increment the total and per data type counters for a cache outcome."""
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hincrby(RedisKeys.LLM_CACHE_STATS.value, outcome, 1)
+            pipe.hincrby(RedisKeys.LLM_CACHE_STATS.value, f"{data_type}:{outcome}", 1)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error recording LLM cache {outcome}: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the overall hit rate."""
+        try:
+            raw_stats = self.redis_client.hgetall(RedisKeys.LLM_CACHE_STATS.value)
+            stats = {
+                (k.decode() if isinstance(k, bytes) else k): int(v)
+                for k, v in raw_stats.items()
+            }
+            lookups = stats.get("hits", 0) + stats.get("misses", 0)
+            stats["hit_rate"] = stats.get("hits", 0) / lookups if lookups else 0.0
+            stats["entries"] = self.redis_client.zcard(RedisKeys.LLM_CACHE_INDEX.value)
+            return stats
+        except Exception as e:
+            logger.error(f"Error fetching LLM cache stats: {str(e)}")
+            return {}
+
+    def reset_stats(self) -> bool:
+        """Clear the hit/miss counters."""
+        try:
+            self.redis_client.delete(RedisKeys.LLM_CACHE_STATS.value)
+            return True
+        except Exception as e:
+            logger.error(f"Error resetting LLM cache stats: {str(e)}")
+            return False
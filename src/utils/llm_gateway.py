@@ -0,0 +1,341 @@
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from src.constants import (
+    LLMPriority,
+    LLM_GATEWAY_MAX_CONCURRENCY,
+    LLM_GATEWAY_REQUESTS_PER_SECOND,
+    LLM_GATEWAY_BURST,
+    LLM_GATEWAY_MAX_RETRIES,
+    LLM_GATEWAY_TIMEOUT_SECONDS,
+)
+from src.utils.llm import LLMSingleton
+from src.utils.metrics import Metrics
+from src.utils.tracing import add_timing
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token-bucket rate limiter for coroutines running on a single event loop."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for a while, e.g. after the provider returned 429."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+class LLMMetrics:
+    """Thread-safe latency, token and error counters per prompt family."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._families: Dict[str, Dict[str, Any]] = {}
+
+    def _family(self, family: str) -> Dict[str, Any]:
+        if family not in self._families:
+            self._families[family] = {
+                "calls": 0,
+                "errors": 0,
+                "rate_limited": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "latencies": deque(maxlen=self._window),
+                "queue_waits": deque(maxlen=self._window),
+            }
+        return self._families[family]
+
+    def record_call(self, family: str, latency: float, queue_wait: float, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            stats = self._family(family)
+            stats["calls"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["latencies"].append(latency)
+            stats["queue_waits"].append(queue_wait)
+
+    def record_error(self, family: str, rate_limited: bool = False) -> None:
+        with self._lock:
+            stats = self._family(family)
+            stats["errors"] += 1
+            if rate_limited:
+                stats["rate_limited"] += 1
+
+    @staticmethod
+    def _percentile(values: List[float], percentile: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(round(percentile * (len(ordered) - 1))))]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return a JSON-serializable copy of the metrics."""
+        with self._lock:
+            snapshot = {}
+            for family, stats in self._families.items():
+                latencies = list(stats["latencies"])
+                queue_waits = list(stats["queue_waits"])
+                snapshot[family] = {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "rate_limited": stats["rate_limited"],
+                    "input_tokens": stats["input_tokens"],
+                    "output_tokens": stats["output_tokens"],
+                    "latency_p50": self._percentile(latencies, 0.50),
+                    "latency_p95": self._percentile(latencies, 0.95),
+                    "latency_max": max(latencies) if latencies else 0.0,
+                    "queue_wait_avg": sum(queue_waits) / len(queue_waits) if queue_waits else 0.0,
+                }
+            return snapshot
+
+class LLMGateway:
+    """Shared asyncio front-end for the chat model.
+
+    Calls are queued by priority and dispatched from a background event loop,
+    bounded by a concurrency semaphore and a token-bucket rate limit. Synchronous
+    agents use ``invoke``/``invoke_many``; coroutines can await ``ainvoke``.
+
+    There is one gateway per worker process, and RQ runs one job at a time in
+    it. Agents call ``invoke`` synchronously, so the priority queue usually
+    holds a single request and priorities only take effect across the prompts
+    of one ``invoke_many`` call, which only the task allocator makes.
+    Ordering across workers comes from the RQ queue priorities instead.
+    """
+
+    _instance: Optional["LLMGateway"] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        llm: Optional[Any] = None,
+        max_concurrency: int = LLM_GATEWAY_MAX_CONCURRENCY,
+        requests_per_second: float = LLM_GATEWAY_REQUESTS_PER_SECOND,
+        burst: int = LLM_GATEWAY_BURST,
+        max_retries: int = LLM_GATEWAY_MAX_RETRIES,
+        timeout_seconds: float = LLM_GATEWAY_TIMEOUT_SECONDS,
+    ):
+        """Start the gateway event loop in a daemon thread."""
+        self.llm = llm or LLMSingleton.get_instance()
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.timeout_seconds = timeout_seconds
+        self.metrics = LLMMetrics()
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._ensure_running()
+
+    @classmethod
+    def get_instance(cls) -> "LLMGateway":
+        """Get or create the shared gateway."""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def configure(cls, llm: Optional[Any] = None, **options: Any) -> "LLMGateway":
+        """Replace the shared gateway, e.g. with one in front of a stand-in model."""
+        with cls._lock:
+            cls._instance = cls(llm=llm, **options)
+            return cls._instance
+
+    def _ensure_running(self) -> None:
+        """Start the event loop thread, restarting it in a forked child where it does not exist."""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._in_flight = 0
+            self._loop = asyncio.new_event_loop()
+            self._ready = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, name="llm-gateway", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+            self._pid = os.getpid()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.requests_per_second, self.burst)
+        self._loop.create_task(self._schedule())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _schedule(self) -> None:
+        """Hand queued calls to the model in priority order, within the concurrency and rate limits."""
+        while True:
+            await self._semaphore.acquire()
+            _, _, request = await self._queue.get()
+            if request["future"].done():
+                # The caller gave up while the call was queued
+                self._semaphore.release()
+                continue
+            await self._bucket.acquire()
+            self._loop.create_task(self._execute(request))
+
+    async def _call_model(self, prompt: Any) -> Any:
+        if hasattr(self.llm, "ainvoke"):
+            return await self.llm.ainvoke(prompt)
+        return await self._loop.run_in_executor(None, self.llm.invoke, prompt)
+
+    @staticmethod
+    def _is_rate_limited(error: Exception) -> bool:
+        return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+    @staticmethod
+    def _retry_after(error: Exception, attempt: int) -> float:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return float(2 ** attempt)
+
+    @staticmethod
+    def _token_usage(response: Any) -> tuple:
+        usage = getattr(response, "usage_metadata", None) or {}
+        return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+
+    async def _execute(self, request: Dict[str, Any]) -> None:
+        family = request["family"]
+        future = request["future"]
+        self._in_flight += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                started_at = time.monotonic()
+                try:
+                    response = await self._call_model(request["prompt"])
+                except Exception as e:
+                    rate_limited = self._is_rate_limited(e)
+                    self.metrics.record_error(family, rate_limited=rate_limited)
+                    Metrics.get_instance().record_llm_error(family, rate_limited=rate_limited)
+                    if rate_limited and attempt < self.max_retries:
+                        delay = self._retry_after(e, attempt)
+                        logger.warning(f"LLM rate limited for {family}, retrying in {delay:.1f}s")
+                        self._bucket.pause(delay)
+                        await self._bucket.acquire()
+                        continue
+                    if not future.done():
+                        future.set_exception(e)
+                    return
+
+                input_tokens, output_tokens = self._token_usage(response)
+                latency = time.monotonic() - started_at
+                queue_wait = started_at - request["submitted_at"]
+                self.metrics.record_call(
+                    family,
+                    latency=latency,
+                    queue_wait=queue_wait,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens
+                )
+                Metrics.get_instance().record_llm_call(family, latency, queue_wait, input_tokens, output_tokens)
+                if not future.done():
+                    future.set_result(response)
+                return
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    async def _submit(self, prompt: Any, priority: LLMPriority, family: str) -> Any:
+        future = self._loop.create_future()
+        request = {
+            "prompt": prompt,
+            "family": family,
+            "future": future,
+            "submitted_at": time.monotonic(),
+        }
+        await self._queue.put((priority.value, next(self._sequence), request))
+        return await future
+
+    async def ainvoke(self, prompt: Any, priority: LLMPriority = LLMPriority.NORMAL, family: str = "default") -> Any:
+        """Queue a prompt and await the model response from any event loop."""
+        self._ensure_running()
+        started_at = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(self._submit(prompt, priority, family), self._loop)
+            )
+        finally:
+            add_timing("llm", time.perf_counter() - started_at)
+
+    def _result(self, future: concurrent.futures.Future, deadline: float) -> Any:
+        """Wait for a submitted call until the deadline, cancelling it when the deadline passes."""
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"LLM call did not finish within {self.timeout_seconds}s")
+
+    def invoke(self, prompt: Any, priority: LLMPriority = LLMPriority.NORMAL, family: str = "default") -> Any:
+        """Queue a prompt and block until the model responds, raising TimeoutError after timeout_seconds."""
+        self._ensure_running()
+        started_at = time.perf_counter()
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._submit(prompt, priority, family), self._loop)
+            return self._result(future, time.monotonic() + self.timeout_seconds)
+        finally:
+            # Includes the wait in the gateway queue, as seen by the job
+            add_timing("llm", time.perf_counter() - started_at)
+
+    def invoke_many(self, prompts: List[Any], priority: LLMPriority = LLMPriority.NORMAL, family: str = "default") -> List[Optional[Any]]:
+        """Run several prompts concurrently; failed or timed out calls are logged and returned as None."""
+        self._ensure_running()
+        started_at = time.perf_counter()
+        deadline = time.monotonic() + self.timeout_seconds
+        futures = [
+            asyncio.run_coroutine_threadsafe(self._submit(prompt, priority, family), self._loop)
+            for prompt in prompts
+        ]
+        responses = []
+        for future in futures:
+            try:
+                responses.append(self._result(future, deadline))
+            except Exception as e:
+                logger.error(f"Error invoking LLM for {family}: {str(e)}")
+                responses.append(None)
+        add_timing("llm", time.perf_counter() - started_at)
+        return responses
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return per-family call metrics plus current queue depth and in-flight count."""
+        return {
+            "families": self.metrics.snapshot(),
+            "queued": self._queue.qsize(),
+            "in_flight": self._in_flight,
+        }
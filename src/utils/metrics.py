@@ -0,0 +1,241 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.constants import RedisKeys, METRICS_LATENCY_BUCKETS, METRICS_COUNT_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# Recorded metrics: name -> (type, help, histogram buckets)
+METRICS: Dict[str, Tuple[str, str, Optional[Tuple[float, ...]]]] = {
+    "asap_jobs_total": ("counter", "Jobs processed, by task type and outcome", None),
+    "asap_job_duration_seconds": ("histogram", "Run time of jobs, by task type", METRICS_LATENCY_BUCKETS),
+    "asap_job_queue_wait_seconds": ("histogram", "Time from a job becoming due to a worker starting it, by task type", METRICS_LATENCY_BUCKETS),
+    "asap_job_redis_round_trips": ("histogram", "Redis commands and pipelines sent per job, by task type", METRICS_COUNT_BUCKETS),
+    "asap_job_redis_seconds_total": ("counter", "Time jobs spent waiting on Redis, by task type", None),
+    "asap_job_llm_seconds_total": ("counter", "Time jobs spent waiting on the LLM gateway, by task type", None),
+    "asap_llm_calls_total": ("counter", "Successful LLM calls, by prompt family", None),
+    "asap_llm_latency_seconds": ("histogram", "Model latency of LLM calls, by prompt family", METRICS_LATENCY_BUCKETS),
+    "asap_llm_queue_wait_seconds": ("histogram", "Time LLM calls waited in the gateway, by prompt family", METRICS_LATENCY_BUCKETS),
+    "asap_llm_tokens_total": ("counter", "Tokens of LLM calls, by prompt family and direction", None),
+    "asap_llm_errors_total": ("counter", "Failed LLM calls, by prompt family and kind", None),
+    "asap_events_stored_total": ("counter", "Events stored in the event store, by data type", None),
+}
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _series(name: str, labels: Dict[str, Any]) -> str:
+    """A series in Prometheus text format, e.g. asap_jobs_total{outcome="success"}."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class Metrics:
+    """Counters and histograms shared by every worker, kept in one Redis hash.
+
+    Samples are buffered in the process and added to the hash with one
+    pipeline per job (``flush``), so jobs run in forked work horses count too.
+    Histograms keep a counter per bucket plus a sum and a count. ``render``
+    turns the hash and the current queue and cache state into the Prometheus
+    text format, so any worker's endpoint shows the whole deployment.
+    """
+
+    _instance: Optional["Metrics"] = None
+    _lock = threading.Lock()
+
+    def __init__(self, redis_client: Optional[Any] = None):
+        """Initialize the buffer; the Redis connection is opened with the first flush."""
+        self._redis_client = redis_client
+        self._buffer: Dict[str, float] = {}
+        self._buffer_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "Metrics":
+        """Get or create the shared metrics buffer."""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @property
+    def redis_client(self) -> Any:
+        if self._redis_client is None:
+            from src.utils.redis import RedisUtils
+            self._redis_client = RedisUtils().redis_client
+        return self._redis_client
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, value: float = 1) -> None:
+        """Add to a counter."""
+        field = json.dumps([name, labels or {}], sort_keys=True)
+        with self._buffer_lock:
+            self._buffer[field] = self._buffer.get(field, 0.0) + value
+
+    def observe(self, name: str, labels: Optional[Dict[str, Any]], value: float) -> None:
+        """Add a sample to a histogram."""
+        labels = labels or {}
+        buckets = METRICS[name][2]
+        bound = next((bound for bound in buckets if value <= bound), float("inf"))
+        self.inc(f"{name}_bucket", {**labels, "le": _format_bound(bound)})
+        self.inc(f"{name}_sum", labels, value)
+        self.inc(f"{name}_count", labels)
+
+    def record_job(self, span: Any) -> None:
+        """Record a finished job from its span, and flush everything buffered so far."""
+        labels = {"task_type": span.name or "unknown"}
+        success = span.attributes.get("success", False)
+        self.inc("asap_jobs_total", {**labels, "outcome": "success" if success else "failure"})
+        if span.finished_at is not None:
+            self.observe("asap_job_duration_seconds", labels, span.finished_at - span.started_at)
+        if span.due_at is not None:
+            self.observe("asap_job_queue_wait_seconds", labels, max(0.0, span.started_at - span.due_at))
+        self.observe("asap_job_redis_round_trips", labels, span.counts.get("redis", 0))
+        self.inc("asap_job_redis_seconds_total", labels, span.timings.get("redis", 0.0))
+        self.inc("asap_job_llm_seconds_total", labels, span.timings.get("llm", 0.0))
+        self.flush()
+
+    def record_llm_call(self, family: str, latency: float, queue_wait: float, input_tokens: int, output_tokens: int) -> None:
+        labels = {"family": family}
+        self.inc("asap_llm_calls_total", labels)
+        self.observe("asap_llm_latency_seconds", labels, latency)
+        self.observe("asap_llm_queue_wait_seconds", labels, queue_wait)
+        self.inc("asap_llm_tokens_total", {**labels, "direction": "input"}, input_tokens)
+        self.inc("asap_llm_tokens_total", {**labels, "direction": "output"}, output_tokens)
+
+    def record_llm_error(self, family: str, rate_limited: bool = False) -> None:
+        self.inc("asap_llm_errors_total", {"family": family, "kind": "rate_limited" if rate_limited else "error"})
+
+    def flush(self) -> None:
+        """Add the buffered samples to the shared hash."""
+        with self._buffer_lock:
+            buffer, self._buffer = self._buffer, {}
+        if not buffer:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for field, value in buffer.items():
+                pipe.hincrbyfloat(RedisKeys.METRICS.value, field, value)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error flushing {len(buffer)} metric samples: {str(e)}")
+
+    def _recorded_lines(self) -> List[str]:
+        """Text format of the counters and histograms in the shared hash."""
+        samples: Dict[str, Dict[str, List[tuple]]] = {}
+        for field, value in self.redis_client.hgetall(RedisKeys.METRICS.value).items():
+            name, labels = json.loads(field)
+            base = name
+            for suffix in ("_bucket", "_sum", "_count"):
+                if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+                    base = name[:-len(suffix)]
+            samples.setdefault(base, {}).setdefault(name, []).append((labels, float(value)))
+
+        lines = []
+        for base, (metric_type, help_text, buckets) in METRICS.items():
+            if base not in samples:
+                continue
+            lines.append(f"# HELP {base} {help_text}")
+            lines.append(f"# TYPE {base} {metric_type}")
+            if metric_type != "histogram":
+                for labels, value in sorted(samples[base].get(base, []), key=lambda sample: sorted(sample[0].items())):
+                    lines.append(f"{_series(base, labels)} {_format_value(value)}")
+                continue
+
+            # Buckets are stored per bucket and exposed cumulatively
+            counts: Dict[str, Dict[str, float]] = {}
+            label_sets: Dict[str, Dict[str, Any]] = {}
+            for labels, value in samples[base].get(f"{base}_bucket", []):
+                bound = labels.pop("le")
+                key = json.dumps(labels, sort_keys=True)
+                label_sets[key] = labels
+                counts.setdefault(key, {})[bound] = value
+            totals = {json.dumps(labels, sort_keys=True): value for labels, value in samples[base].get(f"{base}_sum", [])}
+            for key in sorted(label_sets):
+                labels = label_sets[key]
+                cumulative = 0.0
+                for bound in [_format_bound(bound) for bound in buckets] + ["+Inf"]:
+                    cumulative += counts[key].get(bound, 0.0)
+                    lines.append(f"{_series(f'{base}_bucket', {**labels, 'le': bound})} {_format_value(cumulative)}")
+                lines.append(f"{_series(f'{base}_sum', labels)} {_format_value(totals.get(key, 0.0))}")
+                lines.append(f"{_series(f'{base}_count', labels)} {_format_value(cumulative)}")
+        return lines
+
+    def _state_lines(self) -> List[str]:
+        """Text format of the current queue state and cache counters."""
+        from src.utils.redis import RedisUtils
+
+        lines = []
+        queue_stats = RedisUtils().get_queue_stats()
+        for name, key, help_text, metric_type in [
+            ("asap_queue_depth", "depth", "Jobs waiting in a queue", "gauge"),
+            ("asap_queue_scheduled_jobs", "scheduled", "Delayed jobs not yet moved onto a queue", "gauge"),
+            ("asap_queue_oldest_job_age_seconds", "oldest_age_seconds", "Age of the oldest job waiting in a queue", "gauge"),
+        ]:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for queue_name, stats in sorted(queue_stats.items()):
+                lines.append(f"{_series(name, {'queue': queue_name})} {_format_value(stats[key])}")
+
+        for name, stats_key, help_text in [
+            ("asap_llm_cache_lookups_total", RedisKeys.LLM_CACHE_STATS.value, "LLM response cache lookups, by data type and outcome"),
+            ("asap_image_dedup_lookups_total", RedisKeys.IMAGE_HASH_STATS.value, "Near-duplicate image lookups, by data type and outcome"),
+        ]:
+            stats = self.redis_client.hgetall(stats_key)
+            if not stats:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for field, value in sorted(stats.items()):
+                field = field.decode() if isinstance(field, bytes) else field
+                # Totals are kept next to per data type counters named "<data_type>:<outcome>"
+                if ":" in field:
+                    data_type, outcome = field.split(":", 1)
+                    lines.append(f"{_series(name, {'data_type': data_type, 'outcome': outcome})} {_format_value(value)}")
+        return lines
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        self.flush()
+        return "\n".join(self._recorded_lines() + self._state_lines()) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        try:
+            body = Metrics.get_instance().render().encode("utf-8")
+        except Exception as e:
+            logger.error(f"Error rendering metrics: {str(e)}")
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Scrapes every few seconds would flood the worker log
+        pass
+
+def start_metrics_server(host: str, port: int) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics from a daemon thread, or return None if the port is taken."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Metrics endpoint not started on {host}:{port}: {str(e)}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
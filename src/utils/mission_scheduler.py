@@ -0,0 +1,174 @@
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from src.constants import (
+    RedisKeys,
+    MISSION_DISPATCH_BATCH_SIZE,
+    MISSION_DISPATCH_MIN_DELAY_SECONDS,
+    MISSION_DISPATCH_GRACE_SECONDS,
+    MISSION_STATE_TTL_SECONDS,
+)
+from src.utils.redis import RedisUtils
+from src.utils.bot_reservations import BotReservations
+from src.utils.tracing import Tracer, current_span
+
+logger = logging.getLogger(__name__)
+
+# Pop up to ARGV[2] missions due at ARGV[1], returning their states
+CLAIM_SCRIPT = """
+local mission_ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local states = {}
+for _, mission_id in ipairs(mission_ids) do
+    local state_key = KEYS[2] .. ':' .. mission_id
+    local state = redis.call('GET', state_key)
+    redis.call('ZREM', KEYS[1], mission_id)
+    redis.call('DEL', state_key)
+    if state then
+        table.insert(states, state)
+    end
+end
+return states
+"""
+
+# Schedule a dispatcher for ARGV[1] unless one is already pending at or before it
+REQUEST_DISPATCH_SCRIPT = """
+local pending = tonumber(redis.call('GET', KEYS[1]))
+if pending and pending <= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+# Clear the pending dispatcher mark if it belongs to the dispatcher due at ARGV[1]
+CLEAR_DISPATCH_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[1])) == tonumber(ARGV[1]) then
+    redis.call('DEL', KEYS[1])
+end
+return 1
+"""
+
+class MissionScheduler:
+    """Delayed continuation of bot missions without blocking workers.
+
+    A bot agent runs one step of a mission per job and hands the next step to
+    ``schedule`` instead of sleeping. Steps wait in a sorted set scored by due
+    time, with their state stored alongside. A single ``mission_dispatch`` job,
+    scheduled for the earliest due step, moves every due step back onto the bot
+    queue and reschedules itself while steps remain, so any number of missions
+    in flight cost one scheduled job and no worker time. A step that cannot
+    be enqueued ends its mission and releases the bot.
+    """
+
+    def __init__(
+        self,
+        redis_utils: Optional[RedisUtils] = None,
+        batch_size: int = MISSION_DISPATCH_BATCH_SIZE,
+        min_delay_seconds: float = MISSION_DISPATCH_MIN_DELAY_SECONDS,
+        grace_seconds: int = MISSION_DISPATCH_GRACE_SECONDS,
+        state_ttl_seconds: int = MISSION_STATE_TTL_SECONDS,
+    ):
+        """Initialize the scheduler on top of an existing Redis connection."""
+        self.redis_utils = redis_utils or RedisUtils()
+        self.redis_client = self.redis_utils.redis_client
+        self.batch_size = batch_size
+        self.min_delay_seconds = min_delay_seconds
+        self.grace_seconds = grace_seconds
+        self.state_ttl_seconds = state_ttl_seconds
+        self._claim = self.redis_client.register_script(CLAIM_SCRIPT)
+        self._request_dispatch = self.redis_client.register_script(REQUEST_DISPATCH_SCRIPT)
+        self._clear_dispatch = self.redis_client.register_script(CLEAR_DISPATCH_SCRIPT)
+        self.reservations = BotReservations(self.redis_utils)
+
+    def schedule(
+        self,
+        task_type: str,
+        payload: Dict[str, Any],
+        step: str,
+        delay_seconds: float,
+        state: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """Run a mission step as a task_type job after a delay, returning the mission id.
+
+        The job receives the payload with a "mission" entry holding the mission
+        id, the step and any extra state; the id is kept across steps.
+        """
+        try:
+            mission_id = (payload.get("mission") or {}).get("id") or str(uuid.uuid4())
+            job_payload = dict(payload)
+            job_payload["mission"] = {**(state or {}), "id": mission_id, "step": step}
+            # The step continues the trace of the job scheduling it, not the dispatcher's
+            span = current_span()
+            mission_state = {
+                "task_type": task_type,
+                "payload": job_payload,
+                "trace_parent": span.context() if span else None,
+            }
+            due = time.time() + delay_seconds
+
+            pipe = self.redis_client.pipeline()
+            pipe.set(f"{RedisKeys.MISSIONS.value}:{mission_id}", json.dumps(mission_state), ex=self.state_ttl_seconds)
+            pipe.zadd(RedisKeys.MISSIONS_DUE.value, {mission_id: due})
+            pipe.execute()
+            logger.info(f"Mission {mission_id} step {step} due in {delay_seconds}s")
+
+            self.request_dispatch(due)
+            return mission_id
+        except Exception as e:
+            logger.error(f"Error scheduling mission step {step}: {str(e)}")
+            return None
+
+    def request_dispatch(self, due: float) -> bool:
+        """Make sure a dispatcher runs by the given time (epoch seconds)."""
+        try:
+            delay = max(due - time.time(), self.min_delay_seconds)
+            due = round(time.time() + delay, 3)
+            if not self._request_dispatch(
+                keys=[RedisKeys.MISSIONS_DISPATCH_PENDING.value],
+                args=[due, int(delay) + self.grace_seconds],
+            ):
+                return False
+            # Dispatchers serve every mission, so they start traces of their own
+            with Tracer.get_instance().resume(None):
+                return self.redis_utils.enqueue_task_in("mission_dispatch", {"due": due}, delay)
+        except Exception as e:
+            logger.error(f"Error requesting mission dispatch: {str(e)}")
+            return False
+
+    def dispatch(self, due: Optional[float] = None) -> int:
+        """Enqueue every mission step that is due, returning how many were enqueued."""
+        dispatched = 0
+        try:
+            if due is not None:
+                self._clear_dispatch(keys=[RedisKeys.MISSIONS_DISPATCH_PENDING.value], args=[due])
+
+            while True:
+                states = self._claim(
+                    keys=[RedisKeys.MISSIONS_DUE.value, RedisKeys.MISSIONS.value],
+                    args=[time.time(), self.batch_size],
+                )
+                for state in states:
+                    mission_state = json.loads(state)
+                    job_payload = mission_state["payload"]
+                    with Tracer.get_instance().resume(mission_state["trace_parent"]):
+                        if self.redis_utils.enqueue_task(mission_state["task_type"], job_payload):
+                            dispatched += 1
+                        else:
+                            # The step's state is gone, so its mission cannot go on
+                            logger.error(f"Dropping mission {job_payload['mission']['id']}, its step could not be enqueued")
+                            self.reservations.release(job_payload.get("bot_id"), job_payload.get("task_id"))
+                if len(states) < self.batch_size:
+                    break
+            if dispatched:
+                logger.info(f"Dispatched {dispatched} mission steps")
+
+            # Keep one dispatcher scheduled for the earliest remaining step
+            next_due = self.redis_client.zrange(RedisKeys.MISSIONS_DUE.value, 0, 0, withscores=True)
+            if next_due:
+                self.request_dispatch(next_due[0][1])
+        except Exception as e:
+            logger.error(f"Error dispatching missions: {str(e)}")
+        return dispatched
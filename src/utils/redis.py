@@ -1,88 +1,450 @@
 import json
 import logging
-from typing import Any, Dict, List, Optional
-from redis import Redis
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from redis import Redis, ConnectionPool
+from redis.client import Pipeline
 from rq import Queue
 from dotenv import load_dotenv
 import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
-from src.constants import QueueNames, RedisKeys
+from src.constants import (
+    QueueNames,
+    RedisKeys,
+    TASK_QUEUE_ROUTES,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_BATCH_SIZE,
+    BOT_TYPES,
+    BOT_STATUSES,
+    NEAREST_BOTS_K,
+)
+from src.utils.tracing import Tracer, add_timing, current_span
 
 logger = logging.getLogger(__name__)
 
+# Bring a bot's status set and GEO memberships in line with its metadata hash.
+# KEYS: bot hash, one set per status, one GEO set per type, one available GEO set per type
+# ARGV: bot id, number of statuses, number of types, the statuses, the types
+# Scripts that change a bot's hash embed this function and may append their own KEYS and ARGV.
+BOT_INDEX_FUNCTION = """
+local function reindex_bot()
+    local bot_id = ARGV[1]
+    local n_statuses = tonumber(ARGV[2])
+    local n_types = tonumber(ARGV[3])
+
+    local fields = redis.call('HMGET', KEYS[1], 'bot_type', 'status', 'lat', 'long')
+    local decoded = {}
+    for i = 1, 4 do
+        if fields[i] then
+            local value = cjson.decode(fields[i])
+            if value ~= cjson.null then
+                decoded[i] = value
+            end
+        end
+    end
+    local bot_type, status, lat, long = decoded[1], decoded[2], decoded[3], decoded[4]
+
+    for i = 1, n_statuses do
+        if ARGV[3 + i] == status then
+            redis.call('SADD', KEYS[1 + i], bot_id)
+        else
+            redis.call('SREM', KEYS[1 + i], bot_id)
+        end
+    end
+
+    for i = 1, n_types do
+        local location_key = KEYS[1 + n_statuses + i]
+        local available_key = KEYS[1 + n_statuses + n_types + i]
+        if ARGV[3 + n_statuses + i] == bot_type and lat and long then
+            redis.call('GEOADD', location_key, long, lat, bot_id)
+            if status == 'available' then
+                redis.call('GEOADD', available_key, long, lat, bot_id)
+            else
+                redis.call('ZREM', available_key, bot_id)
+            end
+        else
+            redis.call('ZREM', location_key, bot_id)
+            redis.call('ZREM', available_key, bot_id)
+        end
+    end
+end
+"""
+
+BOT_INDEX_SCRIPT = BOT_INDEX_FUNCTION + """
+reindex_bot()
+return 1
+"""
+
+class TimedPipeline(Pipeline):
+    """Pipeline whose round trips count towards the current job's span."""
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        if current_span() is None:
+            return super().execute(raise_on_error)
+        started_at = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            add_timing("redis", time.perf_counter() - started_at)
+
+class TimedRedis(Redis):
+    """Redis client whose commands count towards the current job's span."""
+
+    def execute_command(self, *args: Any, **options: Any) -> Any:
+        if current_span() is None:
+            return super().execute_command(*args, **options)
+        started_at = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            add_timing("redis", time.perf_counter() - started_at)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> TimedPipeline:
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
 class RedisUtils:
+    _pools: Dict[str, ConnectionPool] = {}
+    _pools_lock = threading.Lock()
+    # Receives (task_type, task_data, delay_seconds) instead of RQ when set, e.g. by the simulator
+    _task_sink: Optional[Callable[[str, Dict[str, Any], float], bool]] = None
+
     def __init__(self):
-        """Initialize Redis connection and queue."""
+        """Initialize Redis connection and queues."""
         load_dotenv()
         redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        self.redis_client = Redis.from_url(redis_url)
-        self.queue = Queue(QueueNames.MAIN_QUEUE.value, connection=self.redis_client)
+        self.redis_client = TimedRedis(connection_pool=self._get_connection_pool(redis_url))
+        self.queues = {
+            queue_name: Queue(queue_name.value, connection=self.redis_client)
+            for queue_name in QueueNames
+        }
+        self.queue = self.queues[QueueNames.MAIN_QUEUE]
+        self._bot_index_script = self.redis_client.register_script(BOT_INDEX_SCRIPT)
+
+    @classmethod
+    def _get_connection_pool(cls, redis_url: str) -> ConnectionPool:
+        """Get the connection pool shared by every RedisUtils in this process."""
+        with cls._pools_lock:
+            if redis_url not in cls._pools:
+                cls._pools[redis_url] = ConnectionPool.from_url(redis_url, max_connections=REDIS_MAX_CONNECTIONS)
+            return cls._pools[redis_url]
+
+    @classmethod
+    def register_connection_pool(cls, redis_url: str, pool: ConnectionPool) -> None:
+        """Use the given pool for a Redis URL in this process, e.g. one backed by an in-memory stand-in."""
+        with cls._pools_lock:
+            cls._pools[redis_url] = pool
+
+    @classmethod
+    def set_task_sink(cls, sink: Optional[Callable[[str, Dict[str, Any], float], bool]]) -> None:
+        """Hand every enqueued task to sink instead of RQ in this process, or restore RQ with None."""
+        cls._task_sink = sink
+
+    def _mget_json(self, keys: List[Any]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch and decode many JSON values, one MGET per chunk of keys."""
+        values = []
+        for start in range(0, len(keys), REDIS_BATCH_SIZE):
+            chunk = keys[start:start + REDIS_BATCH_SIZE]
+            values.extend(json.loads(value) if value else None for value in self.redis_client.mget(chunk))
+        return values
+
+    def get_queue(self, task_type: str) -> Queue:
+        """Get the queue a task type is routed to."""
+        return self.queues[TASK_QUEUE_ROUTES.get(task_type, QueueNames.MAIN_QUEUE)]
 
     def _get_bot_key(self, bot_id: str) -> str:
         """Generate Redis key for a specific bot."""
         return f"{RedisKeys.BOTS_METADATA.value}:{bot_id}"
 
+    @staticmethod
+    def _encode_bot_fields(fields: Dict[str, Any]) -> Dict[str, str]:
+        """Encode each metadata field as JSON so types survive the round trip through a hash."""
+        return {field: json.dumps(value) for field, value in fields.items()}
+
+    @staticmethod
+    def _decode_bot_fields(raw_fields: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+        """Decode a bot metadata hash; an empty hash means the bot does not exist."""
+        if not raw_fields:
+            return None
+        return {
+            (field.decode() if isinstance(field, bytes) else field): json.loads(value)
+            for field, value in raw_fields.items()
+        }
+
     def get_bot_metadata(self, bot_id: str) -> Optional[Dict[str, Any]]:
         """Fetch metadata for a specific bot."""
         try:
-            data = self.redis_client.get(self._get_bot_key(bot_id))
-            if data:
-                return json.loads(data)
-            return None
+            return self._decode_bot_fields(self.redis_client.hgetall(self._get_bot_key(bot_id)))
         except Exception as e:
             logger.error(f"Error fetching bot metadata for bot {bot_id}: {str(e)}")
             return None
 
+    def _bot_location_key(self, bot_type: str) -> str:
+        return f"{RedisKeys.BOTS_LOCATION.value}:{bot_type}"
+
+    def _bot_available_key(self, bot_type: str) -> str:
+        return f"{RedisKeys.BOTS_AVAILABLE_LOCATION.value}:{bot_type}"
+
+    def _bot_status_key(self, status: str) -> str:
+        return f"{RedisKeys.BOTS_STATUS.value}:{status}"
+
+    def bot_index_keys(self, bot_id: str) -> List[str]:
+        """KEYS expected by BOT_INDEX_FUNCTION for a bot."""
+        return (
+            [self._get_bot_key(bot_id)]
+            + [self._bot_status_key(status) for status in BOT_STATUSES]
+            + [self._bot_location_key(bot_type) for bot_type in BOT_TYPES]
+            + [self._bot_available_key(bot_type) for bot_type in BOT_TYPES]
+        )
+
+    @staticmethod
+    def bot_index_args(bot_id: str) -> List[Any]:
+        """ARGV expected by BOT_INDEX_FUNCTION for a bot."""
+        return [bot_id, len(BOT_STATUSES), len(BOT_TYPES)] + BOT_STATUSES + BOT_TYPES
+
+    def _reindex_bot(self, pipe, bot_id: str) -> None:
+        """Queue the update of a bot's location and status indexes in the same transaction as its metadata."""
+        self._bot_index_script(keys=self.bot_index_keys(bot_id), args=self.bot_index_args(bot_id), client=pipe)
+
     def set_bot_metadata(self, bot_id: str, metadata: Dict[str, Any]) -> bool:
-        """Store metadata for a specific bot."""
+        """Store (replace) the full metadata for a specific bot."""
         try:
-            self.redis_client.set(self._get_bot_key(bot_id), json.dumps(metadata))
+            pipe = self.redis_client.pipeline()
+            pipe.delete(self._get_bot_key(bot_id))
+            if metadata:
+                pipe.hset(self._get_bot_key(bot_id), mapping=self._encode_bot_fields(metadata))
+            pipe.sadd(RedisKeys.BOT_IDS.value, bot_id)
+            self._reindex_bot(pipe, bot_id)
+            pipe.publish(RedisKeys.BOT_CHANGES.value, bot_id)
+            pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Error storing bot metadata for bot {bot_id}: {str(e)}")
             return False
 
+    def update_bot_fields(self, bot_id: str, fields: Dict[str, Any]) -> bool:
+        """Update only the given metadata fields of a bot."""
+        if not fields:
+            return True
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hset(self._get_bot_key(bot_id), mapping=self._encode_bot_fields(fields))
+            pipe.sadd(RedisKeys.BOT_IDS.value, bot_id)
+            self._reindex_bot(pipe, bot_id)
+            pipe.publish(RedisKeys.BOT_CHANGES.value, bot_id)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating fields {list(fields)} for bot {bot_id}: {str(e)}")
+            return False
+
+    def update_bot_battery(self, bot_id: str, battery_level: float) -> bool:
+        """Update a bot's battery level."""
+        return self.update_bot_fields(bot_id, {"battery_level": battery_level})
+
+    def update_bot_position(self, bot_id: str, lat: float, long: float, altitude: Optional[float] = None) -> bool:
+        """Update a bot's position."""
+        fields = {"lat": lat, "long": long}
+        if altitude is not None:
+            fields["altitude"] = altitude
+        return self.update_bot_fields(bot_id, fields)
+
+    def update_bot_status(self, bot_id: str, status: str) -> bool:
+        """Update a bot's status."""
+        return self.update_bot_fields(bot_id, {"status": status})
+
     def delete_bot_metadata(self, bot_id: str) -> bool:
         """Delete metadata for a specific bot."""
         try:
-            self.redis_client.delete(self._get_bot_key(bot_id))
+            pipe = self.redis_client.pipeline()
+            pipe.delete(self._get_bot_key(bot_id))
+            pipe.srem(RedisKeys.BOT_IDS.value, bot_id)
+            self._reindex_bot(pipe, bot_id)
+            pipe.publish(RedisKeys.BOT_CHANGES.value, bot_id)
+            pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Error deleting bot metadata for bot {bot_id}: {str(e)}")
             return False
 
+    def migrate_bot_metadata(self) -> int:
+        """Convert bots stored as JSON strings by earlier versions into hashes, returning how many were converted."""
+        prefix = f"{RedisKeys.BOTS_METADATA.value}:"
+        migrated = 0
+        try:
+            for key in self.redis_client.scan_iter(match=f"{prefix}*", count=REDIS_BATCH_SIZE, _type="string"):
+                key = key.decode() if isinstance(key, bytes) else key
+                raw_metadata = self.redis_client.get(key)
+                if raw_metadata is not None and self.set_bot_metadata(key[len(prefix):], json.loads(raw_metadata)):
+                    migrated += 1
+            if migrated:
+                logger.info(f"Migrated {migrated} bots from JSON strings to hashes")
+        except Exception as e:
+            logger.error(f"Error migrating bot metadata: {str(e)}")
+        return migrated
+
+    def reindex_bots(self) -> int:
+        """Rebuild the location and status indexes of every registered bot, returning how many were indexed."""
+        try:
+            self.migrate_bot_metadata()
+            bot_ids = self.get_bot_ids()
+            for start in range(0, len(bot_ids), REDIS_BATCH_SIZE):
+                pipe = self.redis_client.pipeline()
+                for bot_id in bot_ids[start:start + REDIS_BATCH_SIZE]:
+                    self._reindex_bot(pipe, bot_id)
+                pipe.execute()
+            return len(bot_ids)
+        except Exception as e:
+            logger.error(f"Error reindexing bots: {str(e)}")
+            return 0
+
+    def _nearest(self, key_for_type, lat: float, long: float, bot_type: Optional[str], k: int) -> List[Dict[str, Any]]:
+        """The k bots nearest to a point in the per-type GEO sets, with their distance_km."""
+        bot_types = [bot_type] if bot_type else BOT_TYPES
+        pipe = self.redis_client.pipeline(transaction=False)
+        for each_type in bot_types:
+            # A radius of half the Earth's circumference covers every indexed bot
+            pipe.geosearch(key_for_type(each_type), longitude=long, latitude=lat, radius=20038, unit="km", sort="ASC", count=k, withdist=True)
+        matches = sorted(
+            (distance, bot_id.decode() if isinstance(bot_id, bytes) else bot_id)
+            for type_matches in pipe.execute()
+            for bot_id, distance in type_matches
+        )[:k]
+        bots = []
+        for (distance, _), metadata in zip(matches, self.get_bots([bot_id for _, bot_id in matches])):
+            if metadata is not None:
+                metadata["distance_km"] = distance
+                bots.append(metadata)
+        return bots
+
+    def nearest_available(self, lat: float, long: float, bot_type: Optional[str] = None, k: int = NEAREST_BOTS_K) -> List[Dict[str, Any]]:
+        """Metadata of the k available bots nearest to a point, of one type or any type, nearest first."""
+        try:
+            return self._nearest(self._bot_available_key, lat, long, bot_type, k)
+        except Exception as e:
+            logger.error(f"Error finding available bots near {lat}, {long}: {str(e)}")
+            return []
+
+    def nearest_bots(self, lat: float, long: float, bot_type: Optional[str] = None, k: int = NEAREST_BOTS_K) -> List[Dict[str, Any]]:
+        """Metadata of the k bots nearest to a point whatever their status, nearest first."""
+        try:
+            return self._nearest(self._bot_location_key, lat, long, bot_type, k)
+        except Exception as e:
+            logger.error(f"Error finding bots near {lat}, {long}: {str(e)}")
+            return []
+
+    def get_bot_ids_by_status(self, status: str) -> List[str]:
+        """List the ids of all bots with a given status."""
+        try:
+            return [
+                bot_id.decode() if isinstance(bot_id, bytes) else bot_id
+                for bot_id in self.redis_client.smembers(self._bot_status_key(status))
+            ]
+        except Exception as e:
+            logger.error(f"Error fetching bots with status {status}: {str(e)}")
+            return []
+
+    def get_bot_ids(self) -> List[str]:
+        """List the ids of all registered bots."""
+        try:
+            return [
+                bot_id.decode() if isinstance(bot_id, bytes) else bot_id
+                for bot_id in self.redis_client.smembers(RedisKeys.BOT_IDS.value)
+            ]
+        except Exception as e:
+            logger.error(f"Error fetching bot ids: {str(e)}")
+            return []
+
+    def get_bots(self, bot_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch metadata for many bots in one round trip; missing bots are None."""
+        try:
+            pipe = self.redis_client.pipeline()
+            for bot_id in bot_ids:
+                pipe.hgetall(self._get_bot_key(bot_id))
+            return [self._decode_bot_fields(raw_fields) for raw_fields in pipe.execute()]
+        except Exception as e:
+            logger.error(f"Error fetching metadata for bots {bot_ids}: {str(e)}")
+            return [None] * len(bot_ids)
+
     def get_all_bots_metadata(self) -> List[Dict[str, Any]]:
         """Fetch metadata for all bots."""
         try:
-            # Get all keys matching the pattern
-            keys = self.redis_client.keys(f"{RedisKeys.BOTS_METADATA.value}:*")
-            metadata_list = []
-            
-            for key in keys:
-                data = self.redis_client.get(key)
-                if data:
-                    metadata_list.append(json.loads(data))
-            
-            return metadata_list
+            return [metadata for metadata in self.get_bots(self.get_bot_ids()) if metadata]
         except Exception as e:
             logger.error(f"Error fetching all bots metadata: {str(e)}")
             return []
 
     def enqueue_task(self, task_type: str, task_data: Dict[str, Any]) -> bool:
-        """Enqueue a task with its type."""
+        """Enqueue a task with its type.
+
+        The type travels next to the data rather than inside it, so a payload
+        keeps its own "task_type" field (e.g. the assist_rescue of an allocation).
+        """
+        started_at = time.perf_counter()
         try:
-            # Add task type to the data
-            task_data["task_type"] = task_type
+            # Carry the trace of the job enqueueing this task, or start one
+            task_data = Tracer.get_instance().inject(task_data)
+            if RedisUtils._task_sink is not None:
+                return RedisUtils._task_sink(task_type, task_data, 0)
             
-            # Enqueue to the main queue
-            job = self.queue.enqueue('src.workers.main_worker.process_task', task_data)
+            # Enqueue to the queue dedicated to this task type
+            queue = self.get_queue(task_type)
+            job = queue.enqueue('src.workers.main_worker.process_task', task_data, task_type)
             
-            logger.info(f"Task enqueued to main queue with job ID: {job.id}")
+            logger.info(f"Task enqueued to {queue.name} with job ID: {job.id}")
             return True
         except Exception as e:
             logger.error(f"Error enqueueing task: {str(e)}")
             return False
+        finally:
+            add_timing("enqueue", time.perf_counter() - started_at)
+
+    def enqueue_task_in(self, task_type: str, task_data: Dict[str, Any], delay_seconds: float) -> bool:
+        """Enqueue a task with its type to run after a delay (requires a worker with the scheduler enabled)."""
+        started_at = time.perf_counter()
+        try:
+            task_data = Tracer.get_instance().inject(task_data, delay_seconds)
+            if RedisUtils._task_sink is not None:
+                return RedisUtils._task_sink(task_type, task_data, delay_seconds)
+            
+            queue = self.get_queue(task_type)
+            job = queue.enqueue_in(
+                timedelta(seconds=delay_seconds),
+                'src.workers.main_worker.process_task',
+                task_data,
+                task_type
+            )
+            
+            logger.info(f"Task scheduled on {queue.name} in {delay_seconds}s with job ID: {job.id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error scheduling task: {str(e)}")
+            return False
+        finally:
+            add_timing("enqueue", time.perf_counter() - started_at)
+
+    def get_queue_stats(self) -> Dict[str, Dict[str, float]]:
+        """Depth, scheduled job count and age of the oldest waiting job of every queue."""
+        stats = {}
+        for queue in self.queues.values():
+            try:
+                oldest_age_seconds = 0.0
+                oldest_job_ids = queue.get_job_ids(0, 0)
+                job = queue.fetch_job(oldest_job_ids[0]) if oldest_job_ids else None
+                if job is not None and job.enqueued_at is not None:
+                    enqueued_at = job.enqueued_at
+                    if enqueued_at.tzinfo is None:
+                        enqueued_at = enqueued_at.replace(tzinfo=timezone.utc)
+                    oldest_age_seconds = max(0.0, (datetime.now(timezone.utc) - enqueued_at).total_seconds())
+                stats[queue.name] = {
+                    "depth": queue.count,
+                    "scheduled": queue.scheduled_job_registry.count,
+                    "oldest_age_seconds": oldest_age_seconds,
+                }
+            except Exception as e:
+                logger.error(f"Error reading stats of queue {queue.name}: {str(e)}")
+        return stats
 
     def store_event(self, event_id: str, event_data: Dict[str, Any]) -> bool:
         """Store event data in Redis."""
@@ -104,6 +466,14 @@ class RedisUtils:
             logger.error(f"Error fetching event {event_id}: {str(e)}")
             return None
 
+    def get_events(self, event_ids: List[Any]) -> List[Dict[str, Any]]:
+        """Fetch many events in one round trip, skipping ids that no longer exist."""
+        try:
+            return [event for event in self._mget_json(list(event_ids)) if event]
+        except Exception as e:
+            logger.error(f"Error fetching events: {str(e)}")
+            return []
+
     def delete_event(self, event_id: str) -> bool:
         """Delete event data from Redis."""
         try:
@@ -116,14 +486,16 @@ class RedisUtils:
     def store_weather_data(self, location_key: str, weather_data: Dict[str, Any]) -> bool:
         """Store weather data in Redis."""
         try:
-            self.redis_client.set(
+            pipe = self.redis_client.pipeline()
+            pipe.set(
                 f"{RedisKeys.WEATHER_DATA.value}:{location_key}",
                 json.dumps(weather_data)
             )
-            self.redis_client.set(
+            pipe.set(
                 f"{RedisKeys.WEATHER_LAST_UPDATE.value}:{location_key}",
                 str(datetime.now().timestamp())
             )
+            pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Error storing weather data for {location_key}: {str(e)}")
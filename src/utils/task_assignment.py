@@ -0,0 +1,146 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from src.utils.geo_matrix import FleetDistanceCache, bot_speeds, eta_matrix
+from src.constants import (
+    TASK_TYPE_CAPABILITIES,
+    ASSIGNMENT_MIN_BATTERY_LEVEL,
+    ASSIGNMENT_BATTERY_WEIGHT_KM,
+    ASSIGNMENT_PRIORITY_WEIGHT_KM,
+    ASSIGNMENT_TIE_MARGIN_KM,
+    ASSIGNMENT_DISTANCE_CACHE_MAX_TASKS,
+)
+
+logger = logging.getLogger(__name__)
+
+INFEASIBLE_COST = 1e9
+
+class TaskAssignmentEngine:
+    """Deterministic min-cost matching of bots to tasks.
+
+    All pending tasks are solved at once with the Hungarian algorithm over a
+    bots x tasks cost matrix. The cost is the travel distance, plus a penalty
+    for low battery, minus a bonus for task priority, so that high-priority
+    tasks win when there are fewer bots than tasks. Bots that are not
+    available, lack the capability, lack an aid kit for dispatch_aid or are
+    below the minimum battery level cannot take a task.
+    """
+
+    def __init__(
+        self,
+        min_battery_level: float = ASSIGNMENT_MIN_BATTERY_LEVEL,
+        battery_weight_km: float = ASSIGNMENT_BATTERY_WEIGHT_KM,
+        priority_weight_km: float = ASSIGNMENT_PRIORITY_WEIGHT_KM,
+        tie_margin_km: float = ASSIGNMENT_TIE_MARGIN_KM,
+        max_cached_tasks: int = ASSIGNMENT_DISTANCE_CACHE_MAX_TASKS,
+    ):
+        self.min_battery_level = min_battery_level
+        self.battery_weight_km = battery_weight_km
+        self.priority_weight_km = priority_weight_km
+        self.tie_margin_km = tie_margin_km
+        # Kept across solves so only bots that moved and new tasks are recomputed
+        self.distance_cache = FleetDistanceCache(max_targets=max_cached_tasks)
+
+    def feasibility_matrix(self, bots: List[Dict[str, Any]], tasks: List[Dict[str, Any]]) -> np.ndarray:
+        """Bots x tasks booleans, True where a bot can take a task."""
+        task_types = list(TASK_TYPE_CAPABILITIES)
+        ready = np.array([
+            bot.get("status") == "available" and float(bot.get("battery_level") or 0) >= self.min_battery_level
+            for bot in bots
+        ], dtype=bool)
+        has_aid_kit = np.array([bool(bot.get("contains_aid_kit")) for bot in bots], dtype=bool)
+        # Bots x task types; an extra all-False column for task types no bot can take
+        capable = np.zeros((len(bots), len(task_types) + 1), dtype=bool)
+        for b, bot in enumerate(bots):
+            capabilities = str(bot.get("capabilities", "")).lower()
+            for k, task_type in enumerate(task_types):
+                capable[b, k] = TASK_TYPE_CAPABILITIES[task_type] in capabilities
+
+        type_index = np.array([
+            task_types.index(task.get("task_type")) if task.get("task_type") in TASK_TYPE_CAPABILITIES else len(task_types)
+            for task in tasks
+        ])
+        needs_aid_kit = np.array([task.get("task_type") == "dispatch_aid" for task in tasks], dtype=bool)
+
+        feasible = capable[:, type_index] & ready[:, None]
+        return feasible & (has_aid_kit[:, None] | ~needs_aid_kit[None, :])
+
+    def distance_matrix(self, bots: List[Dict[str, Any]], tasks: List[Dict[str, Any]]) -> np.ndarray:
+        """Bots x tasks distances in km."""
+        distances = self.distance_cache.distances(bots, tasks)
+        # Bots that left the fleet would otherwise stay cached forever. Tasks of other
+        # areas are solved again later, the cache drops them by size instead.
+        self.distance_cache.retain_bots([bot["bot_id"] for bot in bots])
+        return distances
+
+    def cost_matrix(self, bots: List[Dict[str, Any]], tasks: List[Dict[str, Any]], distances: Optional[np.ndarray] = None) -> np.ndarray:
+        """Bots x tasks assignment costs, INFEASIBLE_COST where a bot cannot take a task."""
+        if distances is None:
+            distances = self.distance_matrix(bots, tasks)
+        battery = np.array([float(bot.get("battery_level") or 0) for bot in bots])
+        priority = np.array([float(task.get("priority") or 0) for task in tasks])
+
+        cost = (
+            distances
+            + self.battery_weight_km * (1 - np.clip(battery, 0, 100) / 100)[:, None]
+            - self.priority_weight_km * np.clip(priority, 0, 1)[None, :]
+        )
+        return np.where(self.feasibility_matrix(bots, tasks), cost, INFEASIBLE_COST)
+
+    def solve(self, bots: List[Dict[str, Any]], tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Assign bots to tasks, returning one entry per task in input order.
+
+        Each entry has the task, the chosen bot (None if no bot can take it),
+        its distance and travel time, and the candidates: the chosen bot plus any unassigned
+        bot whose cost is within the tie margin.
+        """
+        results = [{"task": task, "bot": None, "distance_km": None, "eta_seconds": None, "candidates": []} for task in tasks]
+        if not bots or not tasks:
+            return results
+
+        distances = self.distance_matrix(bots, tasks)
+        cost = self.cost_matrix(bots, tasks, distances)
+        etas = eta_matrix(distances, bot_speeds(bots))
+        # Bots that cannot take any task only make the matching slower
+        candidate_bots = np.flatnonzero((cost < INFEASIBLE_COST).any(axis=1))
+        rows, task_indices = linear_sum_assignment(cost[candidate_bots])
+        bot_indices = candidate_bots[rows]
+        assigned = set(int(b) for b, t in zip(bot_indices, task_indices) if cost[b, t] < INFEASIBLE_COST)
+
+        for b, t in zip(bot_indices, task_indices):
+            if cost[b, t] >= INFEASIBLE_COST:
+                continue
+            tied = [
+                other for other in np.flatnonzero(cost[:, t] <= cost[b, t] + self.tie_margin_km)
+                if other == b or other not in assigned
+            ]
+            results[t].update({
+                "bot": bots[b],
+                "distance_km": float(distances[b, t]),
+                "eta_seconds": float(etas[b, t]),
+                "candidates": [bots[other] for other in tied],
+            })
+
+        logger.info(f"Assigned {len(assigned)} of {len(tasks)} tasks across {len(bots)} bots")
+        return results
+
+    @staticmethod
+    def to_allocation(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the allocation the bot agents expect from a solved entry."""
+        task, bot = result["task"], result["bot"]
+        return {
+            "bot_type": bot["bot_type"],
+            "bot_id": bot["bot_id"],
+            "task_id": task["task_id"],
+            "task_type": task["task_type"],
+            "target_location": {"lat": task["lat"], "long": task["long"]},
+            "context": task.get("context"),
+            "reason": (
+                f"Closest available {bot['bot_type']} able to {task['task_type']} "
+                f"({result['distance_km']:.2f} km away, about {result['eta_seconds'] / 60:.1f} min, "
+                f"battery {bot.get('battery_level')}%)"
+            ),
+        }
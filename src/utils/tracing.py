@@ -0,0 +1,198 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.constants import RedisKeys, TRACING_ENV, TRACE_STREAM_MAX_LENGTH, TRACE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+class Span:
+    """Timing of one job: when it was enqueued, became due, started and finished,
+    and the time it spent in LLM calls, Redis commands and enqueueing follow-up tasks."""
+
+    def __init__(self, name: Optional[str], trace_id: str, parent_span_id: Optional[str] = None, span_id: Optional[str] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_span_id = parent_span_id
+        self.span_id = span_id or _new_id()
+        self.enqueued_at: Optional[float] = None
+        self.due_at: Optional[float] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.timings: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.attributes: Dict[str, Any] = {}
+
+    def add_timing(self, kind: str, seconds: float) -> None:
+        self.timings[kind] = self.timings.get(kind, 0.0) + seconds
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+
+    def context(self) -> Dict[str, str]:
+        """What a task needs to continue this trace elsewhere."""
+        return {"trace_id": self.trace_id, "span_id": self.span_id}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "enqueued_at": self.enqueued_at,
+            "due_at": self.due_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_wait_ms": round((self.started_at - self.due_at) * 1000, 3) if self.due_at else None,
+            "duration_ms": round((self.finished_at - self.started_at) * 1000, 3) if self.finished_at else None,
+            "timings_ms": {kind: round(seconds * 1000, 3) for kind, seconds in self.timings.items()},
+            "counts": dict(self.counts),
+            "attributes": self.attributes,
+        }
+
+def current_span() -> Optional[Span]:
+    """The span of the job running in this thread, if any."""
+    return _current_span.get()
+
+def add_timing(kind: str, seconds: float) -> None:
+    """Add time spent on e.g. "llm" or "redis" to the current span; a no-op outside jobs."""
+    span = _current_span.get()
+    if span is not None:
+        span.add_timing(kind, seconds)
+
+class Tracer:
+    """Trace context propagation across the agent chain, with spans stored in Redis.
+
+    ``inject`` stamps a copy of a task with the trace of the job enqueueing
+    it, or a new trace when there is none, and the worker runs every job inside
+    ``job``, which makes its span current so follow-up tasks, LLM calls and
+    Redis commands are attributed to it. Finished spans are appended to a capped
+    stream for consumers and to a per trace list for the waterfall CLI, and
+    observations are indexed by data_id.
+    """
+
+    _instance: Optional["Tracer"] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        redis_client: Optional[Any] = None,
+        enabled: Optional[bool] = None,
+        stream_max_length: int = TRACE_STREAM_MAX_LENGTH,
+        ttl_seconds: int = TRACE_TTL_SECONDS,
+    ):
+        """Initialize the tracer; the Redis connection is opened with the first recorded span."""
+        self._redis_client = redis_client
+        self.enabled = os.getenv(TRACING_ENV, "true").lower() != "false" if enabled is None else enabled
+        self.stream_max_length = stream_max_length
+        self.ttl_seconds = ttl_seconds
+
+    @classmethod
+    def get_instance(cls) -> "Tracer":
+        """Get or create the shared tracer."""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @property
+    def redis_client(self) -> Any:
+        if self._redis_client is None:
+            from src.utils.redis import RedisUtils
+            self._redis_client = RedisUtils().redis_client
+        return self._redis_client
+
+    def inject(self, task_data: Dict[str, Any], delay_seconds: float = 0) -> Dict[str, Any]:
+        """Copy of a task about to be enqueued, stamped with the current trace context.
+
+        The caller's dict is left alone, as agents enqueue the same payload more than once.
+        """
+        if not self.enabled:
+            return task_data
+        parent = _current_span.get()
+        now = time.time()
+        return {
+            **task_data,
+            "trace": {
+                "trace_id": parent.trace_id if parent else _new_id(),
+                "parent_span_id": parent.span_id if parent else None,
+                "enqueued_at": now,
+                "due_at": now + delay_seconds,
+            },
+        }
+
+    @contextmanager
+    def resume(self, context: Optional[Dict[str, str]]) -> Iterator[None]:
+        """Enqueue tasks as children of a span saved with ``Span.context``, or as new traces for None."""
+        span = Span(None, context["trace_id"], span_id=context["span_id"]) if context else None
+        token = _current_span.set(span)
+        try:
+            yield
+        finally:
+            _current_span.reset(token)
+
+    @contextmanager
+    def job(self, task_data: Dict[str, Any], task_type: Optional[str] = None) -> Iterator[Span]:
+        """Run a job inside its span, named after its task type, recording the span when the job is done."""
+        trace = task_data.get("trace") or {}
+        span = Span(task_type or task_data.get("task_type"), trace.get("trace_id") or _new_id(), trace.get("parent_span_id"))
+        span.enqueued_at = trace.get("enqueued_at")
+        span.due_at = trace.get("due_at")
+        if task_data.get("data_id") is not None:
+            span.attributes["data_id"] = task_data["data_id"]
+        if task_data.get("data_type"):
+            span.attributes["data_type"] = task_data["data_type"]
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+            span.finished_at = time.time()
+            if self.enabled:
+                self.record(span)
+
+    def record(self, span: Span) -> None:
+        """Store a finished span."""
+        try:
+            span_json = json.dumps(span.to_dict(), default=str)
+            trace_key = f"{RedisKeys.TRACES.value}:{span.trace_id}"
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.xadd(RedisKeys.TRACE_SPANS.value, {"span": span_json}, maxlen=self.stream_max_length, approximate=True)
+            pipe.rpush(trace_key, span_json)
+            pipe.expire(trace_key, self.ttl_seconds)
+            if span.name == "data_aggregator" and "data_id" in span.attributes:
+                pipe.set(
+                    f"{RedisKeys.TRACE_OBSERVATIONS.value}:{span.attributes['data_id']}",
+                    json.dumps(span.context()),
+                    ex=self.ttl_seconds,
+                )
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error recording span {span.span_id}: {str(e)}")
+
+    def get_trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Every recorded span of a trace, in start order."""
+        try:
+            spans = [json.loads(span) for span in self.redis_client.lrange(f"{RedisKeys.TRACES.value}:{trace_id}", 0, -1)]
+            return sorted(spans, key=lambda span: span["started_at"])
+        except Exception as e:
+            logger.error(f"Error loading trace {trace_id}: {str(e)}")
+            return []
+
+    def find_observation(self, data_id: Any) -> Optional[Dict[str, str]]:
+        """Trace and span id of the job that interpreted an observation."""
+        try:
+            context = self.redis_client.get(f"{RedisKeys.TRACE_OBSERVATIONS.value}:{data_id}")
+            return json.loads(context) if context else None
+        except Exception as e:
+            logger.error(f"Error looking up observation {data_id}: {str(e)}")
+            return None
@@ -0,0 +1,59 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Type
+
+from src.agents.task_allocator import TaskAllocator
+from src.agents.data_aggregator import DataAggregator
+from src.agents.command_system_agent import CommandSystemAgent
+from src.agents.ground_bot_agent import GroundBotAgent
+from src.agents.drone_bot_agent import DroneBotAgent
+
+logger = logging.getLogger(__name__)
+
+class AgentRegistry:
+    """Per-process registry of warm agent instances.
+
+    Agents are built once and reused across jobs, so Redis connections, queues,
+    loggers and lookup tables are not rebuilt for every task.
+    """
+
+    AGENT_CLASSES: List[Type[Any]] = [
+        TaskAllocator,
+        DataAggregator,
+        CommandSystemAgent,
+        GroundBotAgent,
+        DroneBotAgent,
+    ]
+
+    _agents: Dict[Type[Any], Any] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, agent_class: Type[Any]) -> Any:
+        """Get the warm instance of an agent class, building it on first use."""
+        with cls._lock:
+            if agent_class not in cls._agents:
+                logger.info(f"Building {agent_class.__name__} instance")
+                cls._agents[agent_class] = agent_class()
+            return cls._agents[agent_class]
+
+    @classmethod
+    def warm_up(cls, agent_classes: Optional[List[Type[Any]]] = None) -> None:
+        """Build agents ahead of the first job."""
+        for agent_class in agent_classes or cls.AGENT_CLASSES:
+            try:
+                agent = cls.get(agent_class)
+                # Agents can prepare expensive resources of their own
+                if hasattr(agent, "warm_up"):
+                    agent.warm_up()
+            except Exception as e:
+                logger.error(f"Error warming up {agent_class.__name__}: {str(e)}")
+
+    @classmethod
+    def reset(cls, agent_class: Optional[Type[Any]] = None) -> None:
+        """Drop one warm agent, or all of them, so the next job builds a fresh instance."""
+        with cls._lock:
+            if agent_class is None:
+                cls._agents.clear()
+            else:
+                cls._agents.pop(agent_class, None)
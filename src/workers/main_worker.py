@@ -1,7 +1,7 @@
 import os
 import sys
 import logging
-from rq import Worker, Queue
+from rq import Queue
 from redis import Redis
 from datetime import datetime
 
@@ -9,12 +9,28 @@ from datetime import datetime
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.insert(0, project_root)
 
-from src.constants import QueueNames
+from src.constants import (
+    QueueNames,
+    WORKER_MODE_ENV,
+    WORKER_QUEUES_ENV,
+    QUEUE_SCHEDULING_ENV,
+    METRICS_HOST_ENV,
+    METRICS_PORT_ENV,
+    METRICS_DEFAULT_HOST,
+    METRICS_DEFAULT_PORT,
+)
+from src.utils.redis import RedisUtils
+from src.utils.event_store import EventStore
+from src.utils.mission_scheduler import MissionScheduler
+from src.utils.metrics import Metrics, start_metrics_server
+from src.utils.tracing import Tracer
 from src.agents.task_allocator import TaskAllocator
 from src.agents.data_aggregator import DataAggregator
 from src.agents.command_system_agent import CommandSystemAgent
 from src.agents.ground_bot_agent import GroundBotAgent
 from src.agents.drone_bot_agent import DroneBotAgent
+from src.workers.agent_registry import AgentRegistry
+from src.workers.weighted_worker import WeightedWorker, WeightedSimpleWorker
 
 # Configure logging
 logging.basicConfig(
@@ -23,32 +39,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def process_task(task_data):
-    """Process a task based on its type."""
+def process_task(task_data, task_type=None):
+    """Process a task based on its type, inside the span of its trace.
+
+    Jobs enqueued before the type was passed separately carry it in task_data.
+    That fallback can be removed once no such jobs are left in the queues.
+    """
+    task_type = task_type or task_data.get("task_type")
+    with Tracer.get_instance().job(task_data, task_type) as span:
+        success = _process_task(task_data, task_type)
+        span.attributes["success"] = bool(success)
+    # Flushed here rather than by the worker, as forked work horses exit right after the job
+    Metrics.get_instance().record_job(span)
+    return success
+
+def _process_task(task_data, task_type):
     try:
         # Add processing timestamp
         task_data["processing_started_at"] = datetime.now().isoformat()
         
-        # Get task type
-        task_type = task_data.get("task_type")
-        
         if task_type == "task_allocator":
-            task_allocator = TaskAllocator()
+            task_allocator = AgentRegistry.get(TaskAllocator)
             success = task_allocator.process_task(task_data)
         elif task_type == "data_aggregator":
-            data_aggregator = DataAggregator()
+            data_aggregator = AgentRegistry.get(DataAggregator)
             logger.info(f"Processing data aggregator task")
             success = data_aggregator.process_data(task_data)
+        elif task_type == "data_aggregator_flush":
+            data_aggregator = AgentRegistry.get(DataAggregator)
+            success = data_aggregator.flush_batch(task_data.get("data_type"))
+        elif task_type == "event_store_compaction":
+            data_aggregator = AgentRegistry.get(DataAggregator)
+            data_aggregator.event_store.compact()
+            success = True
         elif task_type == "command_system":
-            command_system = CommandSystemAgent()
+            command_system = AgentRegistry.get(CommandSystemAgent)
             success = command_system.process_data(task_data)
             success = True
         elif task_type == "ground_bot_agent_task":
-            ground_bot_agent = GroundBotAgent()
+            ground_bot_agent = AgentRegistry.get(GroundBotAgent)
             success = ground_bot_agent.process_task(task_data)
         elif task_type == "drone_bot_agent_task":
-            drone_bot_agent = DroneBotAgent()
+            drone_bot_agent = AgentRegistry.get(DroneBotAgent)
             success = drone_bot_agent.process_task(task_data)
+        elif task_type == "mission_dispatch":
+            MissionScheduler().dispatch(task_data.get("due"))
+            success = True
         else:
             logger.error(f"Unknown task type: {task_type}")
             return False
@@ -61,14 +97,46 @@ def process_task(task_data):
         return success
     except Exception as e:
         logger.error(f"Error processing task: {str(e)}")
+        # Discard warm agents so the next job does not inherit broken state
+        AgentRegistry.reset()
         return False
 
 def main():
     """Main worker function."""
     redis_conn = Redis(host='localhost', port=6379)
-    q = Queue(QueueNames.MAIN_QUEUE.value, connection=redis_conn)
-    worker = Worker([q])
-    worker.work()
+
+    # Workers listen on every queue unless assigned to a pool with WORKER_QUEUES
+    queue_names = os.getenv(WORKER_QUEUES_ENV)
+    if queue_names:
+        queue_names = [name.strip() for name in queue_names.split(",") if name.strip()]
+    else:
+        queue_names = [queue_name.value for queue_name in QueueNames]
+    queues = [Queue(name, connection=redis_conn) for name in queue_names]
+    scheduling = os.getenv(QUEUE_SCHEDULING_ENV, "strict").lower()
+
+    # Bots registered before the fleet indexes existed are indexed on startup
+    RedisUtils().reindex_bots()
+    # Events indexed before retention management expire like the bucketed ones
+    EventStore().migrate_legacy_index()
+    # Mission steps that came due while no worker was running are picked up again
+    MissionScheduler().dispatch()
+
+    # Build agents once in the worker process. A forking worker hands them to
+    # every work horse, the simple worker runs jobs in this process directly.
+    AgentRegistry.warm_up()
+
+    # Every worker tries to serve the cluster-wide metrics; the first one on a host gets the port
+    metrics_port = int(os.getenv(METRICS_PORT_ENV, METRICS_DEFAULT_PORT))
+    if metrics_port:
+        start_metrics_server(os.getenv(METRICS_HOST_ENV, METRICS_DEFAULT_HOST), metrics_port)
+
+    if os.getenv(WORKER_MODE_ENV, "fork").lower() == "simple":
+        logger.info("Starting non-forking worker")
+        worker = WeightedSimpleWorker(queues, connection=redis_conn, scheduling=scheduling)
+    else:
+        worker = WeightedWorker(queues, connection=redis_conn, scheduling=scheduling)
+    logger.info(f"Listening on {', '.join(queue.name for queue in worker.queues)} with {scheduling} scheduling")
+    worker.work(with_scheduler=True)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -0,0 +1,43 @@
+import random
+from typing import Dict, List, Optional
+
+from rq import Queue, SimpleWorker, Worker
+
+from src.constants import QUEUE_WEIGHTS
+
+class WeightedQueueMixin:
+    """Dequeue order for RQ workers listening on several queues.
+
+    RQ polls queues in list order, so the order decides which queue is served
+    next. In ``strict`` scheduling queues are always polled by descending
+    weight. In ``weighted`` scheduling the order is redrawn after every job,
+    with each queue's chance of being polled first proportional to its weight,
+    so low-weight queues still make progress while a high-weight queue is busy.
+    """
+
+    def __init__(self, queues: List[Queue], *args, scheduling: str = "strict", weights: Optional[Dict[str, int]] = None, **kwargs):
+        if scheduling not in ("strict", "weighted"):
+            raise ValueError(f"Unknown queue scheduling: {scheduling}")
+        self.scheduling = scheduling
+        self.weights = weights or QUEUE_WEIGHTS
+        queues = sorted(queues, key=lambda queue: self.weights.get(queue.name, 1), reverse=True)
+        super().__init__(queues, *args, **kwargs)
+
+    def reorder_queues(self, reference_queue: Queue):
+        """Redraw the polling order after a job was dequeued from reference_queue."""
+        if self.scheduling == "strict":
+            return
+
+        remaining = list(self.queues)
+        ordered = []
+        while remaining:
+            weights = [self.weights.get(queue.name, 1) for queue in remaining]
+            chosen = random.choices(range(len(remaining)), weights=weights)[0]
+            ordered.append(remaining.pop(chosen))
+        self._ordered_queues = ordered
+
+class WeightedWorker(WeightedQueueMixin, Worker):
+    """Forking worker with strict or weighted queue priorities."""
+
+class WeightedSimpleWorker(WeightedQueueMixin, SimpleWorker):
+    """Non-forking worker with strict or weighted queue priorities."""
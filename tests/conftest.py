@@ -0,0 +1,39 @@
+import os
+import sys
+
+import fakeredis
+import pytest
+from redis import ConnectionPool
+
+# Add project root to Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from src.utils.redis import RedisUtils
+
+TEST_REDIS_URL = "redis://tests"
+
+@pytest.fixture
+def redis_utils(monkeypatch):
+    """RedisUtils on a fresh in-memory Redis with Lua support."""
+    pool = ConnectionPool(connection_class=fakeredis.FakeRedisConnection, server=fakeredis.FakeServer())
+    monkeypatch.setitem(RedisUtils._pools, TEST_REDIS_URL, pool)
+    monkeypatch.setenv("REDIS_URL", TEST_REDIS_URL)
+    return RedisUtils()
+
+@pytest.fixture
+def task_sink(monkeypatch):
+    """Capture enqueued tasks as (task_type, task_data, delay) instead of sending them to RQ."""
+    tasks = []
+
+    def enqueue_task(self, task_type, task_data):
+        tasks.append((task_type, task_data, 0))
+        return True
+
+    def enqueue_task_in(self, task_type, task_data, delay_seconds):
+        tasks.append((task_type, task_data, delay_seconds))
+        return True
+
+    monkeypatch.setattr(RedisUtils, "enqueue_task", enqueue_task)
+    monkeypatch.setattr(RedisUtils, "enqueue_task_in", enqueue_task_in)
+    return tasks
@@ -0,0 +1,95 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents.task_allocator import TaskAllocator
+from src.utils.bot_registry import BotRegistry
+from src.utils.llm_gateway import LLMGateway
+
+DRONE = {
+    "bot_id": "21", "bot_type": "drone_bot", "status": "available", "lat": 12.12, "long": -121.23,
+    "battery_level": 78.2, "capabilities": "Search - Scans the target disaster area.",
+}
+RESCUE_TASK = {"task_id": "t1", "task_type": "assist_rescue", "lat": 12.12, "long": -121.23, "timestamp": "2025-01-01T00:00:00"}
+
+class ScriptedLLM:
+    """Answers every allocation prompt with the same bot."""
+
+    def __init__(self, bot_id, bot_type):
+        self.response = SimpleNamespace(content=json.dumps({"bot_id": bot_id, "bot_type": bot_type, "task_id": "t1"}))
+
+    def invoke_many(self, prompts, priority=None, family=None):
+        return [self.response for _ in prompts]
+
+@pytest.fixture
+def allocator(redis_utils, task_sink, monkeypatch):
+    def make(llm):
+        monkeypatch.setattr(LLMGateway, "get_instance", classmethod(lambda cls: llm))
+        monkeypatch.setattr(BotRegistry, "get_instance", classmethod(lambda cls: BotRegistry(redis_utils)))
+        return TaskAllocator(session_id="tests")
+    return make
+
+def test_llm_fallback_choice_is_reserved_and_committed(redis_utils, task_sink, allocator):
+    # No drone can assist a rescue, so the LLM picks from the nearest bots
+    redis_utils.set_bot_metadata("21", DRONE)
+
+    assert allocator(ScriptedLLM("21", "drone_bot")).process_task({"tasks": [RESCUE_TASK]}) is True
+    assert [task_type for task_type, _, _ in task_sink] == ["drone_bot_agent_task"]
+    bot = redis_utils.get_bot_metadata("21")
+    assert bot["status"] == "in_mission"
+    assert bot["current_task_id"] == "t1"
+
+def test_llm_fallback_choice_of_taken_bot_is_rejected(redis_utils, task_sink, allocator):
+    redis_utils.set_bot_metadata("21", {**DRONE, "status": "in_mission", "current_task_id": "t0"})
+
+    assert allocator(ScriptedLLM("21", "drone_bot")).process_task({"tasks": [RESCUE_TASK]}) is False
+    assert task_sink == []
+    assert redis_utils.get_bot_metadata("21")["current_task_id"] == "t0"
+
+GROUND = {
+    "bot_type": "ground_bot", "status": "available", "lat": 12.12, "long": -121.23,
+    "battery_level": 80.0, "capabilities": "Search - Scans the target disaster area.",
+}
+SEARCH_TASK = {"task_id": "t1", "task_type": "search", "lat": 12.12, "long": -121.23, "timestamp": "2025-01-01T00:00:00"}
+
+def _holders(redis_utils, task_id):
+    return [bot["bot_id"] for bot in redis_utils.get_all_bots_metadata() if bot.get("current_task_id") == task_id]
+
+def test_cancelled_task_releases_its_bot(redis_utils, task_sink, allocator):
+    redis_utils.set_bot_metadata("12", {**GROUND, "bot_id": "12"})
+    task_allocator = allocator(ScriptedLLM("12", "ground_bot"))
+    assert task_allocator.process_task({"tasks": [SEARCH_TASK]}) is True
+    assert _holders(redis_utils, "t1") == ["12"]
+
+    assert task_allocator.process_task({"tasks": [], "cancelled": ["t1"]}) is True
+    assert _holders(redis_utils, "t1") == []
+    assert redis_utils.get_bot_metadata("12")["status"] == "available"
+    assert len(task_sink) == 1
+
+def test_updated_task_keeps_a_single_bot(redis_utils, task_sink, allocator):
+    redis_utils.set_bot_metadata("12", {**GROUND, "bot_id": "12"})
+    redis_utils.set_bot_metadata("13", {**GROUND, "bot_id": "13", "lat": 13.12})
+    task_allocator = allocator(ScriptedLLM("12", "ground_bot"))
+    assert task_allocator.process_task({"tasks": [SEARCH_TASK]}) is True
+    assert _holders(redis_utils, "t1") == ["12"]
+
+    moved = {**SEARCH_TASK, "lat": 13.12}
+    assert task_allocator.process_task({"tasks": [moved], "updated": ["t1"]}) is True
+    # The allocator keeps its distance cache, so this also needs the moved task recomputed
+    assert _holders(redis_utils, "t1") == ["13"]
+    assert sorted(redis_utils.get_bot_metadata(bot_id)["status"] for bot_id in ("12", "13")) == ["available", "in_mission"]
+    assert len(task_sink) == 2
+
+def test_fallback_payload_offers_only_available_bots_of_needed_types(redis_utils, task_sink, allocator):
+    redis_utils.set_bot_metadata("12", {**GROUND, "bot_id": "12", "status": "reserved", "current_task_id": "t0"})
+    redis_utils.set_bot_metadata("13", {**GROUND, "bot_id": "13", "status": "in_mission", "current_task_id": "t0"})
+    redis_utils.set_bot_metadata("14", {**GROUND, "bot_id": "14", "lat": 12.2})
+    redis_utils.set_bot_metadata("21", DRONE)
+    task_allocator = allocator(ScriptedLLM("14", "ground_bot"))
+
+    payload = task_allocator._construct_payload(RESCUE_TASK)
+    # Drones cannot assist a rescue, busy ground bots could not take it
+    assert [bot["bot_id"] for bot in payload["bots_metadata"]] == ["14"]
+    payload = task_allocator._construct_payload(SEARCH_TASK)
+    assert [bot["bot_id"] for bot in payload["bots_metadata"]] == ["21", "14"]
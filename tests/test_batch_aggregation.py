@@ -0,0 +1,87 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents.data_aggregator import DataAggregator
+from src.utils.llm_gateway import LLMGateway
+
+INTERPRETATION = {"hazards": [{"type": "fire", "severity": "high", "confidence": 0.9}], "survivors": []}
+
+class ScriptedLLM:
+    """Answers batch prompts with the queued batch responses and single prompts with one interpretation."""
+
+    def __init__(self):
+        self.batch_responses = []
+        self.prompts = []
+
+    def invoke(self, prompt, priority=None, family=None):
+        self.prompts.append(prompt)
+        if "Return exactly one result per observation" in prompt:
+            return SimpleNamespace(content=self.batch_responses.pop(0))
+        return SimpleNamespace(content=json.dumps(INTERPRETATION))
+
+    def batch_prompts(self):
+        return [prompt for prompt in self.prompts if "Return exactly one result per observation" in prompt]
+
+def _report(n):
+    return {"data_type": "human_report", "report": f"Report {n}: fire near the school", "lat": 34.05 + n * 0.01, "long": -118.24, "source": f"caller-{n}"}
+
+def _batch_response(*indexes):
+    return json.dumps({"results": [{"index": index, "interpretation": {**INTERPRETATION, "index": index}} for index in indexes]})
+
+def _stored_sources(aggregator):
+    events = [event for n in range(3) for event in aggregator.event_store.nearby(34.05 + n * 0.01, -118.24, radius_km=0.1)]
+    return sorted((event["source"], event["processed_data"].get("index")) for event in events)
+
+@pytest.fixture
+def llm(redis_utils, monkeypatch):
+    llm = ScriptedLLM()
+    monkeypatch.setattr(LLMGateway, "get_instance", classmethod(lambda cls: llm))
+    return llm
+
+@pytest.fixture
+def aggregator(llm, task_sink):
+    return DataAggregator(session_id="tests", batch_mode=True, batch_max_wait_ms=1000, batch_max_items=3)
+
+def test_full_batch_is_flushed_in_one_call(aggregator, llm, task_sink):
+    llm.batch_responses.append(_batch_response(0, 1, 2))
+    assert aggregator.process_data(_report(0)) is True
+    assert aggregator.process_data(_report(1)) is True
+    assert llm.prompts == []
+    # Only the first observation of a batch schedules the flush job
+    assert task_sink == [("data_aggregator_flush", {"data_type": "human_report"}, 1.0)]
+
+    assert aggregator.process_data(_report(2)) is True
+    assert len(llm.prompts) == 1
+    assert '"index": 2' in llm.prompts[0]
+    assert _stored_sources(aggregator) == [("caller-0", 0), ("caller-1", 1), ("caller-2", 2)]
+
+def test_flush_job_interprets_a_partial_batch(aggregator, llm, task_sink):
+    llm.batch_responses.append(_batch_response(0))
+    aggregator.process_data(_report(0))
+
+    # What the scheduled data_aggregator_flush job runs once the wait window closes
+    assert aggregator.flush_batch("human_report") is True
+    assert len(llm.batch_prompts()) == 1
+    assert _stored_sources(aggregator) == [("caller-0", 0)]
+    assert aggregator.flush_batch("human_report") is True
+    assert len(llm.prompts) == 1
+
+    # The next observation opens a new batch with its own flush job
+    aggregator.process_data(_report(1))
+    assert [task for task in task_sink if task[0] == "data_aggregator_flush"] == [("data_aggregator_flush", {"data_type": "human_report"}, 1.0)] * 2
+
+@pytest.mark.parametrize("batch_response, batched", [
+    (_batch_response(0, 2), [0, 2]),  # Short: observation 1 is missing
+    (json.dumps({"results": [{"index": 0}, {"index": 1, "interpretation": {}}, "bad", {"index": 2, "interpretation": {**INTERPRETATION, "index": 2}}]}), [2]),
+    ("Sorry, I cannot help with that", []),
+])
+def test_observations_without_a_batch_result_are_interpreted_alone(aggregator, llm, batch_response, batched):
+    llm.batch_responses.append(batch_response)
+    for n in range(3):
+        aggregator.process_data(_report(n))
+
+    assert len(llm.batch_prompts()) == 1
+    assert len(llm.prompts) == 1 + 3 - len(batched)
+    assert _stored_sources(aggregator) == [(f"caller-{n}", n if n in batched else None) for n in range(3)]
@@ -0,0 +1,38 @@
+from src.utils.blob_store import BlobStore
+
+IMAGE = b"\xff\xd8\xff\xe0 jpeg bytes"
+
+def test_identical_content_is_stored_once(redis_utils):
+    store = BlobStore(redis_utils)
+    digest = store.put(IMAGE)
+
+    assert digest == BlobStore.digest(IMAGE)
+    assert store.put(IMAGE) == digest
+    assert store.get(digest) == IMAGE
+    assert redis_utils.redis_client.get(store._refs_key(digest)) == b"2"
+    assert store.put(b"other") != digest
+
+def test_blob_is_deleted_with_its_last_reference(redis_utils):
+    store = BlobStore(redis_utils)
+    digest = store.put(IMAGE)
+    assert store.acquire(digest) is True
+
+    store.release(digest)
+    assert store.get(digest) == IMAGE
+    store.release(digest)
+    assert store.get(digest) is None
+    assert not redis_utils.redis_client.exists(store._refs_key(digest))
+
+def test_acquire_of_missing_blob_leaves_no_reference(redis_utils):
+    store = BlobStore(redis_utils)
+    digest = BlobStore.digest(IMAGE)
+
+    assert store.acquire(digest) is False
+    assert not redis_utils.redis_client.exists(store._refs_key(digest))
+
+def test_blobs_expire_if_never_released(redis_utils):
+    store = BlobStore(redis_utils, ttl_seconds=60)
+    digest = store.put(IMAGE)
+
+    assert 0 < redis_utils.redis_client.ttl(store._blob_key(digest)) <= 60
+    assert 0 < redis_utils.redis_client.ttl(store._refs_key(digest)) <= 60
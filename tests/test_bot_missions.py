@@ -0,0 +1,62 @@
+import pytest
+
+from src.agents.ground_bot_agent import GroundBotAgent
+from src.utils.bot_reservations import BotReservations
+from src.utils.mission_scheduler import MissionScheduler
+from src.utils.redis import RedisUtils
+
+GROUND = {"bot_id": "12", "bot_type": "ground_bot", "status": "available", "lat": 12.12, "long": -121.23, "battery_level": 80.0}
+ALLOCATION = {"bot_id": "12", "bot_type": "ground_bot", "task_id": "t1", "target_location": {"lat": 12.12, "long": -121.23}}
+
+@pytest.fixture
+def bot_in_mission(redis_utils):
+    redis_utils.set_bot_metadata("12", GROUND)
+    reservations = BotReservations(redis_utils)
+    assert reservations.reserve("12", "t1") and reservations.commit("12", "t1")
+    return lambda: redis_utils.get_bot_metadata("12")["status"]
+
+def test_mission_runs_to_completion(bot_in_mission, task_sink):
+    agent = GroundBotAgent(session_id="tests")
+
+    assert agent.process_task(dict(ALLOCATION)) is True
+    assert bot_in_mission() == "in_mission"
+    assert agent.process_task({**ALLOCATION, "mission": {"id": "m1", "step": "report"}}) is True
+    assert bot_in_mission() == "available"
+    assert [task_type for task_type, _, _ in task_sink] == ["mission_dispatch", "data_aggregator"]
+
+def test_failing_step_releases_the_bot(bot_in_mission, task_sink):
+    agent = GroundBotAgent(session_id="tests")
+    payload = {**ALLOCATION, "sensor_scenario": "unknown", "mission": {"id": "m1", "step": "report"}}
+
+    assert agent.process_task(payload) is False
+    assert bot_in_mission() == "available"
+
+def test_step_that_cannot_be_enqueued_releases_the_bot(bot_in_mission, redis_utils):
+    scheduler = MissionScheduler(redis_utils)
+    RedisUtils.set_task_sink(lambda task_type, task_data, delay: task_type == "mission_dispatch")
+    try:
+        assert scheduler.schedule("ground_bot_agent_task", dict(ALLOCATION), "report", 0) is not None
+        assert scheduler.dispatch() == 0
+    finally:
+        RedisUtils.set_task_sink(None)
+    assert bot_in_mission() == "available"
+
+def test_steps_keep_the_allocated_task_type(redis_utils, task_sink):
+    scheduler = MissionScheduler(redis_utils)
+    allocation = {**ALLOCATION, "task_type": "assist_rescue"}
+    assert redis_utils.enqueue_task("ground_bot_agent_task", allocation)
+
+    scheduler.schedule("ground_bot_agent_task", allocation, "report", 0)
+    assert scheduler.dispatch() == 1
+    steps = [(task_type, task_data) for task_type, task_data, _ in task_sink if task_type == "ground_bot_agent_task"]
+    assert [task_type for task_type, _ in steps] == ["ground_bot_agent_task"] * 2
+    assert [task_data["task_type"] for _, task_data in steps] == ["assist_rescue"] * 2
+    assert steps[1][1]["mission"]["step"] == "report"
+
+def test_rq_job_gets_the_task_type_next_to_the_data(redis_utils):
+    allocation = {**ALLOCATION, "task_type": "assist_rescue"}
+    assert redis_utils.enqueue_task("ground_bot_agent_task", allocation)
+
+    job = redis_utils.get_queue("ground_bot_agent_task").jobs[0]
+    assert job.args[0]["task_type"] == "assist_rescue"
+    assert job.args[1] == "ground_bot_agent_task"
@@ -0,0 +1,32 @@
+import json
+
+from src.constants import RedisKeys
+from src.utils.bot_registry import BotRegistry
+
+DRONE = {"bot_id": "21", "bot_type": "drone_bot", "status": "available", "lat": 12.12, "long": -121.23, "battery_level": 78.2}
+
+def test_json_string_bots_are_migrated_to_hashes(redis_utils):
+    key = f"{RedisKeys.BOTS_METADATA.value}:21"
+    redis_utils.redis_client.set(key, json.dumps(DRONE))
+
+    assert redis_utils.reindex_bots() == 1
+    assert redis_utils.redis_client.type(key) == b"hash"
+    assert redis_utils.get_bot_metadata("21") == DRONE
+    assert redis_utils.get_bot_ids() == ["21"]
+    assert [bot["bot_id"] for bot in redis_utils.nearest_available(12.12, -121.23)] == ["21"]
+    # Already migrated bots are left alone
+    assert redis_utils.migrate_bot_metadata() == 0
+
+def test_registry_returns_one_bot_and_follows_updates(redis_utils):
+    redis_utils.set_bot_metadata("21", DRONE)
+    registry = BotRegistry(redis_utils)
+
+    assert registry.get_bot("21") == DRONE
+    assert registry.get_bot("99") is None
+
+    redis_utils.update_bot_status("21", "charging")
+    registry.invalidate("21")
+    assert registry.get_bot("21")["status"] == "charging"
+    # Callers get copies
+    registry.get_bot("21")["status"] = "available"
+    assert registry.get_bot("21")["status"] == "charging"
@@ -0,0 +1,61 @@
+from src.utils.bot_reservations import BotReservations
+
+GROUND = {"bot_id": "12", "bot_type": "ground_bot", "status": "available", "lat": 12.12, "long": -121.23, "battery_level": 80.0}
+
+def _bot(redis_utils, **fields):
+    redis_utils.set_bot_metadata("12", {**GROUND, **fields})
+
+def _status(redis_utils):
+    return redis_utils.get_bot_metadata("12")["status"]
+
+def test_reserve_commit_release(redis_utils):
+    _bot(redis_utils)
+    reservations = BotReservations(redis_utils)
+
+    assert reservations.reserve("12", "task-1") is True
+    assert _status(redis_utils) == "reserved"
+    assert redis_utils.get_bot_metadata("12")["current_task_id"] == "task-1"
+    assert redis_utils.get_bot_ids_by_status("available") == []
+    # A reserved bot cannot be reserved again
+    assert reservations.reserve("12", "task-2") is False
+
+    assert reservations.commit("12", "task-2") is False
+    assert reservations.commit("12", "task-1") is True
+    assert _status(redis_utils) == "in_mission"
+    assert reservations.commit("12", "task-1") is False
+
+    assert reservations.release("12", "task-2") is False
+    assert reservations.release("12", "task-1") is True
+    assert _status(redis_utils) == "available"
+    assert "current_task_id" not in redis_utils.get_bot_metadata("12")
+    assert redis_utils.get_bot_ids_by_status("available") == ["12"]
+
+def test_reserve_rejects_unavailable_or_low_battery_bots(redis_utils):
+    reservations = BotReservations(redis_utils, min_battery_level=15.0)
+    assert reservations.reserve("12", "task-1") is False
+
+    _bot(redis_utils, battery_level=10.0)
+    assert reservations.reserve("12", "task-1") is False
+    _bot(redis_utils, status="charging")
+    assert reservations.reserve("12", "task-1") is False
+    assert _status(redis_utils) == "charging"
+
+def test_release_expired_only_touches_lapsed_reservations(redis_utils):
+    reservations = BotReservations(redis_utils)
+    _bot(redis_utils)
+    reservations.reserve("12", "task-1")
+    # Still reserved
+    assert reservations.release_expired() == []
+
+    redis_utils.redis_client.delete(reservations._reservation_key("12"))
+    assert reservations.release_expired() == ["12"]
+    assert _status(redis_utils) == "available"
+    # The commit of a lapsed reservation fails
+    assert reservations.commit("12", "task-1") is False
+
+def test_release_expired_leaves_busy_bots_alone(redis_utils):
+    _bot(redis_utils, status="busy")
+    reservations = BotReservations(redis_utils)
+
+    assert reservations.release_expired() == []
+    assert _status(redis_utils) == "busy"
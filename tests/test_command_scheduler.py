@@ -0,0 +1,62 @@
+from src.utils.command_scheduler import CommandScheduler
+
+LAT, LON = 34.0522, -118.2437
+
+def _scheduler(redis_utils):
+    return CommandScheduler(redis_utils, cell_degrees=0.05, debounce_seconds=5.0, state_ttl_seconds=60)
+
+def test_area_cell_and_center():
+    scheduler = CommandScheduler.__new__(CommandScheduler)
+    scheduler.cell_degrees = 0.05
+
+    area = scheduler.area_cell(LAT, LON)
+    assert area == "681:-2365"
+    lat, lon = scheduler.area_center(area)
+    assert abs(lat - 34.075) < 1e-9 and abs(lon - -118.225) < 1e-9
+    assert scheduler.area_cell(lat, lon) == area
+
+def test_triggers_coalesce_while_pending(redis_utils, task_sink):
+    scheduler = _scheduler(redis_utils)
+
+    assert scheduler.trigger(LAT, LON) is True
+    assert scheduler.trigger(LAT + 0.001, LON) is False
+    assert len(task_sink) == 1
+    task_type, payload, delay = task_sink[0]
+    assert task_type == "command_system"
+    assert payload["area"] == scheduler.area_cell(LAT, LON)
+    assert delay == 0
+
+    # Another area gets its own decision
+    assert scheduler.trigger(LAT + 1, LON) is True
+    assert len(task_sink) == 2
+
+def test_finish_releases_clean_area(redis_utils, task_sink):
+    scheduler = _scheduler(redis_utils)
+    scheduler.trigger(LAT, LON)
+    area = task_sink[0][1]["area"]
+
+    scheduler.begin(area)
+    assert scheduler.finish(area) is False
+    assert len(task_sink) == 1
+    # Released, so the next trigger starts a new decision
+    assert scheduler.trigger(LAT, LON) is True
+    assert len(task_sink) == 2
+
+def test_trigger_while_running_schedules_one_follow_up(redis_utils, task_sink):
+    scheduler = _scheduler(redis_utils)
+    scheduler.trigger(LAT, LON)
+    area = task_sink[0][1]["area"]
+
+    scheduler.begin(area)
+    assert scheduler.trigger(LAT, LON) is False
+    assert scheduler.trigger(LAT, LON) is False
+    assert scheduler.finish(area) is True
+
+    assert len(task_sink) == 2
+    task_type, payload, delay = task_sink[1]
+    assert task_type == "command_system"
+    assert payload["area"] == area
+    assert delay == 5.0
+    # The follow-up is pending, so new triggers are absorbed by it
+    assert scheduler.trigger(LAT, LON) is False
+    assert len(task_sink) == 2
@@ -0,0 +1,53 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents.command_system_agent import CommandSystemAgent
+from src.utils.incident_clusterer import IncidentClusterer
+from src.utils.llm_gateway import LLMGateway
+from src.utils.redis import RedisUtils
+
+LAT, LON = 34.0522, -118.2437
+DIFF = {"added": [{"task_type": "search", "priority": 1, "lat": LAT, "long": LON}], "metadata": {"risk_level": "high"}}
+
+class ScriptedLLM:
+    """Answers every decision prompt with the same diff and keeps the prompts."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt, priority=None, family=None):
+        self.prompts.append(prompt)
+        return SimpleNamespace(content=json.dumps(DIFF))
+
+@pytest.fixture
+def agent(redis_utils, monkeypatch):
+    llm = ScriptedLLM()
+    monkeypatch.setattr(LLMGateway, "get_instance", classmethod(lambda cls: llm))
+    IncidentClusterer(redis_utils).add_event({
+        "lat": LAT, "lon": LON, "data_type": "image", "stored_at": time.time(),
+        "processed_data": {"hazards": [{"type": "fire", "confidence": 0.9}]},
+    })
+    return CommandSystemAgent(session_id="tests", incremental=True)
+
+def test_decision_state_is_stored_after_the_tasks_are_forwarded(redis_utils, task_sink, agent):
+    assert agent._decide_incremental("area", LAT, LON) is True
+    assert [task_type for task_type, _, _ in task_sink] == ["task_allocator"]
+    state = agent._get_decision_state("area")
+    assert [task["task_type"] for task in state["tasks"]] == ["search"]
+    assert state["summary"]["risk_level"] == "high"
+
+    # The incident was decided on, so the next decision has nothing new
+    assert agent._decide_incremental("area", LAT, LON) is True
+    assert len(agent.llm.prompts) == 1
+
+def test_decision_state_is_kept_when_forwarding_fails(redis_utils, agent, monkeypatch):
+    monkeypatch.setattr(RedisUtils, "enqueue_task", lambda self, task_type, task_data: False)
+
+    assert agent._decide_incremental("area", LAT, LON) is False
+    assert agent._get_decision_state("area") == {"decided_at": 0, "tasks": [], "summary": {}}
+    # The same incidents are sent again on the next decision
+    assert agent._decide_incremental("area", LAT, LON) is False
+    assert len(agent.llm.prompts) == 2
@@ -7,13 +7,13 @@ from datetime import datetime
 import base64
 import io
 from PIL import Image
-import json
 
 # Add project root to Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, project_root)
 
-from src.constants import QueueNames, RedisKeys
+from src.constants import QueueNames
+from src.utils.redis import RedisUtils
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -82,11 +82,11 @@ def setup_bot_metadata(redis_conn: Redis) -> bool:
             }
         ]
 
-        # Store each bot's metadata
+        # Store each bot's metadata (RedisUtils also notifies the bot registry caches)
+        redis_utils = RedisUtils()
         for bot in bots:
             bot_id = bot["bot_id"]
-            key = f"{RedisKeys.BOTS_METADATA.value}:{bot_id}"
-            redis_conn.set(key, json.dumps(bot))
+            redis_utils.set_bot_metadata(bot_id, bot)
             logger.info(f"Stored metadata for bot {bot_id}")
 
         return True
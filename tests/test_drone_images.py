@@ -0,0 +1,50 @@
+import os
+import random
+
+import pytest
+from PIL import Image
+
+from src.agents.drone_bot_agent import DroneBotAgent, _encode_jpeg, _prepare_image
+
+@pytest.fixture
+def noisy_png(tmp_path):
+    """A frame of random pixels, which JPEG cannot shrink much."""
+    rng = random.Random(5)
+    path = tmp_path / "noise.png"
+    Image.frombytes("RGB", (800, 600), bytes(rng.getrandbits(8) for _ in range(800 * 600 * 3))).save(path)
+    return str(path)
+
+def _prepare(path, **options):
+    stat = os.stat(path)
+    return _prepare_image(path, stat.st_mtime_ns, stat.st_size, options.get("max_size", (640, 480)), options.get("quality", 60), options.get("max_file_size_kb", 100))
+
+def test_prepared_image_fits_the_size_limit_at_the_best_quality(noisy_png):
+    _prepare_image.cache_clear()
+    data = _prepare(noisy_png, max_file_size_kb=40)
+    assert len(data) <= 40 * 1024
+
+    with Image.open(noisy_png) as img:
+        img.thumbnail((640, 480), Image.Resampling.LANCZOS)
+        sizes = {quality: len(_encode_jpeg(img, quality)) for quality in range(20, 61)}
+    best = max(quality for quality, size in sizes.items() if size <= 40 * 1024)
+    assert len(data) == sizes[best]
+    assert sizes[60] > 40 * 1024
+
+def test_unreachable_limit_falls_back_to_the_minimum_quality(noisy_png):
+    _prepare_image.cache_clear()
+    data = _prepare(noisy_png, max_file_size_kb=1)
+    with Image.open(noisy_png) as img:
+        img.thumbnail((640, 480), Image.Resampling.LANCZOS)
+        assert data == _encode_jpeg(img, 20)
+
+def test_repeated_frames_hit_the_cache_until_the_file_changes(redis_utils, noisy_png):
+    _prepare_image.cache_clear()
+    agent = DroneBotAgent(session_id="tests")
+    first = agent.compress_image(noisy_png)
+    assert agent.compress_image(noisy_png) is first
+    assert _prepare_image.cache_info().hits == 1
+
+    stat = os.stat(noisy_png)
+    os.utime(noisy_png, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    agent.compress_image(noisy_png)
+    assert _prepare_image.cache_info().misses == 2
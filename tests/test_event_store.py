@@ -0,0 +1,48 @@
+import time
+
+from src.utils.event_store import EventStore
+
+def _event(lat, lon, data_type="image"):
+    return {"lat": lat, "lon": lon, "data_type": data_type, "processed_data": {}}
+
+def test_nearby_finds_retained_events_within_radius(redis_utils):
+    store = EventStore(redis_utils, retention_seconds=3600, bucket_seconds=300)
+    near_id = store.store(_event(34.0522, -118.2437))
+    store.store(_event(34.1522, -118.2437))  # About 11 km north
+
+    events = store.nearby(34.0522, -118.2437, radius_km=1.0)
+    assert len(events) == 1
+    assert events[0]["lat"] == 34.0522
+    assert redis_utils.redis_client.ttl(near_id) > 0
+
+def test_nearby_skips_buckets_older_than_retention(redis_utils):
+    store = EventStore(redis_utils, retention_seconds=600, bucket_seconds=300)
+    store.store(_event(34.0522, -118.2437))
+    old_bucket = store._bucket_key(store._bucket(time.time() - 3600))
+    redis_utils.redis_client.geoadd(old_bucket, [-118.2437, 34.0522, "event:old"])
+    redis_utils.redis_client.set("event:old", '{"lat": 34.0522, "lon": -118.2437}')
+
+    assert len(store.nearby(34.0522, -118.2437)) == 1
+
+def test_nearby_filters_events_stored_before_since(redis_utils, monkeypatch):
+    store = EventStore(redis_utils, retention_seconds=3600, bucket_seconds=300)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now - 60)
+    store.store(_event(34.0522, -118.2437, "old"))
+    monkeypatch.setattr(time, "time", lambda: now)
+    store.store(_event(34.0522, -118.2437, "new"))
+
+    assert len(store.nearby(34.0522, -118.2437)) == 2
+    events = store.nearby(34.0522, -118.2437, since=now - 30)
+    assert [event["data_type"] for event in events] == ["new"]
+
+def test_migrate_legacy_index_expires_events_and_drops_the_index(redis_utils):
+    store = EventStore(redis_utils, retention_seconds=600, bucket_seconds=300)
+    client = redis_utils.redis_client
+    client.geoadd("events:location", [-118.2437, 34.0522, "event:legacy"])
+    client.set("event:legacy", '{"lat": 34.0522, "lon": -118.2437}')
+
+    assert store.migrate_legacy_index() == 1
+    assert 0 < client.ttl("event:legacy") <= 600
+    assert not client.exists("events:location")
+    assert store.migrate_legacy_index() == 0
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from src.utils.fake_llm import FakeChatModel, FakeLLMError, prompt_family
+from src.utils.incident_clusterer import extract_findings
+
+ALWAYS = {"seed": 3, "defaults": {"latency_ms": 0, "hazard_probability": 1.0, "survivor_probability": 1.0}}
+CONTEXT = {"lat": 34.05, "long": -118.24}
+INCIDENT = {
+    "incident_id": "abc", "lat": 34.05, "lon": -118.24, "observation_count": 2,
+    "hazards": {"fire": {"confidence": 0.8}}, "survivors": {"count": 2, "confidence": 0.9},
+}
+
+def _prompt(template, payload):
+    with open(f"prompts/{template}_prompt.txt", "r") as f:
+        return f.read().replace("<replace_payload>", json.dumps(payload))
+
+def _answer(model, prompt):
+    return json.loads(model.invoke(prompt).content)
+
+@pytest.mark.parametrize("template, family, sees_survivors", [
+    ("data_aggregator/interpret_image", "image", True),
+    ("data_aggregator/interpret_thermal_image", "thermal_image", True),
+    ("data_aggregator/interpret_gas_sensor", "gas_sensor", False),
+    ("data_aggregator/interpret_human_report", "human_report", True),
+])
+def test_interpretations_yield_findings_for_the_incident_clusterer(template, family, sees_survivors):
+    prompt = _prompt(template, {"gas_levels": {"co": 90}, "context": CONTEXT})
+    assert prompt_family(prompt) == family
+
+    findings = extract_findings(_answer(FakeChatModel(ALWAYS), prompt))
+    assert set(findings["hazards"]) >= {"fire"}
+    assert (findings["survivors"]["count"] >= 1) is sees_survivors
+
+def test_family_specific_fields():
+    model = FakeChatModel(ALWAYS)
+    gas = _answer(model, _prompt("data_aggregator/interpret_gas_sensor", {"gas_levels": {"co": 90, "h2s": 4}}))
+    assert [reading["gas_type"] for reading in gas["gas_readings"]] == ["co", "h2s"]
+    assert gas["risk_assessment"]["immediate_action_required"] is True
+
+    report = _answer(model, _prompt("data_aggregator/interpret_human_report", {"human_report": "Help", "context": CONTEXT}))
+    assert report["location_data"]["coordinates"]["primary"] == {"lat": 34.05, "lon": -118.24}
+
+    thermal = _answer(model, _prompt("data_aggregator/interpret_thermal_image", {"context": CONTEXT}))
+    assert {signature["type"] for signature in thermal["heat_signatures"]} == {"fire", "hot_spot", "human"}
+
+def test_batch_answers_one_result_per_observation_in_the_inner_family():
+    with open("prompts/data_aggregator/interpret_batch_prompt.txt", "r") as f:
+        batch_template = f.read()
+    with open("prompts/data_aggregator/interpret_gas_sensor_prompt.txt", "r") as f:
+        instructions = f.read().replace("<replace_payload>", "(each observation listed in the batch input)")
+    prompt = (
+        batch_template.replace("<replace_instructions>", instructions).replace("<replace_count>", "3")
+        .replace("<replace_payload>", json.dumps({"observations": [{"index": i, "gas_levels": {"co": i}} for i in range(3)]}))
+    )
+    assert prompt_family(prompt) == "batch"
+
+    response = FakeChatModel(ALWAYS).invoke(prompt)
+    results = json.loads(response.content)["results"]
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert all("gas_readings" in result["interpretation"] for result in results)
+    assert response.usage_metadata["output_tokens"] >= 3 * 150
+
+def test_command_decisions_issue_each_task_once():
+    model = FakeChatModel(ALWAYS)
+    full = _answer(model, _prompt("command_system", {"incidents": [INCIDENT]}))
+    assert sorted(task["task_type"] for task in full["tasks"]) == ["assist_rescue", "search"]
+    assert full["metadata"]["risk_level"] == "critical"
+
+    delta = _answer(model, _prompt("command_system_delta", {"summary": {}, "active_tasks": [], "new_incidents": [INCIDENT]}))
+    assert delta == {"added": [], "updated": [], "cancelled": [], "metadata": {"risk_level": "critical"}}
+
+def test_allocation_picks_an_available_candidate():
+    task = {"task_id": "t1", "task_type": "search", "lat": 34.05, "long": -118.24}
+    bots = [
+        {"bot_id": "1", "bot_type": "ground_bot", "status": "busy"},
+        {"bot_id": "2", "bot_type": "drone_bot", "status": "available"},
+    ]
+    allocation = _answer(FakeChatModel(ALWAYS), _prompt("task_allocator", {"tasks": [task], "bots_metadata": bots}))
+    assert (allocation["bot_id"], allocation["bot_type"], allocation["task_id"]) == ("2", "drone_bot", "t1")
+    assert allocation["target_location"] == {"lat": 34.05, "long": -118.24}
+    assert _answer(FakeChatModel(ALWAYS), _prompt("task_allocator", {"tasks": [task], "bots_metadata": []})) == {}
+
+def test_same_seed_and_prompts_give_the_same_run():
+    profile = {"seed": 11, "defaults": {"latency_ms": 0, "error_rate": 0.3}}
+    prompts = [_prompt("data_aggregator/interpret_image", {"context": {**CONTEXT, "n": n % 4}}) for n in range(12)]
+
+    def run(model, order):
+        outcomes = {}
+        for n in order:
+            try:
+                outcomes[n] = model.invoke(prompts[n]).content
+            except FakeLLMError as e:
+                outcomes[n] = e.status_code
+        return [outcomes[n] for n in range(len(prompts))]
+
+    # Repeated prompts draw again, but the n-th occurrence of a prompt always draws the same
+    forward = run(FakeChatModel(profile), range(12))
+    assert forward == run(FakeChatModel(profile), range(12))
+    assert len(set(map(str, forward))) > 1
+    assert 500 in forward
+    assert forward != run(FakeChatModel({**profile, "seed": 12}), range(12))
@@ -0,0 +1,74 @@
+import pytest
+
+from src.constants import GAS_SENSOR_THRESHOLDS
+from src.utils.gas_rules import GasSensorRuleEngine
+
+NORMAL_READINGS = {"temperature": 25, "CO": 5, "CO2": 400, "smoke_particles": 0}
+
+@pytest.fixture
+def engine():
+    return GasSensorRuleEngine()
+
+def _heat_sensor(temperature):
+    return {"lat": 37.77, "long": -121.67, "temperature": temperature, "area": 25}
+
+def test_clearly_normal_readings(engine):
+    result = engine.evaluate({**NORMAL_READINGS, "heat_sensors": []})
+    assert result["risk_assessment"]["overall_risk"] == "low"
+    assert not result["risk_assessment"]["immediate_action_required"]
+    assert result["hazards"] == []
+    assert result["interpreted_by"] == "rule_engine"
+    assert {reading["gas_type"] for reading in result["gas_readings"]} == {"CO", "CO2", "smoke_particles"}
+
+def test_one_critical_reading_makes_the_result_critical(engine):
+    result = engine.evaluate({**NORMAL_READINGS, "CO": 400})
+    assert result["risk_assessment"]["overall_risk"] == "high"
+    assert [hazard["type"] for hazard in result["hazards"]] == ["toxic_air"]
+    co = next(reading for reading in result["gas_readings"] if reading["gas_type"] == "CO")
+    assert co["threshold_exceeded"] and co["hazard_level"] == "danger"
+
+def test_readings_between_thresholds_are_left_to_the_llm(engine):
+    assert engine.evaluate({**NORMAL_READINGS, "smoke_particles": 200}) is None
+
+@pytest.mark.parametrize("metric", ["CO", "CO2", "CH4", "H2S"])
+def test_gas_thresholds_match_the_prompt(engine, metric):
+    limits = GAS_SENSOR_THRESHOLDS[metric]
+    assert engine.evaluate({**NORMAL_READINGS, metric: limits["normal_max"]}) is not None
+    assert engine.evaluate({**NORMAL_READINGS, metric: limits["normal_max"] + 1}) is None
+    result = engine.evaluate({**NORMAL_READINGS, metric: limits["critical_min"]})
+    assert result["risk_assessment"]["overall_risk"] == "high"
+
+def test_co_at_the_prompt_warning_level_is_still_safe(engine):
+    # The prompt only warns above 50 ppm
+    result = engine.evaluate({**NORMAL_READINGS, "CO": 50})
+    assert result["risk_assessment"]["overall_risk"] == "low"
+
+def test_heat_sensors_use_their_own_thresholds(engine):
+    cool = engine.evaluate({**NORMAL_READINGS, "heat_sensors": [_heat_sensor(30)]})
+    assert cool["risk_assessment"]["overall_risk"] == "low"
+    assert cool["hazards"] == []
+
+    assert engine.evaluate({**NORMAL_READINGS, "heat_sensors": [_heat_sensor(70)]}) is None
+    assert engine.evaluate({**NORMAL_READINGS, "heat_sensors": [{"lat": 1, "long": 2}]}) is None
+
+    hot = engine.evaluate({**NORMAL_READINGS, "heat_sensors": [_heat_sensor(30), _heat_sensor(150)]})
+    assert hot["risk_assessment"]["overall_risk"] == "high"
+    assert [(hazard["type"], hazard["severity"]) for hazard in hot["hazards"]] == [("fire", "high")]
+
+def test_fire_fields_are_carried_over(engine):
+    readings = {
+        **NORMAL_READINGS,
+        "temperature": 150,
+        "heat_sensors": [_heat_sensor(150)],
+        "has_fire": True,
+        "fire_location": {"lat": 37.7749, "long": -121.6694},
+    }
+    result = engine.evaluate(readings)
+    assert result["has_fire"] is True
+    assert result["fire_location"] == {"lat": 37.7749, "long": -121.6694}
+    assert "fire_locations" not in result
+
+def test_unusable_readings_are_left_to_the_llm(engine):
+    assert engine.evaluate(None) is None
+    assert engine.evaluate({"CO": "high"}) is None
+    assert engine.evaluate({"CO": True}) is None
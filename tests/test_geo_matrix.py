@@ -0,0 +1,65 @@
+import numpy as np
+
+from src.utils.geo_matrix import FleetDistanceCache, haversine_matrix
+
+BOTS = [
+    {"bot_id": "1", "lat": 34.05, "long": -118.24},
+    {"bot_id": "2", "lat": 34.10, "long": -118.30},
+]
+TASKS = [
+    {"task_id": "a", "lat": 34.05, "long": -118.24},
+    {"task_id": "b", "lat": 34.20, "long": -118.10},
+]
+
+def _expected(bots, targets):
+    return haversine_matrix(
+        np.array([bot["lat"] for bot in bots]), np.array([bot["long"] for bot in bots]),
+        np.array([target["lat"] for target in targets]), np.array([target["long"] for target in targets]),
+    )
+
+def test_haversine_matrix_matches_known_distance():
+    # One degree of latitude is about 111.2 km
+    distance = haversine_matrix(np.array([0.0]), np.array([0.0]), np.array([1.0]), np.array([0.0]))[0, 0]
+    assert abs(distance - 111.19) < 0.01
+
+def test_only_moved_rows_and_new_columns_are_computed():
+    cache = FleetDistanceCache()
+    assert np.allclose(cache.distances(BOTS, TASKS), _expected(BOTS, TASKS))
+
+    assert cache.update_bots(BOTS) == 0
+    assert cache.update_targets(TASKS) == 0
+    moved = [BOTS[0], {**BOTS[1], "lat": 34.30}]
+    assert cache.update_bots(moved) == 1
+    # Requested in a different order
+    assert np.allclose(cache.distances(moved[::-1], TASKS[::-1]), _expected(moved[::-1], TASKS[::-1]))
+
+def test_task_moved_under_same_id_is_recomputed():
+    cache = FleetDistanceCache()
+    assert cache.distances(BOTS[:1], TASKS[:1])[0, 0] < 1e-6
+
+    moved = {**TASKS[0], "lat": TASKS[0]["lat"] + 1.0}
+    assert cache.update_targets([moved]) == 1
+    assert abs(cache.distances(BOTS[:1], [moved])[0, 0] - 111.19) < 0.1
+
+def test_retain_evicts_departed_bots_and_targets():
+    cache = FleetDistanceCache()
+    cache.distances(BOTS, TASKS)
+
+    cache.retain_bots(["2"])
+    cache.retain_targets(["b"])
+    assert cache._distances.shape == (1, 1)
+    assert list(cache._bot_index) == ["2"]
+    # Evicted entries come back as new ones
+    assert np.allclose(cache.distances(BOTS, TASKS), _expected(BOTS, TASKS))
+
+def test_least_recently_requested_targets_are_evicted_beyond_max_targets():
+    cache = FleetDistanceCache(max_targets=2)
+    third = {"task_id": "c", "lat": 34.30, "long": -118.00}
+    cache.distances(BOTS, TASKS[:1])
+    cache.distances(BOTS, TASKS[1:])
+    cache.distances(BOTS, TASKS[:1])
+    assert np.allclose(cache.distances(BOTS, [third]), _expected(BOTS, [third]))
+
+    assert sorted(cache._target_index) == ["a", "c"]
+    assert cache._distances.shape == (2, 2)
+    assert np.allclose(cache.distances(BOTS, TASKS), _expected(BOTS, TASKS))
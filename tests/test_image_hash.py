@@ -0,0 +1,86 @@
+import base64
+import io
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.constants import RedisKeys
+from src.utils.image_hash import ImageDeduplicator, dhash, phash, hamming_distance
+
+LAT, LON = 34.0522, -118.2437
+
+def _scene(seed: int, size: int = 128) -> Image.Image:
+    """A smooth random scene, so small changes keep its structure."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+    return Image.fromarray(coarse).resize((size, size), Image.Resampling.BICUBIC)
+
+def _jpeg(image: Image.Image, quality: int = 90) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+def _noisy(image: Image.Image, seed: int = 0) -> Image.Image:
+    pixels = np.asarray(image, dtype=np.int16)
+    noise = np.random.default_rng(seed).integers(-4, 5, size=pixels.shape)
+    return Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8))
+
+@pytest.fixture
+def deduplicator(redis_utils):
+    return ImageDeduplicator(redis_utils, max_hamming_distance=6, max_geo_distance_meters=50, window_seconds=600)
+
+@pytest.mark.parametrize("hash_function", [dhash, phash])
+def test_recompressed_and_noisy_frames_hash_close(hash_function):
+    original = _scene(1)
+    recompressed = Image.open(io.BytesIO(_jpeg(original, quality=60)))
+    assert hamming_distance(hash_function(original), hash_function(recompressed)) <= 6
+    assert hamming_distance(hash_function(original), hash_function(_noisy(original))) <= 6
+
+@pytest.mark.parametrize("hash_function", [dhash, phash])
+def test_different_scenes_hash_far_apart(hash_function):
+    assert hamming_distance(hash_function(_scene(1)), hash_function(_scene(2))) > 6
+
+def test_compute_hash_accepts_bytes_and_base64(deduplicator):
+    image_bytes = _jpeg(_scene(1))
+    assert deduplicator.compute_hash(image_bytes) == deduplicator.compute_hash(base64.b64encode(image_bytes).decode())
+    assert deduplicator.compute_hash(None) is None
+    assert deduplicator.compute_hash(b"not an image") is None
+
+def test_unknown_algorithm_is_rejected(redis_utils):
+    with pytest.raises(ValueError):
+        ImageDeduplicator(redis_utils, algorithm="ahash")
+
+def test_near_duplicate_nearby_reuses_interpretation(deduplicator):
+    first = deduplicator.compute_hash(_jpeg(_scene(1)))
+    deduplicator.remember("image", first, LAT, LON, {"fire": True})
+
+    second = deduplicator.compute_hash(_jpeg(_noisy(_scene(1)), quality=70))
+    assert deduplicator.find_duplicate("image", second, LAT + 0.0001, LON) == {"fire": True}
+    assert deduplicator.get_stats()["image:skipped"] == 1
+
+def test_different_frame_or_place_or_data_type_is_unique(deduplicator):
+    image_hash = deduplicator.compute_hash(_jpeg(_scene(1)))
+    deduplicator.remember("image", image_hash, LAT, LON, {"fire": True})
+
+    assert deduplicator.find_duplicate("image", deduplicator.compute_hash(_jpeg(_scene(2))), LAT, LON) is None
+    # About 1.1 km north
+    assert deduplicator.find_duplicate("image", image_hash, LAT + 0.01, LON) is None
+    assert deduplicator.find_duplicate("thermal_image", image_hash, LAT, LON) is None
+    assert deduplicator.get_stats()["unique"] == 3
+
+def test_frames_older_than_window_are_pruned(deduplicator):
+    image_hash = deduplicator.compute_hash(_jpeg(_scene(1)))
+    deduplicator.remember("image", image_hash, LAT, LON, {"fire": True})
+    recent_key = f"{RedisKeys.IMAGE_HASH_RECENT.value}:image"
+    member = deduplicator.redis_client.zrange(recent_key, 0, 0)[0]
+    deduplicator.redis_client.zadd(recent_key, {member: time.time() - 601})
+
+    assert deduplicator.find_duplicate("image", image_hash, LAT, LON) is None
+    assert deduplicator.redis_client.zcard(f"{RedisKeys.IMAGE_HASH_LOCATION.value}:image") == 0
+
+def test_missing_location_is_never_a_duplicate(deduplicator):
+    image_hash = deduplicator.compute_hash(_jpeg(_scene(1)))
+    assert not deduplicator.remember("image", image_hash, None, LON, {"fire": True})
+    assert deduplicator.find_duplicate("image", image_hash, None, LON) is None
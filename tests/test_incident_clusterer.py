@@ -0,0 +1,54 @@
+import time
+
+from src.utils.incident_clusterer import IncidentClusterer
+
+def _event(lat, lon, hazards=(), stored_at=None):
+    return {
+        "lat": lat, "lon": lon, "data_type": "image", "stored_at": stored_at or time.time(),
+        "processed_data": {"hazards": [{"type": hazard, "confidence": confidence} for hazard, confidence in hazards]},
+    }
+
+def test_nearby_events_merge_into_one_incident(redis_utils):
+    clusterer = IncidentClusterer(redis_utils)
+    first, _ = clusterer.add_event(_event(34.0522, -118.2437, [("fire", 0.5)]))
+    second, _ = clusterer.add_event(_event(34.0530, -118.2437, [("fire", 0.5)]))
+    far, _ = clusterer.add_event(_event(34.0622, -118.2437, [("fire", 0.5)]))  # About 1.1 km north
+
+    assert second["incident_id"] == first["incident_id"]
+    assert second["observation_count"] == 2
+    assert second["hazards"]["fire"]["confidence"] == 0.75
+    assert second["lat"] == (34.0522 + 34.0530) / 2
+    assert far["incident_id"] != first["incident_id"]
+
+def test_forwarded_only_when_the_summary_changes(redis_utils):
+    clusterer = IncidentClusterer(redis_utils, confidence_delta=0.1)
+    assert clusterer.add_event(_event(34.0522, -118.2437, [("fire", 0.9)]))[1] is True
+    # Noisy-OR moves 0.9 to 0.91, below the delta
+    assert clusterer.add_event(_event(34.0522, -118.2437, [("fire", 0.1)]))[1] is False
+    assert clusterer.add_event(_event(34.0522, -118.2437, [("flood", 0.3)]))[1] is True
+
+def test_incidents_outside_the_window_or_retention_are_not_joined(redis_utils):
+    clusterer = IncidentClusterer(redis_utils, window_seconds=60, retention_seconds=600)
+    now = time.time()
+    stale, _ = clusterer.add_event(_event(34.0522, -118.2437, stored_at=now - 120))
+    fresh, _ = clusterer.add_event(_event(34.0522, -118.2437, stored_at=now))
+    assert fresh["incident_id"] != stale["incident_id"]
+
+    old, _ = clusterer.add_event(_event(35.0522, -118.2437, stored_at=now - 3600))
+    clusterer.add_event(_event(36.0522, -118.2437))
+    assert [incident["incident_id"] for incident in clusterer.nearby(35.0522, -118.2437)] == []
+    assert redis_utils.redis_client.zscore("incidents:recent", old["incident_id"]) is None
+
+def test_lock_timeout_does_not_forward(redis_utils):
+    holder = IncidentClusterer(redis_utils)
+    held = holder._lock_cells(holder._cell_lock_keys(34.0522, -118.2437))
+    clusterer = IncidentClusterer(redis_utils, lock_timeout_seconds=0.05)
+
+    # An event a cluster radius away shares cells with the held ones
+    assert clusterer.add_event(_event(34.0530, -118.2437, [("fire", 0.9)])) == (None, False)
+    # Events elsewhere are not held up
+    incident, changed = clusterer.add_event(_event(34.0622, -118.2437, [("fire", 0.9)]))
+    assert incident is not None and changed is True
+
+    holder._unlock_cells_script(keys=holder._cell_lock_keys(34.0522, -118.2437), args=[held])
+    assert clusterer.add_event(_event(34.0530, -118.2437, [("fire", 0.9)]))[1] is True
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from src.constants import RedisKeys
+from src.utils.llm_cache import LLMResponseCache
+
+TEMPLATE = "Interpret this reading: <replace_payload>"
+
+@pytest.fixture
+def cache(redis_utils):
+    return LLMResponseCache(redis_utils, ttl_seconds=60, max_entries=3, bypass=False)
+
+def test_key_ignores_payload_key_order():
+    first = LLMResponseCache.build_key("gas_sensor", TEMPLATE, {"co": 10, "lat": 1.0})
+    second = LLMResponseCache.build_key("gas_sensor", TEMPLATE, {"lat": 1.0, "co": 10})
+    assert first == second
+
+def test_key_changes_with_template_and_data_type():
+    payload = {"co": 10}
+    key = LLMResponseCache.build_key("gas_sensor", TEMPLATE, payload)
+    assert key != LLMResponseCache.build_key("gas_sensor", TEMPLATE + " v2", payload)
+    assert key != LLMResponseCache.build_key("human_report", TEMPLATE, payload)
+
+def test_miss_then_hit(cache):
+    key = cache.build_key("gas_sensor", TEMPLATE, {"co": 10})
+    assert cache.get(key, "gas_sensor") is None
+    assert cache.set(key, "gas_sensor", {"fire": False})
+    assert cache.get(key, "gas_sensor") == {"fire": False}
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["gas_sensor:hits"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["entries"] == 1
+
+def test_bypass_skips_reads_and_writes(cache):
+    key = cache.build_key("gas_sensor", TEMPLATE, {"co": 10})
+    assert not cache.set(key, "gas_sensor", {"fire": False}, bypass=True)
+    cache.set(key, "gas_sensor", {"fire": False})
+    assert cache.get(key, "gas_sensor", bypass=True) is None
+    assert cache.get_stats()["bypassed"] == 1
+
+def test_entries_expire_after_ttl_and_hits_refresh_it(cache):
+    key = cache.build_key("gas_sensor", TEMPLATE, {"co": 10})
+    cache.set(key, "gas_sensor", {"fire": False})
+    assert 0 < cache.redis_client.ttl(key) <= 60
+
+    cache.redis_client.expire(key, 5)
+    cache.get(key, "gas_sensor")
+    assert cache.redis_client.ttl(key) > 5
+
+    cache.redis_client.delete(key)
+    assert cache.get(key, "gas_sensor") is None
+
+def test_expired_entries_leave_the_index(cache):
+    index_key = RedisKeys.LLM_CACHE_INDEX.value
+    cache.redis_client.zadd(index_key, {"llm_cache:gas_sensor:stale": time.time() - 120})
+    cache.set(cache.build_key("gas_sensor", TEMPLATE, {"co": 10}), "gas_sensor", {"fire": False})
+    assert cache.redis_client.zscore(index_key, "llm_cache:gas_sensor:stale") is None
+
+def test_least_recently_used_entries_are_evicted(cache):
+    keys = [cache.build_key("gas_sensor", TEMPLATE, {"co": co}) for co in range(4)]
+    for key in keys[:3]:
+        cache.set(key, "gas_sensor", {"co": key})
+        time.sleep(0.01)
+    # Reading the oldest entry makes the second one the least recently used
+    cache.get(keys[0], "gas_sensor")
+    cache.set(keys[3], "gas_sensor", {"co": keys[3]})
+
+    assert cache.redis_client.exists(keys[1]) == 0
+    assert all(cache.redis_client.exists(key) for key in (keys[0], keys[2], keys[3]))
+    assert cache.get_stats()["entries"] == 3
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from src.constants import LLMPriority
+from src.utils.llm_gateway import LLMGateway, TokenBucket
+
+class BlockingLLM:
+    """Records prompts in call order; prompts named "block" wait until released."""
+
+    def __init__(self):
+        self.prompts = []
+        self.release = threading.Event()
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        if prompt == "block":
+            self.release.wait(5)
+        return f"answer to {prompt}"
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_queued_calls_run_in_priority_order():
+    llm = BlockingLLM()
+    gateway = LLMGateway(llm=llm, max_concurrency=1, requests_per_second=1000, burst=10)
+    threads = [threading.Thread(target=gateway.invoke, args=("block",))]
+    threads[0].start()
+    _wait_for(lambda: llm.prompts == ["block"])
+
+    for prompt, priority in [("low", LLMPriority.LOW), ("normal", LLMPriority.NORMAL), ("high", LLMPriority.HIGH)]:
+        threads.append(threading.Thread(target=gateway.invoke, args=(prompt, priority)))
+        threads[-1].start()
+    _wait_for(lambda: gateway.get_metrics()["queued"] == 3)
+    llm.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert llm.prompts == ["block", "high", "normal", "low"]
+
+def test_token_bucket_spends_the_burst_then_waits_for_the_rate():
+    async def acquire_times(bucket, count):
+        started_at = time.monotonic()
+        times = []
+        for _ in range(count):
+            await bucket.acquire()
+            times.append(time.monotonic() - started_at)
+        return times
+
+    times = asyncio.run(acquire_times(TokenBucket(rate=20.0, capacity=2), 4))
+    assert times[1] < 0.02
+    # Two more tokens at 20 per second take about 0.1s
+    assert times[3] >= 0.09
+
+    bucket = TokenBucket(rate=1000.0, capacity=5)
+    bucket.pause(0.1)
+    assert asyncio.run(acquire_times(bucket, 1))[0] >= 0.09
+
+def test_timed_out_call_is_cancelled_before_it_runs():
+    llm = BlockingLLM()
+    gateway = LLMGateway(llm=llm, max_concurrency=1, requests_per_second=1000, burst=10, timeout_seconds=0.05)
+    with pytest.raises(TimeoutError):
+        gateway.invoke("block")
+    # Queued behind the blocked call until its deadline passes
+    with pytest.raises(TimeoutError):
+        gateway.invoke("queued")
+    llm.release.set()
+
+    gateway.timeout_seconds = 2
+    assert gateway.invoke("after") == "answer to after"
+    assert llm.prompts == ["block", "after"]
+
+def test_event_loop_is_restarted_after_fork():
+    gateway = LLMGateway(llm=BlockingLLM(), requests_per_second=1000)
+    assert gateway.invoke("parent") == "answer to parent"
+
+    pid = os.fork()
+    if pid == 0:
+        # The child inherits the gateway but not its event loop thread
+        ok = False
+        try:
+            gateway.timeout_seconds = 2
+            ok = gateway.invoke("child") == "answer to child" and gateway._pid == os.getpid()
+        finally:
+            os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
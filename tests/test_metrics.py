@@ -0,0 +1,52 @@
+from src.constants import RedisKeys
+from src.utils.metrics import Metrics
+from src.utils.tracing import Span
+
+def _lines(metrics, prefix):
+    return [line for line in metrics.render().splitlines() if line.startswith(prefix)]
+
+def test_histogram_buckets_are_cumulative(redis_utils):
+    metrics = Metrics(redis_utils.redis_client)
+    for latency in (0.003, 0.02, 0.02, 500):
+        metrics.observe("asap_llm_latency_seconds", {"family": "gas_sensor"}, latency)
+
+    lines = dict(line.rsplit(" ", 1) for line in _lines(metrics, "asap_llm_latency_seconds"))
+    series = 'asap_llm_latency_seconds_bucket{family="gas_sensor",le="%s"}'
+    assert lines[series % "0.005"] == "1"
+    assert lines[series % "0.01"] == "1"
+    assert lines[series % "0.025"] == "3"
+    assert lines[series % "120.0"] == "3"
+    assert lines[series % "+Inf"] == "4"
+    assert lines['asap_llm_latency_seconds_count{family="gas_sensor"}'] == lines[series % "+Inf"]
+    assert float(lines['asap_llm_latency_seconds_sum{family="gas_sensor"}']) == 500.043
+
+def test_record_job_flushes_its_counters_and_buffered_ones(redis_utils):
+    metrics = Metrics(redis_utils.redis_client)
+    metrics.inc("asap_events_stored_total", {"data_type": "image"})
+    span = Span("data_aggregator", "trace")
+    span.due_at = span.started_at - 2
+    span.finished_at = span.started_at + 0.3
+    span.attributes["success"] = True
+    span.add_timing("redis", 0.5)
+    metrics.record_job(span)
+
+    # Another worker's render sees them without flushing anything itself
+    lines = Metrics(redis_utils.redis_client).render().splitlines()
+    assert 'asap_jobs_total{outcome="success",task_type="data_aggregator"} 1' in lines
+    assert 'asap_events_stored_total{data_type="image"} 1' in lines
+    assert 'asap_job_redis_seconds_total{task_type="data_aggregator"} 0.5' in lines
+    assert 'asap_job_queue_wait_seconds_bucket{task_type="data_aggregator",le="2.5"} 1' in lines
+    assert 'asap_job_duration_seconds_count{task_type="data_aggregator"} 1' in lines
+
+def test_state_lines_render_cache_counters_from_byte_fields(redis_utils):
+    metrics = Metrics(redis_utils.redis_client)
+    redis_utils.redis_client.hset(RedisKeys.LLM_CACHE_STATS.value, mapping={"hits": 5, "gas_sensor:hits": 3, "gas_sensor:misses": 2})
+    assert isinstance(next(iter(redis_utils.redis_client.hgetall(RedisKeys.LLM_CACHE_STATS.value))), bytes)
+
+    lines = metrics.render().splitlines()
+    assert 'asap_llm_cache_lookups_total{data_type="gas_sensor",outcome="hits"} 3' in lines
+    assert 'asap_llm_cache_lookups_total{data_type="gas_sensor",outcome="misses"} 2' in lines
+    # Totals without a data type are not exported next to the per data type counters
+    assert not any(line.startswith("asap_llm_cache_lookups_total ") for line in lines)
+    assert not any(line.startswith("asap_image_dedup_lookups_total") for line in lines)
+    assert any(line.startswith('asap_queue_depth{queue="') for line in lines)
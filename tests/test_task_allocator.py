@@ -4,13 +4,13 @@ import logging
 from datetime import datetime
 from redis import Redis
 from rq import Queue
-import json
 
 # Add project root to Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, project_root)
 
-from src.constants import QueueNames, RedisKeys
+from src.constants import QueueNames
+from src.utils.redis import RedisUtils
 
 # Configure logging
 logging.basicConfig(
@@ -59,11 +59,11 @@ def setup_bot_metadata(redis_conn: Redis) -> bool:
             }
         ]
 
-        # Store each bot's metadata
+        # Store each bot's metadata (RedisUtils also notifies the bot registry caches)
+        redis_utils = RedisUtils()
         for bot in bots:
             bot_id = bot["bot_id"]
-            key = f"{RedisKeys.BOTS_METADATA.value}:{bot_id}"
-            redis_conn.set(key, json.dumps(bot))
+            redis_utils.set_bot_metadata(bot_id, bot)
             logger.info(f"Stored metadata for bot {bot_id}")
 
         return True
@@ -96,8 +96,8 @@ def send_test_task():
             "priority": 0.99
         }
         
-        # Enqueue the task using the correct function path
-        job = q.enqueue('src.workers.task_allocator_worker.process_task', test_task)
+        # Enqueue the task the way the command system does, for the main worker
+        job = q.enqueue('src.workers.main_worker.process_task', {"task_type": "task_allocator", "tasks": [test_task]})
         logger.info(f"Test task enqueued successfully. Job ID: {job.id}")
         logger.info(f"Task data: {test_task}")
         
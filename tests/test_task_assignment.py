@@ -0,0 +1,90 @@
+import itertools
+
+import numpy as np
+
+from src.utils.task_assignment import TaskAssignmentEngine, INFEASIBLE_COST
+
+CAPABILITIES = "Search - scans the area. Assist Rescue - assists responders. Dispatch aid package - delivers aid."
+
+def _bot(bot_id, lat, long, **fields):
+    return {
+        "bot_id": bot_id, "bot_type": "ground_bot", "status": "available", "lat": lat, "long": long,
+        "battery_level": 90.0, "capabilities": CAPABILITIES, **fields,
+    }
+
+def _task(task_id, lat, long, task_type="search", **fields):
+    return {"task_id": task_id, "task_type": task_type, "lat": lat, "long": long, **fields}
+
+def test_matching_minimizes_total_cost():
+    # Task "a" taking its nearest bot first would leave "b" with the far one
+    bots = [_bot("1", 0.0, 0.0), _bot("2", 0.0, 0.3), _bot("3", 0.0, 2.0)]
+    tasks = [_task("a", 0.0, 0.1), _task("b", 0.0, -0.1)]
+    engine = TaskAssignmentEngine(tie_margin_km=0.0)
+
+    results = engine.solve(bots, tasks)
+    assert [result["bot"]["bot_id"] for result in results] == ["2", "1"]
+
+    cost = engine.cost_matrix(bots, tasks)
+    best = min(cost[b0, 0] + cost[b1, 1] for b0, b1 in itertools.permutations(range(len(bots)), 2))
+    chosen = sum(cost[bots.index(result["bot"]), t] for t, result in enumerate(results))
+    assert np.isclose(chosen, best)
+
+def test_priority_wins_when_bots_are_short():
+    bots = [_bot("1", 0.0, 0.0)]
+    tasks = [_task("near", 0.0, 0.01), _task("urgent", 0.0, 0.02, priority=1.0)]
+
+    results = TaskAssignmentEngine().solve(bots, tasks)
+    assert results[0]["bot"] is None
+    assert results[1]["bot"]["bot_id"] == "1"
+
+def test_infeasible_bots_are_not_assigned():
+    bots = [
+        _bot("busy", 0.0, 0.0, status="in_mission"),
+        _bot("flat", 0.0, 0.0, battery_level=5.0),
+        _bot("searcher", 0.0, 0.0, capabilities="Search - scans the area."),
+        _bot("no_kit", 0.0, 0.0),
+    ]
+    tasks = [_task("rescue", 0.0, 0.0, "assist_rescue"), _task("aid", 0.0, 0.0, "dispatch_aid"), _task("x", 0.0, 0.0, "unknown")]
+    engine = TaskAssignmentEngine()
+
+    feasible = engine.feasibility_matrix(bots, tasks)
+    assert feasible.tolist() == [
+        [False, False, False],
+        [False, False, False],
+        [False, False, False],
+        [True, False, False],
+    ]
+    results = engine.solve(bots, tasks)
+    assert results[0]["bot"]["bot_id"] == "no_kit"
+    assert results[1]["bot"] is None and results[1]["candidates"] == []
+    assert results[2]["bot"] is None
+    assert (engine.cost_matrix(bots, tasks)[:, 2] == INFEASIBLE_COST).all()
+
+def test_no_bots_or_no_tasks():
+    engine = TaskAssignmentEngine()
+    assert engine.solve([], [_task("a", 0.0, 0.0)])[0]["bot"] is None
+    assert engine.solve([_bot("1", 0.0, 0.0)], []) == []
+
+def test_equally_good_bots_are_candidates():
+    bots = [_bot("1", 0.0, -0.01), _bot("2", 0.0, 0.01), _bot("3", 0.0, 1.0)]
+    results = TaskAssignmentEngine().solve(bots, [_task("a", 0.0, 0.0)])
+    assert sorted(bot["bot_id"] for bot in results[0]["candidates"]) == ["1", "2"]
+
+def test_to_allocation():
+    bot = _bot("1", 0.0, 0.0, contains_aid_kit=True)
+    result = TaskAssignmentEngine().solve([bot], [_task("a", 0.0, 0.01, "dispatch_aid", context="water")])[0]
+
+    allocation = TaskAssignmentEngine.to_allocation(result)
+    assert allocation["bot_id"] == "1"
+    assert allocation["task_type"] == "dispatch_aid"
+    assert allocation["target_location"] == {"lat": 0.0, "long": 0.01}
+    assert allocation["context"] == "water"
+
+def test_solving_one_area_keeps_other_areas_tasks_cached():
+    engine = TaskAssignmentEngine()
+    bots = [_bot("1", 0.0, 0.0)]
+    engine.solve(bots, [_task("a", 0.0, 0.1)])
+    engine.solve(bots, [_task("b", 5.0, 5.0)])
+
+    assert sorted(engine.distance_cache._target_index) == ["a", "b"]
+    assert engine.distance_cache.update_targets([_task("a", 0.0, 0.1)]) == 0
@@ -0,0 +1,78 @@
+import sys
+
+import pytest
+
+from scripts import trace_waterfall
+from src.utils.redis import RedisUtils
+from src.utils.tracing import Tracer
+
+@pytest.fixture
+def tracer(redis_utils, monkeypatch):
+    tracer = Tracer(redis_client=redis_utils.redis_client, enabled=True)
+    monkeypatch.setattr(Tracer, "get_instance", classmethod(lambda cls: tracer))
+    return tracer
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    """Tasks handed to RQ by the real enqueue_task, as (task_type, task_data, delay)."""
+    tasks = []
+    monkeypatch.setattr(RedisUtils, "_task_sink", lambda task_type, task_data, delay: tasks.append((task_type, task_data, delay)) or True)
+    return tasks
+
+def test_inject_stamps_a_copy(tracer):
+    task_data = {"data_id": 7}
+    stamped = tracer.inject(task_data, delay_seconds=5)
+    assert task_data == {"data_id": 7}
+    assert stamped["data_id"] == 7
+    assert stamped["trace"]["due_at"] - stamped["trace"]["enqueued_at"] == pytest.approx(5)
+
+def test_trace_follows_enqueue_job_and_child_enqueue(redis_utils, tracer, enqueued):
+    observation = {"data_id": 7, "data_type": "image"}
+    assert redis_utils.enqueue_task("data_aggregator", observation) is True
+    # Enqueueing the same payload again starts another trace
+    redis_utils.enqueue_task("data_aggregator", observation)
+    assert "trace" not in observation
+    root = enqueued[0][1]["trace"]
+    assert enqueued[1][1]["trace"]["trace_id"] != root["trace_id"]
+
+    with tracer.job(enqueued[0][1], "data_aggregator") as span:
+        redis_utils.enqueue_task("command_system", {"area": "681:-2365"})
+    child = enqueued[2][1]["trace"]
+    assert span.trace_id == root["trace_id"] and span.parent_span_id is None
+    assert child["trace_id"] == span.trace_id
+    assert child["parent_span_id"] == span.span_id
+
+    with tracer.job(enqueued[2][1], "command_system"):
+        pass
+    spans = tracer.get_trace(span.trace_id)
+    assert [(s["name"], s["parent_span_id"]) for s in spans] == [("data_aggregator", None), ("command_system", span.span_id)]
+    assert tracer.find_observation(7) == span.context()
+    assert tracer.find_observation(8) is None
+
+def test_resume_continues_a_saved_span(redis_utils, tracer, enqueued):
+    with tracer.job({}, "ground_bot_agent_task") as span:
+        saved = span.context()
+
+    with tracer.resume(saved):
+        redis_utils.enqueue_task_in("ground_bot_agent_task", {"step": 2}, 30)
+    with tracer.resume(None):
+        redis_utils.enqueue_task("ground_bot_agent_task", {"step": 3})
+
+    resumed, fresh = enqueued[0][1]["trace"], enqueued[1][1]["trace"]
+    assert (resumed["trace_id"], resumed["parent_span_id"]) == (saved["trace_id"], saved["span_id"])
+    assert enqueued[0][2] == 30
+    assert fresh["trace_id"] != saved["trace_id"] and fresh["parent_span_id"] is None
+
+def test_waterfall_shows_what_followed_from_an_observation(redis_utils, tracer, enqueued, monkeypatch, capsys):
+    redis_utils.enqueue_task("data_aggregator", {"data_id": 7, "data_type": "image"})
+    with tracer.job(enqueued[0][1], "data_aggregator"):
+        redis_utils.enqueue_task("command_system", {})
+    with tracer.job(enqueued[1][1], "command_system"):
+        pass
+
+    monkeypatch.setattr(sys, "argv", ["trace_waterfall.py", "--observation", "7"])
+    trace_waterfall.main()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith(f"Trace {enqueued[0][1]['trace']['trace_id']}: 2 spans")
+    assert lines[2].endswith("  data_aggregator (image 7)")
+    assert lines[3].endswith("    command_system")